@@ -1,10 +1,31 @@
+import atexit
+import io
+import json
 import os
-import subprocess
+import threading
+import time
 import uuid
-from flask import Flask, render_template, request, jsonify, send_file, send_from_directory
+from flask import Flask, Request, Response, g, render_template, request, jsonify, send_file, send_from_directory, url_for
 from werkzeug.utils import secure_filename
 
+from cache import ResultCache, make_key
+from jobs import DONE, FINISHED, JobManager, JobQueueFull
+from metrics import BYTES_BUCKETS, CONTENT_TYPE, MEGAPIXEL_BUCKETS, Registry
+from video_pipeline import ANIMATION_EXTENSIONS, VIDEO_EXTENSIONS, cek_batas_webp
+from worker_pool import WorkerPool
+
+
+class _Request(Request):
+    """Upload ke /process/stream tetap di memori (bawaan werkzeug: file temp di atas 500 KB)."""
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        if self.path == STREAM_PATH:
+            return io.BytesIO()
+        return super()._get_file_stream(total_content_length, content_type, filename, content_length)
+
+
 app = Flask(__name__)
+app.request_class = _Request
 
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
 INPUT_DIR = os.path.join(SCRIPT_DIR, "input")
@@ -13,7 +34,138 @@ OUTPUT_DIR = os.path.join(SCRIPT_DIR, "output")
 os.makedirs(INPUT_DIR, exist_ok=True)
 os.makedirs(OUTPUT_DIR, exist_ok=True)
 
-ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'webp'}
+ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'webp', 'gif', 'mp4', 'mov', 'avi', 'mkv', 'webm', 'm4v'}
+ALLOWED_MODES = {'enhance', 'colorize', 'both', 'auto'}
+ALLOWED_SCALES = {'2', '4'}
+ALLOWED_MODELS = {'eccv16', 'siggraph17'}
+CONTENT_TYPES = {'.png': 'image/png', '.jpg': 'image/jpeg', '.jpeg': 'image/jpeg', '.webp': 'image/webp'}
+
+STREAM_PATH = '/process/stream'
+STREAM_CHUNK = 256 * 1024
+
+DEFAULT_MODEL = 'siggraph17'
+SATURATION_BOOST = 1.3
+
+POOL_SIZE = int(os.environ.get('ANJAYHD_WORKERS', '2'))
+JOB_TIMEOUT = float(os.environ.get('ANJAYHD_JOB_TIMEOUT', '300'))
+VIDEO_TIMEOUT = float(os.environ.get('ANJAYHD_VIDEO_TIMEOUT', '3600'))
+WARMUP = os.environ.get('ANJAYHD_WARMUP', '1') != '0'
+# Job /jobs mengirim preview murah dan progres per tile SR selama berjalan
+PREVIEW = os.environ.get('ANJAYHD_PREVIEW', '1') != '0'
+# Interval komentar keep-alive SSE (detik), juga batas deteksi client putus
+EVENTS_KEEPALIVE = float(os.environ.get('ANJAYHD_EVENTS_KEEPALIVE', '15'))
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    """Buat worker pool saat pertama dipakai (bukan saat import, agar aman untuk spawn)."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # Setiap worker memuat model dan menjalankan inferensi dummy sebelum
+            # menerima job (lihat image_enhancer.pemanasan dan /readyz).
+            warmup = ('image_enhancer:pemanasan', {'batch_size': job_manager.max_batch}) if WARMUP else None
+            _pool = WorkerPool(size=POOL_SIZE, timeout=JOB_TIMEOUT, warmup=warmup)
+            atexit.register(_pool.shutdown)
+        return _pool
+
+
+metrics = Registry()
+HTTP_REQUESTS = metrics.counter('anjayhd_http_requests_total', 'Jumlah request HTTP',
+                                ('endpoint', 'method', 'status'))
+HTTP_LATENCY = metrics.histogram('anjayhd_http_request_duration_seconds',
+                                 'Durasi request HTTP sampai response dibuat', ('endpoint', 'method'))
+STAGE_LATENCY = metrics.histogram('anjayhd_stage_duration_seconds',
+                                  'Durasi per tahap (upload, decode, preview, colorize, sr, encode, send)',
+                                  ('stage', 'mode', 'scale'))
+JOB_LATENCY = metrics.histogram('anjayhd_job_duration_seconds',
+                                'Durasi job dari masuk antrian sampai selesai', ('mode', 'scale', 'status'))
+QUEUE_WAIT = metrics.histogram('anjayhd_job_queue_wait_seconds', 'Waktu tunggu job di antrian',
+                               ('mode', 'scale'))
+JOBS = metrics.counter('anjayhd_jobs_total', 'Komputasi job yang selesai per status', ('mode', 'scale', 'status'))
+INPUT_MEGAPIXELS = metrics.histogram('anjayhd_input_megapixels', 'Ukuran gambar input (megapixel)',
+                                     ('mode',), buckets=MEGAPIXEL_BUCKETS)
+OUTPUT_BYTES = metrics.histogram('anjayhd_output_bytes', 'Ukuran file hasil (byte)', ('mode', 'scale'),
+                                 buckets=BYTES_BUCKETS)
+
+
+def _catat_run_selesai(run):
+    """Metrik satu komputasi job (dipanggil JobManager saat run selesai)."""
+    mode = run.kwargs.get('mode', '')
+    scale = run.kwargs.get('scale', '')
+    JOBS.inc(mode=mode, scale=scale, status=run.status)
+    JOB_LATENCY.observe(run.finished_at - run.enqueued_at, mode=mode, scale=scale, status=run.status)
+    if run.started_at is not None:
+        QUEUE_WAIT.observe(run.started_at - run.enqueued_at, mode=mode, scale=scale)
+    if run.status != DONE or not run.result:
+        return
+    for stage, seconds in run.result.get('timings', {}).items():
+        STAGE_LATENCY.observe(seconds, stage=stage, mode=mode, scale=scale)
+    if run.result.get('input_width'):
+        INPUT_MEGAPIXELS.observe(run.result['input_width'] * run.result['input_height'] / 1e6, mode=mode)
+    if 'output_bytes' in run.result:
+        OUTPUT_BYTES.observe(run.result['output_bytes'], mode=mode, scale=scale)
+
+
+job_manager = JobManager(get_pool, on_finish=_catat_run_selesai)
+result_cache = ResultCache(OUTPUT_DIR)
+
+metrics.gauge_callback('anjayhd_queue_depth', 'Job yang menunggu di antrian', job_manager.queue_depth)
+metrics.gauge_callback('anjayhd_jobs_in_flight', 'Job yang sedang diproses worker', lambda: job_manager.running)
+metrics.counter_callback('anjayhd_jobs_coalesced_total', 'Job yang digabung dengan job identik yang berjalan',
+                         lambda: job_manager.coalesced)
+metrics.counter_callback('anjayhd_cache_lookups_total', 'Lookup cache hasil',
+                         lambda: {('hit',): result_cache.hits, ('miss',): result_cache.misses}, ('result',))
+metrics.gauge_callback('anjayhd_cache_hit_ratio', 'Rasio cache hit sejak server start',
+                       lambda: result_cache.stats()['hit_ratio'])
+metrics.gauge_callback('anjayhd_cache_bytes', 'Ukuran folder cache hasil (byte)',
+                       lambda: result_cache.stats()['bytes'])
+metrics.counter_callback('anjayhd_worker_restarts_total', 'Restart worker (crash/timeout/cancel)',
+                         lambda: _pool.restarts if _pool is not None else 0)
+metrics.gauge_callback('anjayhd_workers_ready', 'Worker yang hidup dan selesai warm-up',
+                       lambda: sum(w['alive'] and w['ready'] for w in _pool.worker_status()) if _pool else 0)
+
+
+@app.before_request
+def _mulai_request():
+    g.request_start = time.perf_counter()
+
+
+@app.after_request
+def _catat_request(response):
+    endpoint = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+    HTTP_REQUESTS.inc(endpoint=endpoint, method=request.method, status=response.status_code)
+    HTTP_LATENCY.observe(time.perf_counter() - g.request_start, endpoint=endpoint, method=request.method)
+    return response
+
+
+def _catat_kirim(response):
+    """Tahap send: sampai file selesai dikirim ke client (bukan hanya response dibuat)."""
+    start = g.request_start
+
+    def selesai():
+        STAGE_LATENCY.observe(time.perf_counter() - start, stage='send', mode='', scale='')
+
+    body = response.response
+    if response.direct_passthrough and hasattr(body, 'close'):
+        # send_file memberi file wrapper langsung ke server (bisa sendfile) dan
+        # callback Response.close tidak dipanggil; server memanggil close()
+        # wrapper setelah selesai mengirim, jadi catat di sana.
+        close = body.close
+
+        def close_and_record():
+            try:
+                close()
+            finally:
+                selesai()
+
+        body.close = close_and_record
+    else:
+        response.call_on_close(selesai)
+    return response
+
 
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
@@ -29,93 +181,466 @@ def serve_sakura():
     return send_from_directory(SCRIPT_DIR, 'sakura.png')
 
 
-@app.route('/process', methods=['POST'])
-def process_image():
+_PESAN_HANYA_JOBS = 'Video dan GIF/WebP animasi hanya bisa diproses lewat /jobs'
+
+
+def _jumlah_frame(data):
+    """Jumlah frame GIF/WebP dari header (1 untuk gambar diam atau data yang tidak terbaca)."""
+    from PIL import Image
+    
+    try:
+        with Image.open(io.BytesIO(data)) as img:
+            return getattr(img, 'n_frames', 1)
+    except OSError:
+        return 1
+
+
+def _terima_upload(sinkron=False):
+    """
+    Validasi upload, hitung key cache, dan simpan file ke INPUT_DIR bila
+    hasilnya belum ada di cache.
+    
+    sinkron: untuk /process, yang menahan thread request sampai selesai. Video
+    dan GIF/WebP animasi ditolak (400) dan harus lewat /jobs.
+    
+    Returns:
+        (params, None) bila valid, atau (None, response_error)
+    """
     if 'file' not in request.files:
-        return jsonify({'error': 'Tidak ada file yang diupload'}), 400
+        return None, (jsonify({'error': 'Tidak ada file yang diupload'}), 400)
     
     file = request.files['file']
     mode = request.form.get('mode', 'enhance')
     scale = request.form.get('scale', '4')
+    model_type = request.form.get('model', DEFAULT_MODEL)
     
     if file.filename == '':
-        return jsonify({'error': 'Tidak ada file yang dipilih'}), 400
+        return None, (jsonify({'error': 'Tidak ada file yang dipilih'}), 400)
     
     if not allowed_file(file.filename):
-        return jsonify({'error': 'Format file tidak didukung'}), 400
+        return None, (jsonify({'error': 'Format file tidak didukung'}), 400)
+    
+    if mode not in ALLOWED_MODES or scale not in ALLOWED_SCALES or model_type not in ALLOWED_MODELS:
+        return None, (jsonify({'error': 'Mode, skala, atau model tidak valid'}), 400)
     
     filename = secure_filename(file.filename)
-    unique_id = str(uuid.uuid4())[:8]
     name, ext = os.path.splitext(filename)
+    ext = ext.lower()
+    if sinkron and ext in VIDEO_EXTENSIONS:
+        return None, (jsonify({'error': _PESAN_HANYA_JOBS}), 400)
+    data = file.read()
+    if sinkron and ext in ANIMATION_EXTENSIONS and _jumlah_frame(data) > 1:
+        return None, (jsonify({'error': _PESAN_HANYA_JOBS}), 400)
+    
+    if ext == '.webp':
+        # Output WebP animasi ditahan utuh sampai encode; tolak klip yang terlalu panjang di awal
+        try:
+            cek_batas_webp(_jumlah_frame(data))
+        except ValueError as e:
+            return None, (jsonify({'error': str(e)}), 400)
+    
+    cache_key = make_key(
+        data, ext=ext, mode=mode, scale=int(scale),
+        model_type=model_type, saturation_boost=SATURATION_BOOST
+    )
+    output_filename = result_cache.filename_for(cache_key, ext)
+    cached = result_cache.lookup(output_filename) is not None
+    
+    # Mode yang benar-benar dijalankan untuk hasil di cache ('auto' disimpan saat commit)
+    resolved_mode = None
+    if cached:
+        resolved_mode = result_cache.meta(output_filename).get('mode') or (mode if mode != 'auto' else None)
+    
+    input_path = None
+    if not cached:
+        unique_id = str(uuid.uuid4())[:8]
+        input_path = os.path.join(INPUT_DIR, f"{name}_{unique_id}_input{ext}")
+        with open(input_path, 'wb') as f:
+            f.write(data)
+    
+    # Termasuk parsing multipart oleh werkzeug, yang terjadi saat request.files diakses
+    STAGE_LATENCY.observe(time.perf_counter() - g.request_start, stage='upload', mode=mode, scale=int(scale))
+    
+    return {
+        'input_path': input_path,
+        'output_file': output_filename,
+        'cache_key': cache_key,
+        'cached': cached,
+        'resolved_mode': resolved_mode,
+        'mode': mode,
+        'scale': int(scale),
+        'model_type': model_type,
+    }, None
+
+
+def _submit_job(params, progres=False):
+    """
+    Masukkan upload ke antrian job (atau langsung selesai bila cache hit).
+    progres: kirim preview dan progres per tile selama berjalan (gambar diam
+    saja; lihat /jobs/<id>/events).
+    """
+    meta = {
+        'output_file': params['output_file'],
+        'mode': params['mode'],
+        'scale': params['scale'],
+        'cached': params['cached'],
+    }
+    if params['cached']:
+        return job_manager.add_finished(meta=meta)
+    
+    output_file = params['output_file']
+    temp_path = result_cache.temp_path_for(output_file)
+    
+    ext = os.path.splitext(output_file)[1]
+    # Video/GIF/WebP (bisa animasi) lewat proses_gambar -> video_pipeline, bukan micro-batch still
+    animasi = ext in VIDEO_EXTENSIONS or ext in ANIMATION_EXTENSIONS
+    
+    batch = {}
+    if params['mode'] == 'colorize' and not animasi:
+        batch = {
+            'batch_task': 'image_enhancer:warnai_batch',
+            'batch_args': {'model_type': params['model_type'], 'saturation_boost': SATURATION_BOOST},
+        }
+    
+    try:
+        return job_manager.submit(
+            'image_enhancer:proses_gambar',
+            meta=meta,
+            cleanup=[params['input_path'], temp_path],
+            dedup_key=params['cache_key'],
+            timeout=VIDEO_TIMEOUT if ext in VIDEO_EXTENSIONS else None,
+            on_success=lambda result: result_cache.commit(output_file, temp_path, meta={'mode': result['mode']}),
+            input_path=params['input_path'],
+            output_path=temp_path,
+            mode=params['mode'],
+            scale=params['scale'],
+            model_type=params['model_type'],
+            saturation_boost=SATURATION_BOOST,
+            progres=progres,
+            **batch
+        )
+    except JobQueueFull:
+        os.remove(params['input_path'])
+        raise
+
+
+def _respon_antrian_penuh(e):
+    response = jsonify({'error': 'Server sedang sibuk, coba lagi nanti'})
+    response.status_code = 429
+    response.headers['Retry-After'] = str(e.retry_after)
+    return response
+
+
+@app.route('/process', methods=['POST'])
+def process_image():
+    params, error_response = _terima_upload(sinkron=True)
+    if error_response:
+        return error_response
     
-    input_filename = f"{name}_{unique_id}_input{ext}"
-    output_filename = f"{name}_{unique_id}_output{ext}"
+    try:
+        job = _submit_job(params)
+    except JobQueueFull as e:
+        return _respon_antrian_penuh(e)
+    
+    job.wait()
     
-    input_path = os.path.join(INPUT_DIR, input_filename)
-    output_path = os.path.join(OUTPUT_DIR, output_filename)
+    if job.status != DONE:
+        return jsonify({'error': job.run.error or 'Proses dibatalkan'}), 500
     
-    file.save(input_path)
+    return jsonify({
+        'success': True,
+        'output_file': params['output_file'],
+        # Mode yang benar-benar dijalankan (berbeda untuk 'auto'); cache hit memakai
+        # mode yang disimpan bersama hasil
+        'mode': job.run.result['mode'] if job.run.result is not None else params['resolved_mode'],
+        'message': 'Gambar berhasil diproses!'
+    })
+
+
+def _terima_upload_stream():
+    """
+    Upload untuk /process/stream, dibaca langsung ke memori (tidak ke INPUT_DIR).
+    Menerima multipart (seperti /process) atau body mentah dengan parameter di
+    query string dan format dari Content-Type.
     
-    script_path = os.path.join(SCRIPT_DIR, "image_enhancer.py")
+    Returns:
+        (params, None) bila valid, atau (None, response_error)
+    """
+    if request.mimetype == 'multipart/form-data':
+        if 'file' not in request.files or request.files['file'].filename == '':
+            return None, (jsonify({'error': 'Tidak ada file yang diupload'}), 400)
+        file = request.files['file']
+        ext = os.path.splitext(file.filename)[1].lower()
+        # Video/GIF lewat /jobs (pipeline frame butuh file dan waktu lama)
+        if ext not in CONTENT_TYPES:
+            return None, (jsonify({'error': 'Format file tidak didukung'}), 400)
+        data = file.read()
+        args = request.form
+    else:
+        ext = {v: k for k, v in CONTENT_TYPES.items() if k != '.jpeg'}.get(request.mimetype)
+        if ext is None:
+            return None, (jsonify({'error': 'Format file tidak didukung'}), 400)
+        data = request.get_data(cache=False)
+        if not data:
+            return None, (jsonify({'error': 'Tidak ada file yang diupload'}), 400)
+        args = request.args
     
-    cmd = [
-        "python",
-        script_path,
-        input_path,
-        output_path,
-        "--mode",
-        mode,
-        "--scale",
-        scale
-    ]
+    mode = args.get('mode', 'enhance')
+    scale = args.get('scale', '4')
+    model_type = args.get('model', DEFAULT_MODEL)
+    if mode not in ALLOWED_MODES or scale not in ALLOWED_SCALES or model_type not in ALLOWED_MODELS:
+        return None, (jsonify({'error': 'Mode, skala, atau model tidak valid'}), 400)
     
+    # Key sama dengan /process, jadi cache hasil dipakai bersama
+    cache_key = make_key(
+        data, ext=ext, mode=mode, scale=int(scale),
+        model_type=model_type, saturation_boost=SATURATION_BOOST
+    )
+    STAGE_LATENCY.observe(time.perf_counter() - g.request_start, stage='upload', mode=mode, scale=int(scale))
+    
+    return {
+        'data': data,
+        'ext': ext,
+        'output_file': result_cache.filename_for(cache_key, ext),
+        'cache_key': cache_key,
+        'mode': mode,
+        'scale': int(scale),
+        'model_type': model_type,
+    }, None
+
+
+def _simpan_cache_stream(output_file, data, meta=None):
+    """
+    Tulis hasil stream ke cache di thread terpisah (tidak menahan response).
+    File sementara unik per penulisan, jadi aman bila run /jobs atau stream lain
+    untuk isi yang sama sedang menulis hasil yang sama.
+    """
+    def tulis():
+        temp_path = result_cache.temp_path_for(output_file)
+        try:
+            with open(temp_path, 'wb') as f:
+                f.write(data)
+            result_cache.commit(output_file, temp_path, meta=meta)
+        except OSError as e:
+            print(f"[WARN] Gagal menyimpan hasil ke cache: {e}")
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+    
+    threading.Thread(target=tulis, daemon=True).start()
+
+
+def _stream_bytes(data):
+    view = memoryview(data)
+    for start in range(0, len(view), STREAM_CHUNK):
+        yield view[start:start + STREAM_CHUNK]
+
+
+@app.route(STREAM_PATH, methods=['POST'])
+def process_stream():
+    """
+    Jalur cepat sinkron tanpa disk: upload di-decode dari memori dan hasil
+    di-encode langsung ke body response (chunked). Hanya hasil untuk cache
+    yang ditulis ke OUTPUT_DIR.
+    """
+    params, error_response = _terima_upload_stream()
+    if error_response:
+        return error_response
+    
+    headers = {'X-AnjayHD-Output-File': params['output_file']}
+    if result_cache.lookup(params['output_file']) is not None:
+        response = send_file(result_cache.path_for(params['output_file']),
+                             mimetype=CONTENT_TYPES[params['ext']])
+        response.headers.update(headers, **{'X-AnjayHD-Cache': 'hit'})
+        return _catat_kirim(response)
+    
+    batch = {}
+    if params['mode'] == 'colorize':
+        batch = {
+            'batch_task': 'image_enhancer:warnai_batch',
+            'batch_args': {'model_type': params['model_type'], 'saturation_boost': SATURATION_BOOST},
+        }
+    
+    output_file = params['output_file']
     try:
-        result = subprocess.run(
-            cmd,
-            capture_output=True,
-            text=True,
-            cwd=SCRIPT_DIR,
-            timeout=300
+        job = job_manager.submit(
+            'image_enhancer:proses_bytes',
+            # Tidak digabung dengan job /process (hasilnya file, bukan bytes)
+            dedup_key=('stream', params['cache_key']),
+            on_success=lambda result: _simpan_cache_stream(output_file, result['data'], {'mode': result['mode']}),
+            input_data=params.pop('data'),
+            ext=params['ext'],
+            mode=params['mode'],
+            scale=params['scale'],
+            model_type=params['model_type'],
+            saturation_boost=SATURATION_BOOST,
+            **batch
         )
-        
-        if result.returncode != 0:
-            error_msg = result.stderr if result.stderr else result.stdout
-            return jsonify({'error': f'Proses gagal: {error_msg}'}), 500
-        
-        if not os.path.exists(output_path):
-            error_msg = result.stdout if result.stdout else "File output tidak ditemukan"
-            return jsonify({'error': f'Gagal: {error_msg}'}), 500
-        
-        return jsonify({
-            'success': True,
-            'output_file': output_filename,
-            'message': 'Gambar berhasil diproses!'
-        })
-        
-    except subprocess.TimeoutExpired:
-        return jsonify({'error': 'Proses timeout (terlalu lama)'}), 500
-    except Exception as e:
-        return jsonify({'error': str(e)}), 500
-    finally:
-        if os.path.exists(input_path):
-            os.remove(input_path)
+    except JobQueueFull as e:
+        return _respon_antrian_penuh(e)
+    
+    job.wait()
+    data = job.run.result['data'] if job.status == DONE else None
+    error = job.run.error
+    job_manager.discard(job.id)
+    
+    if data is None:
+        return jsonify({'error': error or 'Proses dibatalkan'}), 500
+    
+    # Tanpa Content-Length: dikirim dengan chunked transfer encoding
+    response = Response(_stream_bytes(data), mimetype=CONTENT_TYPES[params['ext']])
+    response.headers.update(headers, **{'X-AnjayHD-Cache': 'miss'})
+    return _catat_kirim(response)
+
+
+@app.route('/jobs', methods=['POST'])
+def create_job():
+    params, error_response = _terima_upload()
+    if error_response:
+        return error_response
+    
+    try:
+        job = _submit_job(params, progres=PREVIEW)
+    except JobQueueFull as e:
+        return _respon_antrian_penuh(e)
+    
+    data = _status_job(job.id)
+    data['status_url'] = url_for('job_status', job_id=job.id)
+    data['events_url'] = url_for('job_events', job_id=job.id)
+    return jsonify(data), 202
+
+
+def _status_job(job_id):
+    """Status job untuk client; flag preview diganti URL-nya."""
+    data = job_manager.status(job_id)
+    if data is not None and data.pop('preview', False):
+        data['preview_url'] = url_for('job_preview', job_id=job_id)
+    return data
+
+
+@app.route('/jobs/stats', methods=['GET'])
+def job_stats():
+    data = job_manager.batch_stats.snapshot()
+    data.update({
+        'queue_depth': job_manager.queue_depth(),
+        'running': job_manager.running,
+        'coalesced': job_manager.coalesced,
+        'batch_window_ms': job_manager.batch_window * 1000.,
+        'max_batch': job_manager.max_batch,
+        'cache': result_cache.stats(),
+    })
+    return jsonify(data)
+
+
+@app.route('/jobs/<job_id>', methods=['GET'])
+def job_status(job_id):
+    data = _status_job(job_id)
+    if data is None:
+        return jsonify({'error': 'Job tidak ditemukan'}), 404
+    return jsonify(data)
+
+
+@app.route('/jobs/<job_id>/events', methods=['GET'])
+def job_events(job_id):
+    """
+    Server-Sent Events: satu event berisi status job (sama dengan GET /jobs/<id>)
+    setiap kali status, posisi antrian, progres, atau preview berubah. Stream
+    ditutup setelah job selesai. Client tanpa EventSource cukup polling status.
+    """
+    data = _status_job(job_id)
+    if data is None:
+        return jsonify({'error': 'Job tidak ditemukan'}), 404
+    
+    # Generator berjalan setelah view selesai (di luar request context)
+    preview_url = url_for('job_preview', job_id=job_id)
+    
+    def stream():
+        sent = None
+        version = job_manager.watch()
+        while True:
+            data = job_manager.status(job_id)
+            if data is None:
+                return
+            if data.pop('preview', False):
+                data['preview_url'] = preview_url
+            if data != sent:
+                yield f"data: {json.dumps(data)}\n\n"
+                sent = data
+            if data['status'] in FINISHED:
+                return
+            new_version = job_manager.watch(version, timeout=EVENTS_KEEPALIVE)
+            if new_version == version:
+                yield ": keep-alive\n\n"
+            version = new_version
+    
+    return Response(stream(), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+
+@app.route('/jobs/<job_id>/preview', methods=['GET'])
+def job_preview(job_id):
+    """Preview murah (JPEG) job yang masih berjalan; 404 bila belum ada atau job sudah selesai."""
+    data = job_manager.preview(job_id)
+    if data is None:
+        return jsonify({'error': 'Preview tidak tersedia'}), 404
+    return Response(data, mimetype='image/jpeg', headers={'Cache-Control': 'no-store'})
+
+
+@app.route('/jobs/<job_id>/cancel', methods=['POST'])
+@app.route('/jobs/<job_id>', methods=['DELETE'])
+def cancel_job(job_id):
+    if job_manager.cancel(job_id) is None:
+        return jsonify({'error': 'Job tidak ditemukan'}), 404
+    return jsonify(_status_job(job_id))
+
+
+@app.route('/healthz', methods=['GET'])
+def healthz():
+    """Liveness: proses server hidup (tidak menunggu warm-up)."""
+    return jsonify({'status': 'ok'})
+
+
+@app.route('/readyz', methods=['GET'])
+def readyz():
+    """
+    Readiness: 200 setelah warm-up awal berhasil (minimal satu worker) selama
+    masih ada worker hidup; restart worker karena cancel/timeout tidak membuat 503.
+    """
+    pool = get_pool()
+    ready = pool.ready()
+    data = {
+        'status': 'ready' if ready else 'warming_up',
+        'workers': pool.worker_status(),
+        'restarts': pool.restarts,
+    }
+    return jsonify(data), 200 if ready else 503
+
+
+@app.route('/metrics', methods=['GET'])
+def metrics_endpoint():
+    """Metrik dalam format teks Prometheus (tidak memulai worker pool)."""
+    return Response(metrics.render(), content_type=CONTENT_TYPE)
 
 
 @app.route('/download/<filename>')
 def download_file(filename):
-    return send_file(
+    result_cache.touch(filename)
+    return _catat_kirim(send_file(
         os.path.join(OUTPUT_DIR, filename),
         as_attachment=True,
         download_name=f"anjayhd_{filename}"
-    )
+    ))
 
 
 @app.route('/preview/<filename>')
 def preview_file(filename):
-    return send_file(
+    return _catat_kirim(send_file(
         os.path.join(OUTPUT_DIR, filename)
-    )
+    ))
 
 
 if __name__ == '__main__':
+    # Reloader debug menjalankan file ini dua kali; worker (dan warm-up-nya)
+    # cukup dimulai di proses yang benar-benar melayani request.
+    if os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        get_pool()
     app.run(debug=True, host='0.0.0.0', port=5000)
@@ -0,0 +1,175 @@
+"""
+Benchmark Jalur Luma vs Warnai lalu SR
+Membandingkan kualitas dan waktu mode both: urutan sekarang (warnai di
+resolusi input lalu SR RGB) melawan jalur luma (SR hanya abu-abu, ab
+diperbesar bilinear atau guided ke resolusi akhir).
+
+Setiap foto berwarna referensi dipakai sebagai ground truth resolusi tinggi.
+Input dibuat dengan memperkecil foto --scale kali lalu dijadikan abu-abu.
+Sumber ab:
+- oracle : ab asli foto pada grid 256x256 (colorizer "sempurna"), sehingga
+           yang diukur murni efek urutan SR dan cara upsample ab (default, offline)
+- model  : colorizer sungguhan (butuh bobot di registry)
+
+Metrik terhadap ground truth (rata-rata per foto):
+- psnr_l   : PSNR channel L (detail luma hasil SR)
+- delta_e  : rata-rata CIE76 delta-E (Lab)
+- delta_ab : rata-rata error chroma (a, b)
+- sr_ms / total_ms : waktu SR dan total pipeline
+
+Usage:
+    python benchmarks/luma_sr.py --images foto_berwarna/ --scale 4
+    python benchmarks/luma_sr.py --images sakura.png --ab model --save luma.json
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(SCRIPT_DIR)
+sys.path.insert(0, REPO_DIR)
+
+PATHS = ('warnai_lalu_sr', 'luma_bilinear', 'luma_guided')
+
+
+def _lab(img_bgr):
+    import cv2
+    import numpy as np
+
+    return cv2.cvtColor(img_bgr.astype(np.float32) / 255., cv2.COLOR_BGR2Lab)
+
+
+def _strips_ke_bgr(strips, height, width):
+    import numpy as np
+
+    out = np.empty((height, width, 3), dtype=np.uint8)
+    for rows, strip in strips:
+        out[rows] = strip[:, :, ::-1]
+    return out
+
+
+def siapkan(path, scale):
+    """Ground truth BGR (dipotong ke kelipatan scale) dan input abu-abu kecil (BGR 3 channel)."""
+    import cv2
+
+    gt = cv2.imread(path)
+    if gt is None:
+        raise ValueError(f"Tidak dapat membaca gambar: {path}")
+    h, w = (gt.shape[0] // scale) * scale, (gt.shape[1] // scale) * scale
+    gt = gt[:h, :w]
+    small = cv2.resize(gt, (w // scale, h // scale), interpolation=cv2.INTER_AREA)
+    gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+    return gt, small, cv2.cvtColor(gray, cv2.COLOR_GRAY2BGR)
+
+
+def prediksi_ab(small, img_bw, source, model_type):
+    """ab 2 x 256 x 256, thumbnail L (panduan guided), dan saturation boost yang dipakai."""
+    import numpy as np
+    from colorizers import predict_ab
+    from colorizers.util import resize_img, rgb_to_l
+
+    thumb_bw = resize_img(img_bw, HW=(256, 256))[:, :, ::-1]
+    guide = rgb_to_l(thumb_bw)
+    if source == 'oracle':
+        thumb = np.ascontiguousarray(resize_img(small, HW=(256, 256)))
+        return _lab(thumb)[:, :, 1:].transpose(2, 0, 1), guide, 1.0
+    return predict_ab([thumb_bw], model_type=model_type)[0], guide, 1.3
+
+
+def jalankan(path_name, img_bw, out_ab, guide, boost, scale):
+    """Satu jalur mode both; hasil BGR dan waktu (ms)."""
+    import cv2
+    from colorizers.util import iter_postprocess_strips
+    from sr_engine import get_upscaler
+
+    upscaler = get_upscaler(scale=scale, luma=path_name != 'warnai_lalu_sr')
+    start = time.perf_counter()
+    if path_name == 'warnai_lalu_sr':
+        colored = _strips_ke_bgr(iter_postprocess_strips(img_bw, out_ab, boost, bgr=True), *img_bw.shape[:2])
+        t = time.perf_counter()
+        out = upscaler(colored)
+        sr_ms = (time.perf_counter() - t) * 1000
+    else:
+        gray = cv2.cvtColor(img_bw, cv2.COLOR_BGR2GRAY)
+        t = time.perf_counter()
+        luma = upscaler.upscale_gray(gray)
+        sr_ms = (time.perf_counter() - t) * 1000
+        strips = iter_postprocess_strips(luma, out_ab, boost, guide=guide if path_name == 'luma_guided' else None)
+        out = _strips_ke_bgr(strips, *luma.shape)
+    return out, {'sr_ms': round(sr_ms, 1), 'total_ms': round((time.perf_counter() - start) * 1000, 1)}
+
+
+def ukur_kualitas(out, gt_lab):
+    import numpy as np
+
+    lab = _lab(out)
+    mse_l = float(np.mean((lab[:, :, 0] - gt_lab[:, :, 0]) ** 2))
+    diff = lab - gt_lab
+    return {
+        'psnr_l': round(10 * np.log10(100. ** 2 / max(mse_l, 1e-10)), 3),
+        'delta_e': round(float(np.sqrt((diff ** 2).sum(axis=2)).mean()), 3),
+        'delta_ab': round(float(np.sqrt((diff[:, :, 1:] ** 2).sum(axis=2)).mean()), 3),
+    }
+
+
+def cari_file(paths):
+    from image_enhancer import IMAGE_EXTENSIONS
+
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files.extend(sorted(os.path.join(path, name) for name in os.listdir(path)
+                                if name.lower().endswith(IMAGE_EXTENSIONS)))
+        else:
+            files.append(path)
+    return files
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Kualitas jalur luma vs warnai lalu SR (mode both)')
+    parser.add_argument('--images', nargs='+', default=[os.path.join(REPO_DIR, 'sakura.png')],
+                        help='Foto berwarna referensi (file atau folder)')
+    parser.add_argument('--scale', type=int, default=4, choices=[2, 3, 4])
+    parser.add_argument('--ab', type=str, default='oracle', choices=['oracle', 'model'],
+                        help='Sumber ab: oracle (ab asli 256x256) atau model colorizer')
+    parser.add_argument('--model', type=str, default='siggraph17', choices=['eccv16', 'siggraph17'])
+    parser.add_argument('--paths', nargs='+', default=list(PATHS), choices=PATHS)
+    parser.add_argument('--save', type=str, default=None, help='Simpan hasil ke file JSON')
+
+    args = parser.parse_args()
+
+    import numpy as np
+    from sr_engine import get_upscaler
+
+    # Muat model dan panaskan kedua varian (RGB dan luma) di luar pengukuran waktu
+    warm = np.zeros((32, 32), dtype=np.uint8)
+    get_upscaler(scale=args.scale)(warm)
+    get_upscaler(scale=args.scale, luma=True).upscale_gray(warm)
+
+    per_image = {}
+    for path in cari_file(args.images):
+        gt, small, img_bw = siapkan(path, args.scale)
+        gt_lab = _lab(gt)
+        out_ab, guide, boost = prediksi_ab(small, img_bw, args.ab, args.model)
+        results = {}
+        for path_name in args.paths:
+            out, timing = jalankan(path_name, img_bw, out_ab, guide, boost, args.scale)
+            results[path_name] = dict(ukur_kualitas(out, gt_lab), **timing)
+        per_image[os.path.basename(path)] = results
+        print(f"[INFO] {os.path.basename(path)} {gt.shape[1]}x{gt.shape[0]} selesai", file=sys.stderr)
+
+    metrics = ('psnr_l', 'delta_e', 'delta_ab', 'sr_ms', 'total_ms')
+    summary = {p: {m: round(float(np.mean([r[p][m] for r in per_image.values()])), 3) for m in metrics}
+               for p in args.paths}
+    print(f"{'jalur':<16}" + ''.join(f"{m:>11}" for m in metrics))
+    for path_name, row in summary.items():
+        print(f"{path_name:<16}" + ''.join(f"{row[m]:>11.2f}" for m in metrics))
+
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump({'scale': args.scale, 'ab': args.ab, 'summary': summary, 'images': per_image}, f, indent=2)
+        print(f"[INFO] Hasil disimpan ke: {args.save}")
@@ -0,0 +1,254 @@
+"""
+Benchmark Per Tahap
+Mengukur waktu tiap tahap pipeline pada gambar sintetis dengan resolusi
+bertingkat (default 0.3 - 50 MP). Bobot model diinisialisasi acak, jadi bisa
+dijalankan offline tanpa registry maupun folder models/.
+
+Tahap (median dari --repeat kali, ms):
+- decode                  : baca_gambar (cv2.imread dari file --format)
+- cek_gambar_hitam_putih  : deteksi grayscale
+- preprocess_img          : resize 256x256 + konversi L (input RGB)
+- forward_eccv16/siggraph17 : forward model pada input 256x256 per batch size
+                            (tidak tergantung resolusi, diukur sekali)
+- postprocess_tens        : L asli + ab 256x256 -> RGB float32
+- postprocess_tens_uint8  : idem, langsung uint8 (jalur produksi)
+- adjust_saturation       : HSV saturation boost
+- sr                      : TiledUpscaler (SRVGG/RRDB acak), hanya sampai --sr-max-mp
+- encode                  : simpan_gambar (cv2.imwrite ke --format)
+
+Usage:
+    python benchmarks/stages.py --save stages.json
+    python benchmarks/stages.py --mp 0.3 1 4 --stages decode encode --repeat 5
+    python benchmarks/stages.py --baseline stages.json --tolerance 0.2   # exit 1 bila regresi
+"""
+
+import argparse
+import json
+import math
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(SCRIPT_DIR)
+sys.path.insert(0, REPO_DIR)
+
+DEFAULT_MP = (0.3, 1, 4, 12, 25, 50)
+FORWARD_STAGES = ('forward_eccv16', 'forward_siggraph17')
+STAGES = ('decode', 'cek_gambar_hitam_putih', 'preprocess_img') + FORWARD_STAGES + (
+    'postprocess_tens', 'postprocess_tens_uint8', 'adjust_saturation', 'sr', 'encode')
+
+
+def ukur(fn, repeat, max_seconds):
+    """Jalankan fn sampai repeat kali (berhenti lebih awal bila total > max_seconds)."""
+    times = []
+    start = time.perf_counter()
+    for _ in range(repeat):
+        t = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - t) * 1000)
+        if time.perf_counter() - start > max_seconds:
+            break
+    return {'ms': round(statistics.median(times), 3), 'min_ms': round(min(times), 3), 'runs': len(times)}
+
+
+def ukuran_untuk(mp):
+    """(lebar, tinggi) 4:3 dengan jumlah pixel ~mp megapixel."""
+    width = int(round(math.sqrt(mp * 1e6 * 4 / 3)))
+    return width, int(round(width * 3 / 4))
+
+
+def buat_gambar(mp, seed=0):
+    """Foto hitam putih sintetis (gradien, pola, dan noise) sebagai BGR uint8 3 channel."""
+    import numpy as np
+
+    width, height = ukuran_untuk(mp)
+    rng = np.random.default_rng(seed)
+    rows = (np.sin(np.arange(height, dtype=np.float32) / 37.0) * 50).astype(np.float32)
+    cols = (np.cos(np.arange(width, dtype=np.float32) / 23.0) * 40
+            + np.linspace(0, 60, width, dtype=np.float32)).astype(np.float32)
+    gray = rows[:, None] + cols[None, :]
+    gray += 90
+    gray += rng.integers(0, 16, size=(height, width), dtype=np.uint8)
+    np.clip(gray, 0, 255, out=gray)
+    gray = gray.astype(np.uint8)
+    return np.repeat(gray[:, :, None], 3, axis=2)
+
+
+def bench_resolusi(mp, stages, args, tmp):
+    """Semua tahap yang tergantung resolusi untuk satu ukuran gambar."""
+    import cv2
+    import torch
+    import image_enhancer
+    from colorizers.util import adjust_saturation, postprocess_tens, postprocess_tens_uint8, preprocess_img
+
+    img = buat_gambar(mp)
+    height, width = img.shape[:2]
+    path = os.path.join(tmp, f"bench.{args.format}")
+    image_enhancer.simpan_gambar(path, img)
+    img_rgb = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
+    tens_orig_l, _ = preprocess_img(img_rgb)
+    out_ab = torch.randn(1, 2, 256, 256, generator=torch.Generator().manual_seed(0)) * 20
+
+    fns = {
+        'decode': lambda: image_enhancer.baca_gambar(path),
+        'cek_gambar_hitam_putih': lambda: image_enhancer.cek_gambar_hitam_putih(img),
+        'preprocess_img': lambda: preprocess_img(img_rgb),
+        'postprocess_tens': lambda: postprocess_tens(tens_orig_l, out_ab),
+        'postprocess_tens_uint8': lambda: postprocess_tens_uint8(tens_orig_l, out_ab),
+        'adjust_saturation': lambda: adjust_saturation(img_rgb, 1.3),
+        'encode': lambda: image_enhancer.simpan_gambar(os.path.join(tmp, f"out.{args.format}"), img),
+    }
+    if 'sr' in stages and mp <= args.sr_max_mp:
+        upscaler = _upscaler(args.sr_scale)
+        fns['sr'] = lambda: upscaler(img)
+
+    results = {}
+    for stage in stages:
+        if stage in fns:
+            results[stage] = dict(ukur(fns[stage], args.repeat, args.max_seconds), width=width, height=height)
+    return results
+
+
+_upscaler_cache = {}
+
+
+def _upscaler(scale):
+    """TiledUpscaler dengan model SR bobot acak."""
+    if scale not in _upscaler_cache:
+        import torch
+        from sr_engine import DEFAULT_MODEL, TiledUpscaler, build_sr_model
+
+        torch.manual_seed(0)
+        _upscaler_cache[scale] = TiledUpscaler(build_sr_model(DEFAULT_MODEL).eval(), scale=scale)
+    return _upscaler_cache[scale]
+
+
+def bench_forward(stages, batch_sizes, args):
+    """Forward colorizer (bobot acak) pada input L 256x256 per batch size."""
+    import torch
+    from colorizers.eccv16 import eccv16
+    from colorizers.siggraph17 import siggraph17
+
+    factories = {'forward_eccv16': eccv16, 'forward_siggraph17': siggraph17}
+    results = {}
+    for stage in stages:
+        if stage not in factories:
+            continue
+        torch.manual_seed(0)
+        model = factories[stage](pretrained=False).eval()
+        results[stage] = {}
+        for n in batch_sizes:
+            tens = torch.rand(n, 1, 256, 256) * 100
+            with torch.no_grad():
+                model(tens)
+                point = ukur(lambda: model(tens), args.repeat, args.max_seconds)
+            results[stage][f"b{n}"] = dict(point, batch=n, ms_per_image=round(point['ms'] / n, 3))
+    return results
+
+
+def label_mp(mp):
+    return f"{mp:g}MP"
+
+
+def bandingkan(results, baseline, tolerance, min_delta_ms):
+    """
+    Daftar regresi: titik (tahap, ukuran) yang lebih lambat dari
+    baseline * (1 + tolerance) dan selisihnya lebih dari min_delta_ms.
+    """
+    regressions = []
+    base_results = baseline.get('results', {})
+    for stage, points in results.items():
+        for label, point in points.items():
+            base = base_results.get(stage, {}).get(label)
+            if base is None:
+                continue
+            delta = point['ms'] - base['ms']
+            if point['ms'] > base['ms'] * (1 + tolerance) and delta > min_delta_ms:
+                regressions.append(f"{stage}@{label}: {point['ms']:.1f} ms > {base['ms']:.1f} ms "
+                                   f"(+{(point['ms'] / base['ms'] - 1) * 100:.0f}%)")
+    return regressions
+
+
+def cetak_tabel(results, labels):
+    print(f"{'tahap (ms)':<24}" + ''.join(f"{label:>11}" for label in labels))
+    for stage, points in results.items():
+        cells = ''.join(f"{points[label]['ms']:>11.1f}" if label in points else f"{'-':>11}" for label in labels)
+        print(f"{stage:<24}{cells}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark per tahap dengan sweep resolusi')
+    parser.add_argument('--mp', nargs='+', type=float, default=list(DEFAULT_MP),
+                        help='Ukuran gambar sintetis dalam megapixel')
+    parser.add_argument('--stages', nargs='+', default=list(STAGES), choices=STAGES)
+    parser.add_argument('--batch-sizes', nargs='+', type=int, default=[1, 8],
+                        help='Batch size untuk tahap forward')
+    parser.add_argument('--format', type=str, default='png', choices=['png', 'jpg', 'webp'],
+                        help='Format file untuk decode/encode')
+    parser.add_argument('--sr-scale', type=int, default=4, choices=[2, 3, 4])
+    parser.add_argument('--sr-max-mp', type=float, default=1.0,
+                        help='Resolusi maksimum untuk tahap SR (CPU, lambat)')
+    parser.add_argument('--threads', type=int, default=None, help='Thread torch/cv2 (default: bawaan)')
+    parser.add_argument('--repeat', type=int, default=3, help='Jumlah pengukuran per titik (median)')
+    parser.add_argument('--max-seconds', type=float, default=20.0,
+                        help='Berhenti mengulang satu titik setelah sekian detik')
+    parser.add_argument('--save', type=str, default=None, help='Simpan hasil ke file JSON')
+    parser.add_argument('--baseline', type=str, default=None, help='Bandingkan dengan hasil JSON sebelumnya')
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help='Batas perlambatan relatif terhadap baseline (default: 0.25)')
+    parser.add_argument('--min-delta-ms', type=float, default=2.0,
+                        help='Selisih absolut minimum agar dihitung regresi (abaikan noise)')
+
+    args = parser.parse_args()
+
+    import torch
+
+    if args.threads:
+        import cv2  # noqa: F401 (configure_threads hanya mengatur modul yang sudah termuat)
+        import cpu_scheduler
+        cpu_scheduler.configure_threads(args.threads)
+
+    results = {stage: {} for stage in args.stages}
+    with tempfile.TemporaryDirectory() as tmp:
+        for mp in args.mp:
+            t = time.perf_counter()
+            for stage, point in bench_resolusi(mp, args.stages, args, tmp).items():
+                results[stage][label_mp(mp)] = point
+            print(f"[INFO] {label_mp(mp)} selesai ({time.perf_counter() - t:.1f} detik)", file=sys.stderr)
+    results.update(bench_forward(args.stages, args.batch_sizes, args))
+    results = {stage: points for stage, points in results.items() if points}
+
+    cetak_tabel({s: p for s, p in results.items() if s not in FORWARD_STAGES}, [label_mp(mp) for mp in args.mp])
+    if any(s in results for s in FORWARD_STAGES):
+        print()
+        cetak_tabel({s: p for s, p in results.items() if s in FORWARD_STAGES}, [f"b{n}" for n in args.batch_sizes])
+
+    report = {
+        'python': sys.version.split()[0],
+        'torch': torch.__version__,
+        'machine': platform.machine(),
+        'threads': torch.get_num_threads(),
+        'format': args.format,
+        'repeat': args.repeat,
+        'sr_scale': args.sr_scale,
+        'results': results,
+    }
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"[INFO] Hasil disimpan ke: {args.save}")
+
+    if args.baseline:
+        with open(args.baseline, 'r') as f:
+            baseline = json.load(f)
+        if baseline.get('threads') != report['threads']:
+            print(f"[WARN] Jumlah thread berbeda dari baseline ({baseline.get('threads')} vs {report['threads']})")
+        regressions = bandingkan(results, baseline, args.tolerance, args.min_delta_ms)
+        for line in regressions:
+            print(f"[REGRESI] {line}")
+        sys.exit(1 if regressions else 0)
@@ -0,0 +1,166 @@
+"""
+Benchmark Cold Start CLI
+Mengukur waktu import dan inferensi pertama untuk tiap mode image_enhancer,
+masing-masing di proses Python baru (seperti job cron satu gambar).
+
+Per mode dicatat (median dari --repeat kali):
+- process_ms : total proses anak, dari spawn sampai exit
+- import_ms  : `import image_enhancer`
+- first_ms   : proses_gambar pertama (import lazy + load model + inferensi)
+- warm_ms    : proses_gambar kedua di proses yang sama (inferensi saja)
+- modules    : dependensi berat yang termuat setelah job pertama
+
+Usage:
+    python benchmarks/startup.py
+    python benchmarks/startup.py --modes enhance --backend ncnn --repeat 5
+    python benchmarks/startup.py --save hasil.json
+    python benchmarks/startup.py --baseline hasil.json --tolerance 0.2   # exit 1 bila regresi
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(SCRIPT_DIR)
+
+MODES = ('enhance', 'colorize', 'both')
+HEAVY_MODULES = ('torch', 'cv2', 'numpy', 'PIL', 'skimage')
+METRICS = ('process_ms', 'import_ms', 'first_ms', 'warm_ms')
+
+
+def _child(mode, input_path, backend, scale):
+    """Dijalankan di proses anak; hasil dicetak sebagai satu baris JSON di stdout."""
+    out = sys.stdout
+    sys.stdout = sys.stderr  # log [INFO] dari image_enhancer tidak mengotori hasil
+
+    start = time.perf_counter()
+    sys.path.insert(0, REPO_DIR)
+    import image_enhancer
+    import_ms = (time.perf_counter() - start) * 1000
+    after_import = [m for m in HEAVY_MODULES if m in sys.modules]
+
+    timings = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for i in range(2):
+            output_path = os.path.join(tmp, f"out{i}.png")
+            t = time.perf_counter()
+            image_enhancer.proses_gambar(input_path, output_path, mode=mode, scale=scale, backend=backend)
+            timings.append((time.perf_counter() - t) * 1000)
+
+    result = {
+        'import_ms': import_ms,
+        'first_ms': timings[0],
+        'warm_ms': timings[1],
+        'modules_after_import': after_import,
+        'modules': [m for m in HEAVY_MODULES if m in sys.modules],
+    }
+    if mode != 'enhance':
+        colorizers = sys.modules.get('colorizers')
+        result['colorizer_loaded'] = bool(colorizers and colorizers._colorizer_cache)
+    out.write(json.dumps(result) + '\n')
+
+
+def _buat_input(path, size):
+    """Gambar uji grayscale (gradien + pola) agar mode colorize benar-benar jalan."""
+    import numpy as np
+    from PIL import Image
+
+    yy, xx = np.mgrid[0:size, 0:size]
+    img = (127 + 60 * np.sin(xx / 11.0) + 60 * np.cos(yy / 17.0)).clip(0, 255).astype(np.uint8)
+    Image.fromarray(img).save(path)
+
+
+def jalankan(mode, input_path, backend, scale, repeat):
+    runs = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        proc = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), '--child', mode, input_path,
+             '--backend', backend, '--scale', str(scale)],
+            capture_output=True, text=True, cwd=REPO_DIR)
+        process_ms = (time.perf_counter() - start) * 1000
+        if proc.returncode != 0:
+            raise RuntimeError(f"Mode {mode} gagal:\n{proc.stderr}")
+        run = json.loads(proc.stdout.strip().splitlines()[-1])
+        run['process_ms'] = process_ms
+        runs.append(run)
+
+    summary = {key: statistics.median(run[key] for run in runs) for key in METRICS}
+    summary['modules_after_import'] = runs[-1]['modules_after_import']
+    summary['modules'] = runs[-1]['modules']
+    if 'colorizer_loaded' in runs[-1]:
+        summary['colorizer_loaded'] = runs[-1]['colorizer_loaded']
+    return summary
+
+
+def bandingkan(results, baseline, tolerance):
+    """Daftar regresi: metrik yang lebih lambat dari baseline * (1 + tolerance)."""
+    regressions = []
+    for mode, summary in results.items():
+        base = baseline.get('results', {}).get(mode)
+        if base is None:
+            continue
+        for key in METRICS:
+            if key in base and summary[key] > base[key] * (1 + tolerance):
+                regressions.append(f"{mode}.{key}: {summary[key]:.1f} ms > {base[key]:.1f} ms "
+                                   f"(+{(summary[key] / base[key] - 1) * 100:.0f}%)")
+        new_modules = set(summary['modules_after_import']) - set(base.get('modules_after_import', []))
+        if new_modules:
+            regressions.append(f"{mode}: import baru saat startup: {', '.join(sorted(new_modules))}")
+    return regressions
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark cold start image_enhancer per mode')
+    parser.add_argument('--child', nargs=2, metavar=('MODE', 'INPUT'), help=argparse.SUPPRESS)
+    parser.add_argument('--modes', nargs='+', default=list(MODES), choices=MODES)
+    parser.add_argument('--backend', type=str, default='torch', choices=['auto', 'ncnn', 'torch'],
+                        help='Backend super resolution (default: torch)')
+    parser.add_argument('--scale', type=int, default=2, choices=[2, 4])
+    parser.add_argument('--size', type=int, default=128, help='Sisi gambar uji (pixel)')
+    parser.add_argument('--repeat', type=int, default=3, help='Jumlah proses per mode (median)')
+    parser.add_argument('--save', type=str, default=None, help='Simpan hasil ke file JSON')
+    parser.add_argument('--baseline', type=str, default=None, help='Bandingkan dengan hasil JSON sebelumnya')
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help='Batas perlambatan relatif terhadap baseline (default: 0.25)')
+
+    args = parser.parse_args()
+
+    if args.child:
+        _child(args.child[0], args.child[1], args.backend, args.scale)
+        sys.exit(0)
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        input_path = os.path.join(tmp, 'startup_input.png')
+        _buat_input(input_path, args.size)
+        for mode in args.modes:
+            results[mode] = jalankan(mode, input_path, args.backend, args.scale, args.repeat)
+
+    print(f"{'mode':<10}{'process':>10}{'import':>10}{'first':>10}{'warm':>10}  modul saat import")
+    for mode, s in results.items():
+        print(f"{mode:<10}{s['process_ms']:>10.1f}{s['import_ms']:>10.1f}{s['first_ms']:>10.1f}"
+              f"{s['warm_ms']:>10.1f}  {','.join(s['modules_after_import']) or '-'}")
+        if s.get('colorizer_loaded') is False:
+            print(f"[WARN] {mode}: bobot colorizer tidak tersedia, angka colorize tidak representatif")
+
+    report = {'python': sys.version.split()[0], 'backend': args.backend, 'scale': args.scale,
+              'size': args.size, 'repeat': args.repeat, 'results': results}
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"[INFO] Hasil disimpan ke: {args.save}")
+
+    if args.baseline:
+        with open(args.baseline, 'r') as f:
+            regressions = bandingkan(results, json.load(f), args.tolerance)
+        for line in regressions:
+            print(f"[REGRESI] {line}")
+        sys.exit(1 if regressions else 0)
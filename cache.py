@@ -0,0 +1,171 @@
+"""
+Cache Hasil (content-addressed)
+Hasil proses disimpan di OUTPUT_DIR dengan nama yang diturunkan dari hash
+isi file input + parameter proses (mode, scale, model, saturation_boost).
+Upload ulang foto yang sama langsung dilayani dari disk.
+
+Cache juga menjadi pengelola OUTPUT_DIR: total ukuran file dibatasi oleh
+byte budget, dan file yang paling lama tidak diakses (LRU) dihapus lebih dulu.
+
+Info kecil tentang hasil (mis. mode yang dipilih --mode auto) disimpan di file
+pendamping <nama>.meta.json, ikut dihapus bersama hasilnya.
+"""
+
+import collections
+import hashlib
+import json
+import os
+import threading
+import uuid
+
+
+DEFAULT_MAX_BYTES = int(float(os.environ.get('ANJAYHD_CACHE_MB', '2048')) * 1024 * 1024)
+
+_TMP_MARKER = '.tmp'
+_META_SUFFIX = '.meta.json'
+
+
+def make_key(data: bytes, **params) -> str:
+    """Hash sha256 dari isi file input + parameter proses."""
+    h = hashlib.sha256(data)
+    h.update(json.dumps(params, sort_keys=True).encode('utf-8'))
+    return h.hexdigest()
+
+
+class ResultCache:
+    """Cache file hasil dengan byte budget dan eviksi LRU."""
+
+    def __init__(self, directory, max_bytes=None):
+        self.directory = directory
+        self.max_bytes = DEFAULT_MAX_BYTES if max_bytes is None else max_bytes
+        self.hits = 0
+        self.misses = 0
+
+        self._entries = collections.OrderedDict()
+        self._meta = {}
+        self._total = 0
+        self._lock = threading.Lock()
+
+        os.makedirs(directory, exist_ok=True)
+        self._scan()
+        self._evict()
+
+    def _scan(self):
+        """Bangun index LRU dari isi folder (urut mtime), hapus sisa file sementara."""
+        files = []
+        metas = []
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            if not os.path.isfile(path):
+                continue
+            if _TMP_MARKER in name:
+                os.remove(path)
+                continue
+            if name.endswith(_META_SUFFIX):
+                metas.append(name)
+                continue
+            st = os.stat(path)
+            files.append((st.st_mtime, name, st.st_size))
+
+        for _, name, size in sorted(files):
+            self._entries[name] = size
+            self._total += size
+
+        for meta_name in metas:
+            name = meta_name[:-len(_META_SUFFIX)]
+            path = self.path_for(meta_name)
+            try:
+                if name not in self._entries:
+                    raise ValueError("hasil sudah tidak ada")
+                with open(path) as f:
+                    self._meta[name] = json.load(f)
+            except (OSError, ValueError):
+                os.remove(path)
+
+    @staticmethod
+    def filename_for(key, ext):
+        return f"{key[:24]}_output{ext}"
+
+    def path_for(self, filename):
+        return os.path.join(self.directory, filename)
+
+    def temp_path_for(self, filename):
+        """
+        Path file sementara baru untuk satu penulisan hasil. Unik per panggilan:
+        run /jobs dan /process/stream untuk isi yang sama bisa menulis bersamaan,
+        dan yang terakhir commit menang. Ekstensi tetap di akhir (penentu format).
+        """
+        name, ext = os.path.splitext(filename)
+        return os.path.join(self.directory, f"{name}{_TMP_MARKER}{uuid.uuid4().hex[:8]}{ext}")
+
+    def lookup(self, filename):
+        """Kembalikan path hasil bila ada di cache (dan tandai sebagai baru diakses)."""
+        with self._lock:
+            path = self.path_for(filename)
+            if filename in self._entries and os.path.exists(path):
+                self._entries.move_to_end(filename)
+                os.utime(path)
+                self.hits += 1
+                return path
+            self.misses += 1
+            return None
+
+    def commit(self, filename, temp_path, meta=None):
+        """
+        Pindahkan hasil dari file sementara ke cache, lalu jalankan eviksi.
+        meta: dict kecil (bisa di-JSON) yang disimpan bersama hasil, lihat meta().
+        """
+        path = self.path_for(filename)
+        meta_path = self.path_for(filename + _META_SUFFIX)
+        if meta:
+            # Sementara unik: commit lain untuk hasil yang sama bisa berjalan bersamaan
+            meta_temp = f"{meta_path}{_TMP_MARKER}{uuid.uuid4().hex[:8]}"
+            with open(meta_temp, 'w') as f:
+                json.dump(meta, f)
+            os.replace(meta_temp, meta_path)
+        elif os.path.exists(meta_path):
+            os.remove(meta_path)
+        os.replace(temp_path, path)
+        size = os.path.getsize(path)
+        with self._lock:
+            self._total -= self._entries.pop(filename, 0)
+            self._entries[filename] = size
+            self._total += size
+            if meta:
+                self._meta[filename] = dict(meta)
+            else:
+                self._meta.pop(filename, None)
+            self._evict()
+        return path
+
+    def meta(self, filename):
+        """Info yang disimpan bersama hasil saat commit (dict kosong bila tidak ada)."""
+        with self._lock:
+            return dict(self._meta.get(filename, {}))
+
+    def touch(self, filename):
+        """Tandai file sebagai baru diakses (mis. saat di-download)."""
+        with self._lock:
+            if filename in self._entries:
+                self._entries.move_to_end(filename)
+
+    def _evict(self):
+        while self._total > self.max_bytes and len(self._entries) > 1:
+            name, size = self._entries.popitem(last=False)
+            self._total -= size
+            for path in (self.path_for(name), self.path_for(name + _META_SUFFIX)):
+                if os.path.exists(path):
+                    os.remove(path)
+            self._meta.pop(name, None)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'bytes': self._total,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': self.hits / lookups if lookups else 0.0,
+            }
@@ -1,22 +1,89 @@
-from .base_color import *
-from .eccv16 import eccv16
-from .siggraph17 import siggraph17
-from .util import *
+"""
+Colorizer ECCV16 / SIGGRAPH17.
 
-import torch
-import numpy as np
-from PIL import Image
+Paket ini lazy: `import colorizers` tidak memuat torch, PIL, maupun modul
+generator. Nama-nama dari submodul (eccv16, siggraph17, BaseColor, fungsi di
+util, ...) baru diimport saat pertama kali diakses.
+"""
 
+import importlib
+import os
+import sys
+import types
+
+
+# Urutan pencarian nama; isinya sama dengan star-import lama (base_color,
+# eccv16, siggraph17, util).
+_SUBMODULES = ('util', 'base_color', 'eccv16', 'siggraph17')
+
+# Submodul eccv16/siggraph17 bernama sama dengan fungsi factory-nya.
+_FACTORIES = ('eccv16', 'siggraph17')
+
+
+class _LazyPackage(types.ModuleType):
+    def __setattr__(self, name, value):
+        # Import submodul menulis colorizers.<nama> = <modul>; untuk eccv16 dan
+        # siggraph17 pertahankan fungsi factory seperti `from .eccv16 import eccv16`.
+        if name in _FACTORIES and isinstance(value, types.ModuleType):
+            value = getattr(value, name)
+        super().__setattr__(name, value)
+
+
+sys.modules[__name__].__class__ = _LazyPackage
+
+
+def __getattr__(name):
+    """Cari nama publik di submodul (setara `from .util import *` dkk, tapi lazy)."""
+    if not name.startswith('_'):
+        for sub in _SUBMODULES:
+            module = importlib.import_module(f'.{sub}', __name__)
+            if hasattr(module, name):
+                value = getattr(module, name)
+                globals()[name] = value
+                return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+COLORIZER_PRECISION = os.environ.get('ANJAYHD_COLORIZER_PRECISION', 'fp32')
+COLORIZER_BACKEND = os.environ.get('ANJAYHD_COLORIZER_BACKEND', 'torch')
 
 _colorizer_cache = {}
 
 
-def get_colorizer(model_type='eccv16', device='cpu'):
-    """Get or create cached colorizer model."""
-    cache_key = f"{model_type}_{device}"
+def get_colorizer(model_type='eccv16', device='cpu', precision=None, backend=None):
+    """
+    Get or create cached colorizer model.
+
+    precision: 'fp32' atau 'int8' (model terkuantisasi, CPU saja; lihat
+    colorizers/quantize.py). Default dari ANJAYHD_COLORIZER_PRECISION.
+    backend: 'torch' atau 'onnx' (ONNX Runtime, fp32 CPU saja; lihat
+    colorizers/onnx_backend.py). Default dari ANJAYHD_COLORIZER_BACKEND.
+    """
+    precision = precision or COLORIZER_PRECISION
+    backend = backend or COLORIZER_BACKEND
+    cache_key = f"{model_type}_{device}_{precision}_{backend}"
     
     if cache_key not in _colorizer_cache:
-        if model_type == 'eccv16':
+        from .eccv16 import eccv16
+        from .siggraph17 import siggraph17
+        
+        if backend == 'onnx':
+            if precision != 'fp32':
+                raise ValueError("Backend onnx hanya tersedia untuk precision 'fp32'")
+            if model_type not in ('eccv16', 'siggraph17'):
+                raise ValueError(f"Unknown model type: {model_type}")
+            from .onnx_backend import load_onnx
+            model = load_onnx(model_type)
+        elif backend != 'torch':
+            raise ValueError(f"Unknown backend: {backend}")
+        elif precision == 'int8':
+            if device != 'cpu':
+                raise ValueError("Model int8 hanya tersedia untuk device 'cpu'")
+            from .quantize import load_quantized
+            model = load_quantized(model_type)
+        elif precision != 'fp32':
+            raise ValueError(f"Unknown precision: {precision}")
+        elif model_type == 'eccv16':
             model = eccv16(pretrained=True)
         elif model_type == 'siggraph17':
             model = siggraph17(pretrained=True)
@@ -30,6 +97,17 @@ def get_colorizer(model_type='eccv16', device='cpu'):
     return _colorizer_cache[cache_key]
 
 
+def _load_rgb(img_path):
+    import numpy as np
+    from .util import load_img
+    
+    if isinstance(img_path, str):
+        return load_img(img_path)
+    elif isinstance(img_path, np.ndarray):
+        return img_path
+    raise ValueError("img_path must be string path or numpy array")
+
+
 def colorize_image(img_path, model_type='siggraph17', device='cpu', saturation_boost=1.3):
     """
     Colorize a grayscale image using the specified model.
@@ -43,27 +121,15 @@ def colorize_image(img_path, model_type='siggraph17', device='cpu', saturation_b
     Returns:
         PIL Image of the colorized image
     """
-    if isinstance(img_path, str):
-        img_rgb = load_img(img_path)
-    elif isinstance(img_path, np.ndarray):
-        img_rgb = img_path
-    else:
-        raise ValueError("img_path must be string path or numpy array")
+    import numpy as np
+    from PIL import Image
     
-    if img_rgb.ndim == 2:
-        img_rgb = np.tile(img_rgb[:, :, None], 3)
-    
-    model = get_colorizer(model_type, device)
+    img_rgb = _load_rgb(img_path)
     
-    tens_orig_l, tens_rs_l = preprocess_img(img_rgb, HW=(256, 256))
-    tens_orig_l = tens_orig_l.to(device)
-    tens_rs_l = tens_rs_l.to(device)
-    
-    with torch.no_grad():
-        out_ab = model(tens_rs_l)
-    
-    result = postprocess_tens(tens_orig_l, out_ab, saturation_boost=saturation_boost)
-    result = np.clip(result * 255, 0, 255).astype(np.uint8)
+    result = np.empty(img_rgb.shape[:2] + (3,), dtype=np.uint8)
+    for rows, strip in colorize_strips(img_rgb, model_type=model_type, device=device,
+                                       saturation_boost=saturation_boost):
+        result[rows] = strip
     
     return Image.fromarray(result)
 
@@ -71,3 +137,160 @@ def colorize_image(img_path, model_type='siggraph17', device='cpu', saturation_b
 def colorize_image_siggraph(img_path, device='cpu', saturation_boost=1.3):
     """Colorize using SIGGRAPH17 model (better quality + saturation boost)."""
     return colorize_image(img_path, model_type='siggraph17', device=device, saturation_boost=saturation_boost)
+
+
+def iter_colorize_batch(images, model_type='siggraph17', batch_size=8, device='cpu',
+                        saturation_boost=1.3, num_workers=None):
+    """
+    Generator version of colorize_batch: yields one PIL Image per input, in order,
+    so very long inputs (e.g. a directory of scans) are never held in memory at once.
+    """
+    import itertools
+    from concurrent.futures import ThreadPoolExecutor
+    
+    import numpy as np
+    import torch
+    from PIL import Image
+    from .util import iter_postprocess_strips, resize_img, rgb_to_l
+    
+    model = get_colorizer(model_type, device)
+    images = iter(images)
+    # Ikuti jumlah thread torch (ukuran slot CPU worker), bukan jumlah core mesin
+    num_workers = num_workers or torch.get_num_threads()
+
+    def prepare(img):
+        # L resolusi penuh tidak disimpan per gambar; dihitung per strip saat finish
+        img_rgb = _load_rgb(img)
+        tens_rs_l = torch.from_numpy(rgb_to_l(resize_img(img_rgb, HW=(256, 256))))[None, None]
+        return img_rgb, tens_rs_l
+
+    with ThreadPoolExecutor(max_workers=num_workers) as executor:
+        while True:
+            chunk = list(itertools.islice(images, batch_size))
+            if not chunk:
+                break
+
+            prepped = list(executor.map(prepare, chunk))
+            tens_rs_l = torch.cat([tens_rs for _, tens_rs in prepped]).to(device)
+
+            with torch.no_grad():
+                out_ab = model(tens_rs_l).cpu()
+
+            def finish(i):
+                img_rgb = prepped[i][0]
+                result = np.empty(img_rgb.shape[:2] + (3,), dtype=np.uint8)
+                for rows, strip in iter_postprocess_strips(img_rgb, out_ab[i], saturation_boost=saturation_boost):
+                    result[rows] = strip
+                return Image.fromarray(result)
+
+            yield from executor.map(finish, range(len(chunk)))
+
+
+def predict_ab(images, model_type='siggraph17', batch_size=8, device='cpu', bgr=False):
+    """
+    Run only the colorizer forward pass and return the raw ab predictions.
+
+    The result can be combined with any full-resolution L channel through
+    util.postprocess_lab, e.g. to reuse one prediction for several nearly
+    identical video frames.
+
+    Args:
+        images: list of RGB numpy arrays (or paths)
+        bgr: numpy inputs are BGR (cv2) instead of RGB
+
+    Returns:
+        list of float32 numpy arrays (2 x 256 x 256), in input order
+    """
+    import numpy as np
+    import torch
+    from .util import resize_img, rgb_to_l
+
+    def thumbnail(img):
+        # Resize bekerja per channel, jadi thumbnail BGR cukup dibalik setelah
+        # diperkecil (tanpa salinan RGB resolusi penuh)
+        thumb = resize_img(_load_rgb(img), HW=(256, 256))
+        if bgr and isinstance(img, np.ndarray) and thumb.ndim == 3:
+            thumb = thumb[:, :, ::-1]
+        return thumb
+
+    model = get_colorizer(model_type, device)
+    results = []
+    for start in range(0, len(images), batch_size):
+        chunk = images[start:start + batch_size]
+        # Hanya L 256x256 yang dibutuhkan; L resolusi penuh dihitung saat postprocess
+        img_l = np.stack([rgb_to_l(thumbnail(img)) for img in chunk])
+        tens_rs_l = torch.from_numpy(img_l)[:, None].to(device)
+        with torch.no_grad():
+            out_ab = model(tens_rs_l).cpu().numpy()
+        results.extend(out_ab)
+    return results
+
+
+def colorize_strips(img, model_type='siggraph17', device='cpu', saturation_boost=1.3,
+                    strip_rows=256, bgr=False, luma=None, guided=False, out_ab=None):
+    """
+    Colorize a (very large) image as a stream of horizontal RGB strips.
+
+    The forward pass runs right away on a 256x256 thumbnail; the returned
+    generator then produces the full-resolution result strip by strip, so
+    no full-resolution L, ab or float RGB buffer is ever allocated. Write the
+    strips into an output buffer or feed them to a streaming encoder.
+
+    Args:
+        img: numpy array (H x W x 3 uint8, RGB or BGR if bgr=True, or H x W grayscale)
+        model_type: 'eccv16' or 'siggraph17'
+        device: 'cpu' or 'cuda'
+        saturation_boost: factor to boost color saturation
+        strip_rows: rows per strip
+        bgr: input channel order is BGR (cv2)
+        luma: optional grayscale uint8 image of the same scene at another
+            resolution (e.g. img super-resolved); its L is used instead of
+            the L of img, and the strips come out at its size
+        guided: with luma, upsample ab by guided filtering against its L
+            instead of bilinear (see util.guided_ab_coeffs)
+        out_ab: ab already predicted for img by predict_ab (e.g. for a
+            preview); the forward pass is skipped
+
+    Returns:
+        generator of (rows, strip): rows is a slice, strip uint8 RGB
+    """
+    from .util import iter_postprocess_strips, resize_img, rgb_to_l
+
+    thumb = None
+    if out_ab is None or (luma is not None and guided):
+        # Resize bekerja per channel, jadi thumbnail BGR cukup dibalik setelah
+        # diperkecil (tanpa salinan RGB resolusi penuh)
+        thumb = resize_img(img, HW=(256, 256))
+        if bgr and thumb.ndim == 3:
+            thumb = thumb[:, :, ::-1]
+    if out_ab is None:
+        out_ab = predict_ab([thumb], model_type=model_type, device=device)[0]
+    if luma is None:
+        return iter_postprocess_strips(img, out_ab, saturation_boost=saturation_boost,
+                                       strip_rows=strip_rows, bgr=bgr)
+    return iter_postprocess_strips(luma, out_ab, saturation_boost=saturation_boost, strip_rows=strip_rows,
+                                   guide=rgb_to_l(thumb) if guided else None)
+
+
+def colorize_batch(images, model_type='siggraph17', batch_size=8, device='cpu',
+                   saturation_boost=1.3, num_workers=None):
+    """
+    Colorize many images with batched forward passes.
+
+    Every image is reduced to a 256x256 L tensor, so up to batch_size inputs
+    are stacked into one forward call. Preprocessing and postprocessing run in
+    a thread pool, and each result is restored at its own original resolution.
+
+    Args:
+        images: iterable of paths or numpy arrays (any mix of sizes)
+        model_type: 'eccv16' or 'siggraph17'
+        batch_size: number of images per forward pass
+        device: 'cpu' or 'cuda'
+        saturation_boost: factor to boost color saturation
+        num_workers: threads for pre/postprocessing (default: torch.get_num_threads())
+
+    Returns:
+        list of PIL Images, in input order
+    """
+    return list(iter_colorize_batch(images, model_type=model_type, batch_size=batch_size, device=device,
+                                    saturation_boost=saturation_boost, num_workers=num_workers))
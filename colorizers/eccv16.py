@@ -1,6 +1,7 @@
 import torch
 import torch.nn as nn
 from .base_color import *
+from .registry import load_pretrained
 
 
 class ECCVGenerator(BaseColor):
@@ -94,22 +95,8 @@ class ECCVGenerator(BaseColor):
 
 
 def eccv16(pretrained=True):
-    model = ECCVGenerator()
     if pretrained:
-        import ssl
-        import urllib.request
-        import torch.utils.model_zoo as model_zoo
-        
-        # Create SSL context that doesn't verify certificates
-        ctx = ssl.create_default_context()
-        ctx.check_hostname = False
-        ctx.verify_mode = ssl.CERT_NONE
-        
-        # Custom opener that uses the SSL context
-        opener = urllib.request.build_opener(urllib.request.HTTPSHandler(context=ctx))
-        urllib.request.install_opener(opener)
-        
-        model.load_state_dict(model_zoo.load_url(
-            'https://colorizers.s3.us-east-2.amazonaws.com/colorization_release_v2-9b330a0b.pth',
-            map_location='cpu', check_hash=True))
-    return model
+        # Bobot dari registry lokal (colorizers/registry.py), dimuat via mmap;
+        # unduhan hanya bila ANJAYHD_ALLOW_DOWNLOAD=1.
+        return load_pretrained(ECCVGenerator, 'eccv16')
+    return ECCVGenerator()
@@ -0,0 +1,301 @@
+"""
+Ekspor ONNX + backend ONNX Runtime (CPU) untuk ECCVGenerator dan SIGGRAPHGenerator.
+
+Sebelum ekspor graph disederhanakan:
+- BatchNorm (norm_layer) dilipat ke conv sebelumnya. Di kedua generator urutannya
+  Conv -> ReLU -> BN, jadi |skala| BN masuk ke bobot/bias conv (ReLU(s*x) =
+  s*ReLU(x) untuk s >= 0) dan yang tersisa hanya penambahan bias per channel
+  (plus perkalian tanda bila ada skala negatif).
+- SIGGRAPH17 tanpa hint: input_B dan mask_B selalu nol, jadi concat 4 channel
+  dibuang dan conv pertama cukup memakai bobot channel L.
+
+Graph disimpan di folder registry sebagai <model>-fp32.onnx (batch dinamis) dengan
+bobot di file eksternal <model>-fp32.onnx.data, yang di-mmap oleh ONNX Runtime;
+keduanya didaftarkan di manifest (sha256). Backend dipilih lewat
+get_colorizer(model_type, backend='onnx') atau ANJAYHD_COLORIZER_BACKEND=onnx.
+Ekspor butuh paket onnx + onnxscript; runtime cukup onnxruntime.
+
+Usage:
+    python -m colorizers.onnx_backend export --model siggraph17
+    python -m colorizers.onnx_backend check --model siggraph17 --images foto_uji/ --json parity.json
+"""
+
+import argparse
+import copy
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+import warnings
+
+import numpy as np
+import torch
+import torch.nn as nn
+
+from .quantize import _fp32_model, input_tensors, list_images
+from .registry import default_registry
+
+
+OPSET = 18
+# Selisih maksimum ab (torch vs ONNX) yang masih dianggap lolos uji paritas
+PARITY_TOLERANCE = 0.05
+
+
+class _ChannelAffine(nn.Module):
+    """Sisa BatchNorm setelah dilipat: x * sign + shift per channel."""
+
+    def __init__(self, shift, sign=None):
+        super(_ChannelAffine, self).__init__()
+        self.register_buffer('shift', shift.view(1, -1, 1, 1))
+        self.register_buffer('sign', None if sign is None else sign.view(1, -1, 1, 1))
+
+    def forward(self, x):
+        if self.sign is not None:
+            x = x * self.sign
+        return x + self.shift
+
+
+def _fold(conv, bn):
+    scale = bn.weight / torch.sqrt(bn.running_var + bn.eps)
+    shift = bn.bias - bn.running_mean * scale
+    # Conv2d: bobot (out, in, kh, kw); ConvTranspose2d: (in, out, kh, kw)
+    dim = 1 if isinstance(conv, nn.ConvTranspose2d) else 0
+    shape = [1] * conv.weight.dim()
+    shape[dim] = -1
+    conv.weight.mul_(scale.abs().view(shape))
+    if conv.bias is not None:
+        conv.bias.mul_(scale.abs())
+    sign = None if bool((scale >= 0).all()) else torch.sign(scale)
+    return _ChannelAffine(shift, sign)
+
+
+def fold_batchnorm(net):
+    """Salinan net dengan setiap pola Conv -> ReLU -> BatchNorm2d dilipat."""
+    net = copy.deepcopy(net).eval()
+    with torch.no_grad():
+        for seq in net.modules():
+            if not isinstance(seq, nn.Sequential):
+                continue
+            for i in range(2, len(seq)):
+                conv, act, bn = seq[i - 2], seq[i - 1], seq[i]
+                if (isinstance(bn, nn.BatchNorm2d) and isinstance(act, nn.ReLU)
+                        and isinstance(conv, (nn.Conv2d, nn.ConvTranspose2d)) and conv.groups == 1):
+                    seq[i] = _fold(conv, bn)
+    return net
+
+
+class _ExportNet(nn.Module):
+    """Forward dengan input L saja; untuk SIGGRAPH17 conv pertama dipangkas ke channel L."""
+
+    def __init__(self, net):
+        super(_ExportNet, self).__init__()
+        from .siggraph17 import SIGGRAPHGenerator
+
+        self.net = net
+        self.unhinted = isinstance(net, SIGGRAPHGenerator)
+        if self.unhinted:
+            first = net.model1[0]
+            sliced = nn.Conv2d(1, first.out_channels, kernel_size=first.kernel_size, stride=first.stride,
+                               padding=first.padding, dilation=first.dilation, bias=first.bias is not None)
+            with torch.no_grad():
+                sliced.weight.copy_(first.weight[:, :1])
+                if first.bias is not None:
+                    sliced.bias.copy_(first.bias)
+            net.model1[0] = sliced
+
+    def forward(self, input_l):
+        if self.unhinted:
+            return self.net.decode(self.net.model1(self.net.normalize_l(input_l)))
+        return self.net(input_l)
+
+
+def onnx_name(model_type):
+    return f"{model_type}-fp32"
+
+
+def _data_name(name):
+    return f"{name}-data"
+
+
+def export(model_type, registry=default_registry, opset=OPSET):
+    """Ekspor model fp32 (BN dilipat, tanpa hint) ke ONNX di folder registry."""
+    net = _ExportNet(fold_batchnorm(_fp32_model(model_type))).eval()
+    batch = torch.export.Dim('batch')
+    with torch.no_grad(), warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        program = torch.onnx.export(net, (torch.zeros(2, 1, 256, 256),), input_names=['input_l'],
+                                    output_names=['out_ab'], dynamic_shapes=({0: batch},),
+                                    opset_version=opset, dynamo=True, verbose=False)
+    proto = program.model_proto
+    meta = {'model': model_type, 'source_sha256': registry.entry(model_type).get('sha256', '')}
+    for key, value in meta.items():
+        prop = proto.metadata_props.add()
+        prop.key, prop.value = key, value
+
+    import onnx
+
+    name = onnx_name(model_type)
+    filename = f"{name}.onnx"
+    os.makedirs(registry.directory, exist_ok=True)
+    # Tulis ke folder sementara lalu os.replace: file lama yang sedang di-mmap
+    # worker lain tidak ikut tertimpa
+    with tempfile.TemporaryDirectory(dir=registry.directory, prefix='.export') as tmp:
+        onnx.save(proto, os.path.join(tmp, filename), save_as_external_data=True,
+                  all_tensors_to_one_file=True, location=f"{filename}.data", size_threshold=1024)
+        for fname in (f"{filename}.data", filename):
+            os.replace(os.path.join(tmp, fname), os.path.join(registry.directory, fname))
+    registry.add(_data_name(name), os.path.join(registry.directory, f"{filename}.data"))
+    return registry.add(name, os.path.join(registry.directory, filename))
+
+
+class OnnxColorizer:
+    """
+    Colorizer di atas onnxruntime.InferenceSession dengan antarmuka seperti
+    modul torch: model(tens_l) -> tensor ab. Hanya CPU dan tanpa hint.
+    """
+
+    def __init__(self, path, threads=None):
+        try:
+            import onnxruntime as ort
+        except ImportError:
+            raise ImportError("Backend onnx butuh paket onnxruntime (pip install onnxruntime)")
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        # Tanpa arena, memori aktivasi dikembalikan setelah tiap run sehingga
+        # worker yang menganggur tidak menahan puncak batch terbesar
+        options.enable_cpu_mem_arena = False
+        options.enable_mem_pattern = False
+        # Ikuti jumlah thread torch di proses ini (diatur per worker)
+        options.intra_op_num_threads = threads or torch.get_num_threads()
+        self.path = path
+        self.session = ort.InferenceSession(path, options, providers=['CPUExecutionProvider'])
+        self.input_name = self.session.get_inputs()[0].name
+        self.metadata = dict(self.session.get_modelmeta().custom_metadata_map)
+
+    def __call__(self, input_l, input_B=None, mask_B=None):
+        if input_B is not None or mask_B is not None:
+            raise ValueError("Backend onnx hanya mendukung colorize tanpa hint")
+        arr = np.ascontiguousarray(input_l.detach().cpu().numpy(), dtype=np.float32)
+        return torch.from_numpy(self.session.run(None, {self.input_name: arr})[0])
+
+    def eval(self):
+        return self
+
+    def to(self, device):
+        if str(device) != 'cpu':
+            raise ValueError("Backend onnx hanya tersedia untuk device 'cpu'")
+        return self
+
+
+def load_onnx(model_type, registry=default_registry):
+    """Muat graph ONNX dari registry sebagai OnnxColorizer."""
+    name = onnx_name(model_type)
+    try:
+        path = registry.verify(name)
+        registry.verify(_data_name(name))
+    except KeyError:
+        raise FileNotFoundError(
+            f"Model ONNX {name} belum ada; jalankan "
+            f"'python -m colorizers.onnx_backend export --model {model_type}'")
+    model = OnnxColorizer(path)
+    source = registry.read_manifest().get(model_type, {}).get('sha256')
+    if source and model.metadata.get('source_sha256') not in ('', source):
+        print(f"[WARN] {name} diekspor dari bobot {model_type} yang berbeda; ekspor ulang disarankan")
+    return model
+
+
+def _latency_ms(model, tens, repeat=5):
+    with torch.no_grad():
+        model(tens)
+        times = []
+        for _ in range(repeat):
+            t = time.perf_counter()
+            model(tens)
+            times.append((time.perf_counter() - t) * 1000)
+    return statistics.median(times)
+
+
+def check(model_type, paths=None, batch_size=4, tolerance=PARITY_TOLERANCE, registry=default_registry):
+    """
+    Uji paritas ONNX vs torch fp32 (graph asli, tanpa lipatan) pada foto di
+    paths, atau pada input L acak bila paths kosong. Dijalankan per batch
+    batch_size sehingga dimensi batch dinamis ikut teruji.
+    """
+    if paths:
+        tensors = list(input_tensors(paths))
+    else:
+        gen = torch.Generator().manual_seed(0)
+        tensors = list(torch.rand(batch_size, 1, 1, 256, 256, generator=gen) * 100)
+    batches = [torch.cat(tensors[i:i + batch_size]) for i in range(0, len(tensors), batch_size)]
+
+    reference = _fp32_model(model_type)
+    model = load_onnx(model_type, registry)
+    max_abs, delta_e = 0., []
+    with torch.no_grad():
+        for tens in batches:
+            diff = reference(tens) - model(tens)
+            max_abs = max(max_abs, float(diff.abs().max()))
+            delta_e.append(diff.pow(2).sum(dim=1).sqrt().flatten().numpy())
+    delta_e = np.concatenate(delta_e)
+
+    return {
+        'model': model_type,
+        'images': len(tensors),
+        'batch_size': batch_size,
+        'threads': torch.get_num_threads(),
+        'max_abs_ab': round(max_abs, 5),
+        'delta_e': {'mean': round(float(delta_e.mean()), 5), 'max': round(float(delta_e.max()), 5)},
+        'latency_ms': {'torch': round(_latency_ms(reference, batches[0]), 2),
+                       'onnx': round(_latency_ms(model, batches[0]), 2)},
+        'tolerance': tolerance,
+        'passed': max_abs <= tolerance,
+    }
+
+
+def _print_check(data):
+    print(f"Model {data['model']} ({data['images']} input, batch {data['batch_size']}, {data['threads']} thread)")
+    print(f"Selisih ab maks: {data['max_abs_ab']:.5f} (batas {data['tolerance']}), "
+          f"delta-E mean {data['delta_e']['mean']:.5f}")
+    lat = data['latency_ms']
+    print(f"Latensi per batch: torch {lat['torch']:.1f} ms, onnx {lat['onnx']:.1f} ms "
+          f"({lat['torch'] / lat['onnx']:.2f}x)")
+    print('[INFO] Paritas OK' if data['passed'] else '[ERROR] Paritas gagal')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Ekspor ONNX dan backend ONNX Runtime colorizer')
+    sub = parser.add_subparsers(dest='command', required=True)
+    for cmd in ('export', 'check'):
+        p = sub.add_parser(cmd)
+        p.add_argument('--model', type=str, default='siggraph17', choices=['eccv16', 'siggraph17'])
+    sub.choices['export'].add_argument('--opset', type=int, default=OPSET)
+    p_check = sub.choices['check']
+    p_check.add_argument('--images', type=str, default=None, help='Folder foto uji (default: input acak)')
+    p_check.add_argument('--limit', type=int, default=None, help='Maksimal jumlah foto')
+    p_check.add_argument('--batch-size', type=int, default=4)
+    p_check.add_argument('--tolerance', type=float, default=PARITY_TOLERANCE)
+    p_check.add_argument('--json', type=str, default=None, help='Simpan hasil ke file JSON')
+
+    args = parser.parse_args()
+
+    try:
+        if args.command == 'export':
+            start = time.time()
+            path = export(args.model, opset=args.opset)
+            print(f"[INFO] Ekspor selesai ({time.time() - start:.1f} detik): {path}")
+            data = check(args.model)
+        else:
+            paths = list_images(args.images, args.limit) if args.images else None
+            data = check(args.model, paths, args.batch_size, args.tolerance)
+        _print_check(data)
+        if getattr(args, 'json', None):
+            with open(args.json, 'w') as f:
+                json.dump(data, f, indent=2)
+            print(f"[INFO] Hasil disimpan ke: {args.json}")
+        sys.exit(0 if data['passed'] else 1)
+    except (FileNotFoundError, ImportError, ValueError) as e:
+        print(f"[ERROR] {e}")
+        sys.exit(1)
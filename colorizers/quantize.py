@@ -0,0 +1,294 @@
+"""
+Kuantisasi int8 (static, post-training) untuk ECCVGenerator dan SIGGRAPHGenerator.
+
+Kedua generator hampir seluruhnya Conv2d/ConvTranspose2d. Kuantisasi dinamis
+PyTorch hanya berlaku untuk Linear/RNN, jadi yang dipakai adalah kuantisasi
+static FX graph mode: skala aktivasi diambil dari kalibrasi atas sampel foto,
+bobot per-channel int8. Lapisan keluaran yang sensitif (softmax + proyeksi ab
+ECCV16, model_out SIGGRAPH17) tetap fp32.
+
+Model int8 disimpan sebagai TorchScript (hasil trace) di folder registry,
+<model>-int8-<backend>.pt, dan didaftarkan di manifest registry (dengan
+sha256). Load tidak perlu membangun ulang graph FX maupun kerangka fp32, jadi
+cepat dan tidak menyisakan salinan bobot fp32 di memori. Model dipilih lewat
+get_colorizer(model_type, precision='int8') atau ANJAYHD_COLORIZER_PRECISION=int8.
+Jalur int8 hanya mendukung colorize tanpa hint (input L saja) di CPU.
+
+Usage:
+    python -m colorizers.quantize calibrate --model siggraph17 --images foto_bw/
+    python -m colorizers.quantize report --model siggraph17 --images foto_uji/ --json laporan.json
+"""
+
+import argparse
+import copy
+import io
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+import warnings
+
+import numpy as np
+import torch
+import torch.nn as nn
+
+from .registry import default_registry
+
+
+QUANT_BACKEND = os.environ.get('ANJAYHD_QUANT_BACKEND', 'x86')
+PRECISIONS = ('fp32', 'int8')
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.webp', '.bmp', '.tif', '.tiff')
+
+# Modul yang tetap fp32 (nama relatif terhadap _Unhinted)
+_FP32_MODULES = {
+    'eccv16': ('net.softmax', 'net.model_out', 'net.upsample4'),
+    'siggraph17': ('net.model_out',),
+}
+
+
+class _Unhinted(nn.Module):
+    """Forward dengan input L saja; argumen hint SIGGRAPH17 (None) ikut dilipat saat tracing."""
+
+    def __init__(self, net):
+        super(_Unhinted, self).__init__()
+        self.net = net
+
+    def forward(self, input_l):
+        return self.net(input_l)
+
+
+def _fp32_model(model_type, pretrained=True):
+    from .eccv16 import eccv16
+    from .siggraph17 import siggraph17
+
+    factories = {'eccv16': eccv16, 'siggraph17': siggraph17}
+    if model_type not in factories:
+        raise ValueError(f"Unknown model type: {model_type}")
+    return factories[model_type](pretrained=pretrained).eval()
+
+
+def _prepare(model_type, net, backend):
+    from torch.ao.quantization import get_default_qconfig_mapping
+    from torch.ao.quantization.quantize_fx import prepare_fx
+
+    torch.backends.quantized.engine = backend
+    qconfig_mapping = get_default_qconfig_mapping(backend)
+    for name in _FP32_MODULES[model_type]:
+        qconfig_mapping = qconfig_mapping.set_module_name(name, None)
+    example = (torch.zeros(1, 1, 256, 256),)
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        return prepare_fx(_Unhinted(net).eval(), qconfig_mapping, example)
+
+
+def _convert(prepared):
+    from torch.ao.quantization.quantize_fx import convert_fx
+
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        return convert_fx(prepared).eval()
+
+
+def list_images(directory, limit=None):
+    paths = sorted(os.path.join(directory, name) for name in os.listdir(directory)
+                   if name.lower().endswith(IMAGE_EXTENSIONS))
+    if not paths:
+        raise FileNotFoundError(f"Tidak ada gambar di {directory}")
+    return paths[:limit] if limit else paths
+
+
+def input_tensors(paths):
+    """Tensor L 1x1x256x256 (input model) per gambar."""
+    from .util import load_img, preprocess_img
+
+    for path in paths:
+        yield preprocess_img(load_img(path), HW=(256, 256))[1]
+
+
+def quantize(model_type, calibration_paths, backend=QUANT_BACKEND):
+    """Kalibrasi model fp32 dengan sampel foto lalu konversi ke int8."""
+    fp32 = copy.deepcopy(_fp32_model(model_type))
+    prepared = _prepare(model_type, fp32, backend)
+    with torch.no_grad():
+        for tens in input_tensors(calibration_paths):
+            prepared(tens)
+    return _convert(prepared)
+
+
+def quantized_name(model_type, backend=QUANT_BACKEND):
+    return f"{model_type}-int8-{backend}"
+
+
+def save_quantized(qmodel, model_type, backend=QUANT_BACKEND, registry=default_registry, meta=None):
+    """Simpan model int8 (TorchScript) ke folder registry dan catat sha256-nya di manifest."""
+    name = quantized_name(model_type, backend)
+    os.makedirs(registry.directory, exist_ok=True)
+    path = os.path.join(registry.directory, f"{name}.pt")
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with torch.no_grad(), warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        scripted = torch.jit.trace(qmodel, torch.zeros(1, 1, 256, 256))
+    extra = {'meta.json': json.dumps(dict(meta or {}, model=model_type, backend=backend))}
+    torch.jit.save(scripted, tmp_path, _extra_files=extra)
+    os.replace(tmp_path, path)
+    return registry.add(name, path)
+
+
+def load_quantized(model_type, backend=QUANT_BACKEND, registry=default_registry):
+    """Muat model int8 (TorchScript) dari registry."""
+    name = quantized_name(model_type, backend)
+    try:
+        path = registry.verify(name)
+    except KeyError:
+        raise FileNotFoundError(
+            f"Model int8 {name} belum ada; jalankan "
+            f"'python -m colorizers.quantize calibrate --model {model_type} --images <folder>'")
+    torch.backends.quantized.engine = backend
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        return torch.jit.load(path, map_location='cpu').eval()
+
+
+def _model_bytes(model):
+    buf = io.BytesIO()
+    if isinstance(model, torch.jit.ScriptModule):
+        torch.jit.save(model, buf)
+    else:
+        torch.save(model.state_dict(), buf)
+    return buf.tell()
+
+
+def _latency_ms(model, tensors, repeat=3):
+    with torch.no_grad():
+        model(tensors[0])
+        times = []
+        for tens in tensors:
+            for _ in range(repeat):
+                t = time.perf_counter()
+                model(tens)
+                times.append((time.perf_counter() - t) * 1000)
+    return statistics.median(times)
+
+
+def _rss_mb(model_type, precision):
+    """
+    RSS (di atas baseline setelah import torch) untuk load + satu forward, di
+    proses terpisah: {'rss_mb': setelah selesai, 'peak_rss_mb': puncak}.
+    """
+    proc = subprocess.run([sys.executable, '-m', 'colorizers.quantize', '_rss', model_type, precision],
+                          capture_output=True, text=True,
+                          cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    if proc.returncode != 0:
+        return {'rss_mb': None, 'peak_rss_mb': None}
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def _proc_status_kb(field):
+    # Dari /proc (bukan ru_maxrss, yang di Linux ikut terbawa lewat exec dari parent)
+    with open('/proc/self/status') as f:
+        for line in f:
+            if line.startswith(field + ':'):
+                return int(line.split()[1])
+    raise OSError(f"{field} tidak tersedia")
+
+
+def _rss_child(model_type, precision):
+    import gc
+
+    base = _proc_status_kb('VmRSS')
+    model = load_quantized(model_type) if precision == 'int8' else _fp32_model(model_type)
+    with torch.no_grad():
+        model(torch.zeros(1, 1, 256, 256))
+    gc.collect()
+    print(json.dumps({
+        'rss_mb': round((_proc_status_kb('VmRSS') - base) / 1024, 1),
+        'peak_rss_mb': round((_proc_status_kb('VmHWM') - base) / 1024, 1),
+    }))
+
+
+def report(model_type, paths, backend=QUANT_BACKEND):
+    """
+    Bandingkan fp32 vs int8: latensi forward, ukuran model, puncak RSS, dan
+    delta-E (CIE76) di Lab. L identik di kedua jalur, jadi delta-E = jarak ab.
+    """
+    tensors = list(input_tensors(paths))
+    fp32 = _fp32_model(model_type)
+    int8 = load_quantized(model_type, backend)
+
+    delta_e = []
+    with torch.no_grad():
+        for tens in tensors:
+            diff = fp32(tens) - int8(tens)
+            delta_e.append(diff.pow(2).sum(dim=1).sqrt().flatten().numpy())
+    delta_e = np.concatenate(delta_e)
+
+    rows = {}
+    for precision, model in (('fp32', fp32), ('int8', int8)):
+        rows[precision] = {
+            'latency_ms': round(_latency_ms(model, tensors), 2),
+            'model_mb': round(_model_bytes(model) / 1e6, 2),
+            **_rss_mb(model_type, precision),
+        }
+    return {
+        'model': model_type,
+        'backend': backend,
+        'images': len(paths),
+        'threads': torch.get_num_threads(),
+        'results': rows,
+        'speedup': round(rows['fp32']['latency_ms'] / rows['int8']['latency_ms'], 2),
+        'delta_e': {
+            'mean': round(float(delta_e.mean()), 3),
+            'p95': round(float(np.percentile(delta_e, 95)), 3),
+            'max': round(float(delta_e.max()), 3),
+        },
+    }
+
+
+def _print_report(data):
+    print(f"Model {data['model']} ({data['backend']}, {data['images']} gambar, {data['threads']} thread)")
+    print(f"{'presisi':<8}{'latensi ms':>12}{'model MB':>10}{'RSS MB':>10}{'puncak MB':>11}")
+    for precision, row in data['results'].items():
+        rss, peak = ('-' if row[k] is None else f"{row[k]:.1f}" for k in ('rss_mb', 'peak_rss_mb'))
+        print(f"{precision:<8}{row['latency_ms']:>12.1f}{row['model_mb']:>10.1f}{rss:>10}{peak:>11}")
+    de = data['delta_e']
+    print(f"Speedup int8: {data['speedup']:.2f}x")
+    print(f"Delta-E (CIE76, ab): mean {de['mean']:.2f}, p95 {de['p95']:.2f}, max {de['max']:.2f}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Kuantisasi int8 colorizer')
+    sub = parser.add_subparsers(dest='command', required=True)
+    for cmd in ('calibrate', 'report'):
+        p = sub.add_parser(cmd)
+        p.add_argument('--model', type=str, default='siggraph17', choices=['eccv16', 'siggraph17'])
+        p.add_argument('--images', type=str, required=True, help='Folder foto sampel')
+        p.add_argument('--limit', type=int, default=None, help='Maksimal jumlah foto')
+        p.add_argument('--backend', type=str, default=QUANT_BACKEND, help='Engine kuantisasi (x86/fbgemm/qnnpack)')
+    sub.choices['report'].add_argument('--json', type=str, default=None, help='Simpan laporan ke file JSON')
+    p_rss = sub.add_parser('_rss')
+    p_rss.add_argument('model')
+    p_rss.add_argument('precision')
+
+    args = parser.parse_args()
+
+    try:
+        if args.command == '_rss':
+            _rss_child(args.model, args.precision)
+        elif args.command == 'calibrate':
+            paths = list_images(args.images, args.limit)
+            start = time.time()
+            qmodel = quantize(args.model, paths, args.backend)
+            path = save_quantized(qmodel, args.model, args.backend,
+                                  meta={'calibration_images': len(paths)})
+            print(f"[INFO] Kalibrasi {len(paths)} foto selesai ({time.time() - start:.1f} detik): {path}")
+        else:
+            data = report(args.model, list_images(args.images, args.limit), args.backend)
+            _print_report(data)
+            if args.json:
+                with open(args.json, 'w') as f:
+                    json.dump(data, f, indent=2)
+                print(f"[INFO] Laporan disimpan ke: {args.json}")
+    except (FileNotFoundError, ValueError) as e:
+        print(f"[ERROR] {e}")
@@ -0,0 +1,294 @@
+"""
+Registry bobot lokal untuk model colorizer (eccv16 / siggraph17).
+
+Bobot dibaca dari satu folder (ANJAYHD_WEIGHTS_DIR, default models/colorizers)
+yang dideskripsikan oleh manifest.json:
+
+    {
+      "eccv16": {"file": "colorization_release_v2-9b330a0b.pth", "sha256": "..."},
+      "siggraph17": {"file": "siggraph17-df00044c.pth", "sha256": "..."}
+    }
+
+State dict dimuat dengan torch.load(mmap=True) sehingga semua worker proses
+berbagi satu salinan fisik bobot lewat page cache. Registry tidak pernah
+mengakses jaringan kecuali diizinkan (ANJAYHD_ALLOW_DOWNLOAD=1 atau
+allow_download=True); unduhan memakai verifikasi TLS normal dan dicek hash-nya.
+
+Menyiapkan node offline:
+    python -m colorizers.registry fetch            # di mesin yang punya akses internet
+    python -m colorizers.registry add eccv16 /path/colorization_release_v2-9b330a0b.pth
+    python -m colorizers.registry verify
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import shutil
+import tempfile
+import threading
+import urllib.request
+import zipfile
+
+import torch
+
+
+REGISTRY_DIR = os.environ.get(
+    'ANJAYHD_WEIGHTS_DIR',
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'models', 'colorizers'))
+ALLOW_DOWNLOAD = os.environ.get('ANJAYHD_ALLOW_DOWNLOAD', '').lower() in ('1', 'true', 'yes')
+
+MANIFEST_NAME = 'manifest.json'
+
+KNOWN_WEIGHTS = {
+    'eccv16': {
+        'file': 'colorization_release_v2-9b330a0b.pth',
+        'url': 'https://colorizers.s3.us-east-2.amazonaws.com/colorization_release_v2-9b330a0b.pth',
+    },
+    'siggraph17': {
+        'file': 'siggraph17-df00044c.pth',
+        'url': 'https://colorizers.s3.us-east-2.amazonaws.com/siggraph17-df00044c.pth',
+    },
+}
+
+# Nama file gaya torch hub: <nama>-<prefix sha256>.pth
+_HASH_PREFIX_RE = re.compile(r'-([a-f0-9]+)\.')
+
+
+class WeightsNotAvailable(FileNotFoundError):
+    """Bobot tidak ada di registry dan unduhan tidak diizinkan."""
+
+
+class ChecksumMismatch(ValueError):
+    """Isi file bobot tidak cocok dengan hash di manifest."""
+
+
+def file_sha256(path):
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+class WeightRegistry:
+    """Folder bobot + manifest berisi hash; load state dict via mmap."""
+
+    def __init__(self, directory=None, allow_download=None):
+        self.directory = REGISTRY_DIR if directory is None else directory
+        self.allow_download = ALLOW_DOWNLOAD if allow_download is None else allow_download
+        self.manifest_path = os.path.join(self.directory, MANIFEST_NAME)
+        self._lock = threading.Lock()
+        # Cap verifikasi yang tidak bisa ditulis ke manifest (folder read-only)
+        self._cached = {}
+
+    def read_manifest(self):
+        try:
+            with open(self.manifest_path, 'r') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+
+    def _write_manifest(self, manifest):
+        os.makedirs(self.directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, prefix='.manifest', suffix='.tmp')
+        with os.fdopen(fd, 'w') as f:
+            json.dump(manifest, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, self.manifest_path)
+
+    def _update_entry(self, name, **fields):
+        manifest = self.read_manifest()
+        manifest.setdefault(name, {}).update(fields)
+        self._write_manifest(manifest)
+
+    def _cache_entry(self, name, **fields):
+        """
+        Simpan cap cache (verified, zip_source_sha256) ke manifest bila bisa.
+        Di folder bobot read-only (mis. mount container) cap hanya disimpan di
+        memori: model tetap bisa dimuat, hanya hash dihitung ulang per proses.
+        """
+        with self._lock:
+            self._cached.setdefault(name, {}).update(fields)
+            try:
+                self._update_entry(name, **fields)
+            except OSError as e:
+                print(f"[WARN] Manifest registry tidak bisa ditulis, cap {name} hanya di memori: {e}")
+
+    def entry(self, name):
+        """Entri manifest (dengan default dari KNOWN_WEIGHTS)."""
+        entry = dict(KNOWN_WEIGHTS.get(name, {}))
+        entry.update(self.read_manifest().get(name, {}))
+        entry.update(self._cached.get(name, {}))
+        if 'file' not in entry:
+            raise KeyError(f"Model tidak terdaftar di registry: {name}")
+        return entry
+
+    def path(self, name):
+        return os.path.join(self.directory, self.entry(name)['file'])
+
+    def verify(self, name):
+        """
+        Cek file bobot terhadap sha256 di manifest (atau prefix hash di nama file).
+
+        Hash penuh hanya dihitung ulang bila ukuran/mtime berubah sejak
+        verifikasi terakhir, jadi cold start tidak membaca seluruh file.
+        """
+        entry = self.entry(name)
+        path = os.path.join(self.directory, entry['file'])
+        if not os.path.exists(path):
+            raise WeightsNotAvailable(f"Bobot {name} tidak ada di registry: {path}")
+
+        st = os.stat(path)
+        stamp = [st.st_size, st.st_mtime_ns]
+        if entry.get('sha256') and entry.get('verified') == stamp:
+            return path
+
+        digest = file_sha256(path)
+        expected = entry.get('sha256')
+        if expected is None:
+            match = _HASH_PREFIX_RE.search(entry['file'])
+            if match is None:
+                raise ChecksumMismatch(f"Manifest tidak punya sha256 untuk {name}")
+            expected = match.group(1)
+        if not digest.startswith(expected):
+            raise ChecksumMismatch(f"Hash bobot {name} tidak cocok: {digest[:16]}... != {expected[:16]}...")
+
+        self._cache_entry(name, file=entry['file'], sha256=digest, verified=stamp)
+        return path
+
+    def fetch(self, name):
+        """Unduh bobot ke registry (hanya bila diizinkan), lalu verifikasi."""
+        entry = self.entry(name)
+        path = os.path.join(self.directory, entry['file'])
+        if os.path.exists(path):
+            return self.verify(name)
+        if not self.allow_download:
+            raise WeightsNotAvailable(
+                f"Bobot {name} tidak ada di {self.directory} dan unduhan tidak diizinkan "
+                f"(set ANJAYHD_ALLOW_DOWNLOAD=1 atau salin file lewat 'python -m colorizers.registry add')")
+        if 'url' not in entry:
+            raise WeightsNotAvailable(f"Tidak ada URL unduhan untuk {name}")
+
+        os.makedirs(self.directory, exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        try:
+            with urllib.request.urlopen(entry['url']) as resp, open(tmp_path, 'wb') as f:
+                shutil.copyfileobj(resp, f)
+            os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        try:
+            return self.verify(name)
+        except ChecksumMismatch:
+            os.remove(path)
+            raise
+
+    def add(self, name, source_path):
+        """Salin file bobot yang sudah ada ke registry dan catat hash-nya."""
+        entry = dict(KNOWN_WEIGHTS.get(name, {}))
+        entry.update(self.read_manifest().get(name, {}))
+        filename = entry.get('file', os.path.basename(source_path))
+        path = os.path.join(self.directory, filename)
+
+        os.makedirs(self.directory, exist_ok=True)
+        if os.path.abspath(source_path) != os.path.abspath(path):
+            shutil.copyfile(source_path, path)
+        fields = {'file': filename}
+        if name not in KNOWN_WEIGHTS and not _HASH_PREFIX_RE.search(filename):
+            # Model di luar KNOWN_WEIGHTS (mis. hasil kuantisasi): file yang
+            # ditambahkan menjadi acuannya
+            fields['sha256'] = file_sha256(path)
+        with self._lock:
+            self._update_entry(name, **fields)
+        try:
+            return self.verify(name)
+        except ChecksumMismatch:
+            os.remove(path)
+            raise
+
+    def _mmap_path(self, name, path):
+        """
+        File yang bisa di-mmap. Checkpoint format lama (non-zip) dikonversi
+        sekali ke <file>.zip.pth di folder registry; None bila konversi tidak
+        bisa ditulis (folder read-only).
+        """
+        if zipfile.is_zipfile(path):
+            return path
+
+        zip_path = os.path.splitext(path)[0] + '.zip.pth'
+        source_sha = self.entry(name)['sha256']
+        if self.entry(name).get('zip_source_sha256') != source_sha or not os.path.exists(zip_path):
+            state = torch.load(path, map_location='cpu', weights_only=True)
+            tmp_path = f"{zip_path}.{os.getpid()}.tmp"
+            try:
+                torch.save(state, tmp_path)
+                os.replace(tmp_path, zip_path)
+            except OSError as e:
+                # Folder read-only: muat tanpa mmap (tiap worker memegang salinan sendiri)
+                print(f"[WARN] Tidak bisa menulis {zip_path}, {name} dimuat tanpa mmap: {e}")
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                return None
+            self._cache_entry(name, zip_source_sha256=source_sha)
+        return zip_path
+
+    def load_state_dict(self, name):
+        """State dict dengan tensor yang menunjuk ke halaman mmap (read-only, berbagi page cache)."""
+        try:
+            path = self.verify(name)
+        except WeightsNotAvailable:
+            path = self.fetch(name)
+        mmap_path = self._mmap_path(name, path)
+        if mmap_path is None:
+            return torch.load(path, map_location='cpu', weights_only=True)
+        return torch.load(mmap_path, map_location='cpu', mmap=True, weights_only=True)
+
+
+default_registry = WeightRegistry()
+
+
+def load_state_dict(name):
+    """State dict model colorizer dari registry default."""
+    return default_registry.load_state_dict(name)
+
+
+def load_pretrained(model_fn, name):
+    """
+    Bangun model di device 'meta' (tanpa inisialisasi bobot acak) lalu pasang
+    state dict mmap langsung sebagai parameter (assign=True, tanpa salinan).
+    """
+    state = load_state_dict(name)
+    with torch.device('meta'):
+        model = model_fn()
+    model.load_state_dict(state, assign=True)
+    return model
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Registry bobot colorizer lokal')
+    sub = parser.add_subparsers(dest='command', required=True)
+    p_fetch = sub.add_parser('fetch', help='Unduh bobot ke registry')
+    p_fetch.add_argument('names', nargs='*', default=sorted(KNOWN_WEIGHTS))
+    p_add = sub.add_parser('add', help='Daftarkan file bobot lokal')
+    p_add.add_argument('name')
+    p_add.add_argument('path')
+    p_verify = sub.add_parser('verify', help='Cek hash semua bobot di manifest')
+    p_verify.add_argument('names', nargs='*')
+
+    args = parser.parse_args()
+
+    try:
+        if args.command == 'fetch':
+            registry = WeightRegistry(allow_download=True)
+            for name in args.names:
+                print(f"[INFO] {name}: {registry.fetch(name)}")
+        elif args.command == 'add':
+            print(f"[INFO] {args.name}: {default_registry.add(args.name, args.path)}")
+        else:
+            names = args.names or sorted(set(KNOWN_WEIGHTS) | set(default_registry.read_manifest()))
+            for name in names:
+                print(f"[INFO] {name}: OK {default_registry.verify(name)}")
+    except (WeightsNotAvailable, ChecksumMismatch, KeyError) as e:
+        print(f"[ERROR] {e}")
@@ -1,6 +1,7 @@
 import torch
 import torch.nn as nn
 from .base_color import *
+from .registry import load_pretrained
 
 
 class SIGGRAPHGenerator(BaseColor):
@@ -119,6 +120,10 @@ class SIGGRAPHGenerator(BaseColor):
             mask_B = input_A * 0
 
         conv1_2 = self.model1(torch.cat((self.normalize_l(input_A), self.normalize_ab(input_B), mask_B), dim=1))
+        return self.decode(conv1_2)
+
+    def decode(self, conv1_2):
+        """Sisa jaringan setelah model1 (dipakai juga oleh ekspor ONNX tanpa hint)."""
         conv2_2 = self.model2(conv1_2[:, :, ::2, ::2])
         conv3_3 = self.model3(conv2_2[:, :, ::2, ::2])
         conv4_3 = self.model4(conv3_3[:, :, ::2, ::2])
@@ -138,22 +143,8 @@ class SIGGRAPHGenerator(BaseColor):
 
 
 def siggraph17(pretrained=True):
-    model = SIGGRAPHGenerator()
     if pretrained:
-        import ssl
-        import urllib.request
-        import torch.utils.model_zoo as model_zoo
-        
-        # Create SSL context that doesn't verify certificates
-        ctx = ssl.create_default_context()
-        ctx.check_hostname = False
-        ctx.verify_mode = ssl.CERT_NONE
-        
-        # Custom opener that uses the SSL context
-        opener = urllib.request.build_opener(urllib.request.HTTPSHandler(context=ctx))
-        urllib.request.install_opener(opener)
-        
-        model.load_state_dict(model_zoo.load_url(
-            'https://colorizers.s3.us-east-2.amazonaws.com/siggraph17-df00044c.pth',
-            map_location='cpu', check_hash=True))
-    return model
+        # Bobot dari registry lokal (colorizers/registry.py), dimuat via mmap;
+        # unduhan hanya bila ANJAYHD_ALLOW_DOWNLOAD=1.
+        return load_pretrained(SIGGRAPHGenerator, 'siggraph17')
+    return SIGGRAPHGenerator()
@@ -1,9 +1,7 @@
 from PIL import Image
 import numpy as np
-from skimage import color
 import torch
 import torch.nn.functional as F
-import cv2
 
 
 def load_img(img_path):
@@ -15,8 +13,25 @@ def load_img(img_path):
     return out_np
 
 
-def resize_img(img, HW, resample=Image.BICUBIC):
-    return np.array(Image.fromarray(img).resize((HW[1], HW[0]), resample=resample))
+def resize_img(img, HW, resample=Image.BICUBIC, band_rows=512):
+    """
+    Resize with PIL, identical to a single Image.resize call.
+
+    PIL resamples horizontally into an 8-bit intermediate first and then
+    vertically. The horizontal pass is done here band by band, so a large scan
+    is never copied whole into PIL (which stores RGB at 4 bytes per pixel);
+    the only extra full-height buffer is the narrow H x HW[1] intermediate.
+    """
+    H, W = img.shape[:2]
+    if H <= band_rows:
+        return np.array(Image.fromarray(img).resize((HW[1], HW[0]), resample=resample))
+
+    tmp = np.empty((H, HW[1]) + img.shape[2:], dtype=np.uint8)
+    for r0 in range(0, H, band_rows):
+        band = img[r0:r0 + band_rows]
+        tmp[r0:r0 + band.shape[0]] = np.asarray(
+            Image.fromarray(band).resize((HW[1], band.shape[0]), resample=resample))
+    return np.array(Image.fromarray(tmp).resize((HW[1], HW[0]), resample=resample))
 
 
 def adjust_saturation(img_rgb, saturation_factor=1.3):
@@ -24,6 +39,8 @@ def adjust_saturation(img_rgb, saturation_factor=1.3):
     Increase saturation of the colorized image.
     saturation_factor: 1.0 = no change, >1.0 = more saturated
     """
+    import cv2
+    
     # Convert to HSV
     hsv = cv2.cvtColor(img_rgb, cv2.COLOR_RGB2HSV).astype(np.float32)
     
@@ -37,21 +54,239 @@ def adjust_saturation(img_rgb, saturation_factor=1.3):
     return result
 
 
+# sRGB (D65) <-> CIE XYZ, same constants as skimage.color
+_XYZ_FROM_RGB = np.array([[0.412453, 0.357580, 0.180423],
+                          [0.212671, 0.715160, 0.072169],
+                          [0.019334, 0.119193, 0.950227]])
+_RGB_FROM_XYZ = np.linalg.inv(_XYZ_FROM_RGB).astype(np.float32)
+_D65_WHITE = (0.95047, 1., 1.08883)
+
+
+def _srgb_to_linear(arr):
+    arr = np.asarray(arr, dtype=np.float32)
+    return np.where(arr > 0.04045, ((arr + 0.055) / 1.055) ** 2.4, arr / 12.92).astype(np.float32)
+
+
+def _y_to_l(y):
+    """CIE Y (reference white = 1) -> L, in place on a float32 array."""
+    low = y <= 0.008856
+    y_low = y[low]
+    np.cbrt(y, out=y)
+    y *= 116.
+    y -= 16.
+    y[low] = y_low * (116. * 7.787)
+    return y
+
+
+_LINEAR_LUT = _srgb_to_linear(np.arange(256) / 255.)
+_Y_LUTS = [(_LINEAR_LUT * np.float32(w)).astype(np.float32) for w in _XYZ_FROM_RGB[1]]
+_L_LUT = _y_to_l(_LINEAR_LUT.copy())
+
+
+def rgb_to_l(img_rgb):
+    """
+    L channel (CIE Lab, 0..100) as float32, without computing a/b.
+    uint8 input goes through lookup tables; grayscale (H x W) uses a single LUT.
+    """
+    if img_rgb.dtype == np.uint8:
+        if img_rgb.ndim == 2:
+            return _L_LUT[img_rgb]
+        y = _Y_LUTS[0][img_rgb[:, :, 0]]
+        y += _Y_LUTS[1][img_rgb[:, :, 1]]
+        y += _Y_LUTS[2][img_rgb[:, :, 2]]
+        return _y_to_l(y)
+
+    img = np.asarray(img_rgb, dtype=np.float32)
+    if img.ndim == 2:
+        return _y_to_l(_srgb_to_linear(img))
+    y = _srgb_to_linear(img) @ _XYZ_FROM_RGB[1].astype(np.float32)
+    return _y_to_l(y)
+
+
+def _lab_to_linear_rgb(img_l, img_a, img_b):
+    """CIE Lab -> linear sRGB (float32, not clipped). Negative Z is clipped to zero like skimage."""
+    fy = (img_l + 16.) / 116.
+    xyz = np.empty(fy.shape + (3,), dtype=np.float32)
+    np.add(img_a / 500., fy, out=xyz[..., 0])
+    xyz[..., 1] = fy
+    np.subtract(fy, img_b / 200., out=xyz[..., 2])
+    np.maximum(xyz[..., 2], 0, out=xyz[..., 2])
+
+    xyz = np.where(xyz > 0.2068966, xyz * xyz * xyz, (xyz - 16. / 116.) * (1 / 7.787))
+    xyz *= np.array(_D65_WHITE, dtype=np.float32)
+    return xyz @ _RGB_FROM_XYZ.T
+
+
+def _linear_to_srgb(rgb):
+    """Exact sRGB gamma encoding, clipped to [0, 1]."""
+    np.clip(rgb, 0, 1, out=rgb)
+    encoded = np.maximum(rgb, 0.0031308) ** (1 / 2.4) * 1.055 - 0.055
+    return np.where(rgb > 0.0031308, encoded, rgb * 12.92).astype(np.float32)
+
+
+_GAMMA_LUT_SIZE = 65536
+_GAMMA_LUT_U8 = (_linear_to_srgb(np.linspace(0, 1, _GAMMA_LUT_SIZE, dtype=np.float32)) * 255).astype(np.uint8)
+
+
+def lab_to_rgb(img_l, img_a, img_b):
+    """
+    CIE Lab -> sRGB in float32 (H x W x 3, clipped to [0, 1]).
+    Matches skimage.color.lab2rgb, including clipping negative Z to zero.
+    """
+    return _linear_to_srgb(_lab_to_linear_rgb(img_l, img_a, img_b))
+
+
+def lab_to_rgb_uint8(img_l, img_a, img_b):
+    """CIE Lab -> uint8 sRGB; gamma encoding through a 16-bit lookup table."""
+    rgb = _lab_to_linear_rgb(img_l, img_a, img_b)
+    np.clip(rgb, 0, 1, out=rgb)
+    rgb *= _GAMMA_LUT_SIZE - 1
+    rgb += 0.5
+    return _GAMMA_LUT_U8[rgb.astype(np.uint16)]
+
+
+def _bilinear_index(out_size, in_size):
+    """Source indices/weights of bilinear resize with align_corners=False (as F.interpolate)."""
+    src = (np.arange(out_size, dtype=np.float64) + 0.5) * (in_size / out_size) - 0.5
+    src = np.maximum(src, 0)
+    i0 = np.minimum(np.floor(src).astype(np.int64), in_size - 1)
+    i1 = np.minimum(i0 + 1, in_size - 1)
+    w1 = (src - i0).astype(np.float32)
+    return i0, i1, w1
+
+
+def upsample_ab_rows(ab_hwc, rows, x_index, y_index):
+    """Bilinear upsample of a low-res ab map (h x w x 2), only for the given output rows."""
+    yi0, yi1, wy = y_index
+    xi0, xi1, wx = x_index
+    wy = wy[rows, None, None]
+    ab_rows = ab_hwc[yi0[rows]] * (1 - wy) + ab_hwc[yi1[rows]] * wy
+    wx = wx[None, :, None]
+    return ab_rows[:, xi0] * (1 - wx) + ab_rows[:, xi1] * wx
+
+
+def _ab_hwc(out_ab, saturation_boost):
+    """Low-res ab (2 x h x w, numpy or torch) -> contiguous h x w x 2 float32, chroma-scaled."""
+    if isinstance(out_ab, torch.Tensor):
+        out_ab = out_ab.detach().cpu().numpy()
+    ab_hwc = np.ascontiguousarray(np.asarray(out_ab, dtype=np.float32).transpose((1, 2, 0)))
+    if saturation_boost != 1.0:
+        ab_hwc *= np.float32(saturation_boost)
+    return ab_hwc
+
+
+def _upsample_strips(map_hwc, H, W, strip_rows):
+    """Yield (rows, strip) of a low-res h x w x C map bilinearly upsampled to H x W."""
+    h, w = map_hwc.shape[:2]
+    y_index = _bilinear_index(H, h)
+    x_index = _bilinear_index(W, w)
+    for r0 in range(0, H, strip_rows):
+        rows = slice(r0, min(r0 + strip_rows, H))
+        yield rows, upsample_ab_rows(map_hwc, rows, x_index, y_index)
+
+
+def _box_mean(x, radius):
+    import cv2
+    return cv2.blur(x, (2 * radius + 1, 2 * radius + 1), borderType=cv2.BORDER_REFLECT)
+
+
+def guided_ab_coeffs(guide_l, ab_hwc, radius=2, eps=25.):
+    """
+    Fast guided filter (He & Sun, 2015) fit of ab against L on the low-res grid.
+
+    Locally ab ~= A * L + B; the returned h x w x 4 map holds (A_a, A_b, B_a, B_b).
+    Upsampling A and B (cheap, bilinear) and applying them to a high-res L puts
+    the colour edges where the high-res L has its edges, instead of the blurry
+    edges of a plain bilinear ab upsample.
+
+    guide_l: h x w float32 L (0..100) that the ab map was predicted from
+    ab_hwc: h x w x 2 float32 ab
+    eps: regularization in L^2 units; larger = closer to plain bilinear ab
+    """
+    guide_l = np.asarray(guide_l, dtype=np.float32)
+    mean_l = _box_mean(guide_l, radius)
+    var_l = _box_mean(guide_l * guide_l, radius) - mean_l * mean_l
+
+    coeffs = np.empty(ab_hwc.shape[:2] + (4,), dtype=np.float32)
+    for c in range(2):
+        p = np.ascontiguousarray(ab_hwc[:, :, c])
+        mean_p = _box_mean(p, radius)
+        a = (_box_mean(guide_l * p, radius) - mean_l * mean_p) / (var_l + np.float32(eps))
+        b = mean_p - a * mean_l
+        coeffs[:, :, c] = _box_mean(a, radius)
+        coeffs[:, :, 2 + c] = _box_mean(b, radius)
+    return coeffs
+
+
+def postprocess_lab(img_l, out_ab, saturation_boost=1.3, as_uint8=True, strip_rows=256):
+    """
+    Combine full-res L with low-res ab into RGB, one horizontal strip at a time.
+
+    ab upsampling (bilinear) and Lab->RGB conversion are fused per strip, so
+    the only full-resolution buffer is the output. The saturation boost is
+    applied as chroma scaling (a, b multiplied) on the low-res ab map.
+
+    img_l: H x W float32 L channel
+    out_ab: 2 x h x w ab channels (numpy or torch)
+    Returns: H x W x 3 RGB, uint8 (or float32 in [0, 1] if as_uint8=False)
+    """
+    H, W = img_l.shape
+    ab_hwc = _ab_hwc(out_ab, saturation_boost)
+    out = np.empty((H, W, 3), dtype=np.uint8 if as_uint8 else np.float32)
+    for rows, ab in _upsample_strips(ab_hwc, H, W, strip_rows):
+        if as_uint8:
+            out[rows] = lab_to_rgb_uint8(img_l[rows], ab[:, :, 0], ab[:, :, 1])
+        else:
+            out[rows] = lab_to_rgb(img_l[rows], ab[:, :, 0], ab[:, :, 1])
+    return out
+
+
+def iter_postprocess_strips(img, out_ab, saturation_boost=1.3, strip_rows=256, bgr=False, guide=None):
+    """
+    Strip generator version of postprocess_lab that starts from the original
+    uint8 image instead of its L channel.
+
+    L, the upsampled ab and the Lab->RGB conversion exist only for the current
+    strip, so nothing full-resolution is allocated here: peak memory is a few
+    strips, independent of image height. The caller decides where the strips
+    go (an output buffer, or straight into a streaming encoder).
+
+    With guide (the low-res L the ab map was predicted from), ab is upsampled
+    by guided filtering against the L of img (see guided_ab_coeffs). This is
+    meant for an img larger than the colorizer input, e.g. a super-resolved
+    grayscale image.
+
+    img: H x W x 3 uint8 (RGB, or BGR if bgr=True) or H x W grayscale
+    out_ab: 2 x h x w ab channels (numpy or torch)
+    guide: optional h x w L channel for guided ab upsampling
+    Yields: (rows, strip) with rows a slice and strip a uint8 RGB array
+    """
+    H, W = img.shape[:2]
+    ab_map = _ab_hwc(out_ab, saturation_boost)
+    if guide is not None:
+        ab_map = guided_ab_coeffs(guide, ab_map)
+    for rows, ab in _upsample_strips(ab_map, H, W, strip_rows):
+        src = img[rows]
+        if bgr and src.ndim == 3:
+            src = src[:, :, ::-1]
+        img_l = rgb_to_l(src)
+        if guide is not None:
+            ab = ab[:, :, :2] * img_l[:, :, None] + ab[:, :, 2:]
+        yield rows, lab_to_rgb_uint8(img_l, ab[:, :, 0], ab[:, :, 1])
+
+
 def preprocess_img(img_rgb_orig, HW=(256, 256), resample=Image.BICUBIC):
     """
     Preprocess for ECCV16 model.
     Returns original size L and resized L as torch Tensors.
     """
     img_rgb_rs = resize_img(img_rgb_orig, HW=HW, resample=resample)
-    
-    img_lab_orig = color.rgb2lab(img_rgb_orig)
-    img_lab_rs = color.rgb2lab(img_rgb_rs)
 
-    img_l_orig = img_lab_orig[:, :, 0]
-    img_l_rs = img_lab_rs[:, :, 0]
+    img_l_orig = rgb_to_l(img_rgb_orig)
+    img_l_rs = rgb_to_l(img_rgb_rs)
 
-    tens_orig_l = torch.Tensor(img_l_orig)[None, None, :, :]
-    tens_rs_l = torch.Tensor(img_l_rs)[None, None, :, :]
+    tens_orig_l = torch.from_numpy(img_l_orig)[None, None, :, :]
+    tens_rs_l = torch.from_numpy(img_l_rs)[None, None, :, :]
 
     return tens_orig_l, tens_rs_l
 
@@ -61,8 +296,37 @@ def postprocess_tens(tens_orig_l, out_ab, mode='bilinear', saturation_boost=1.3)
     Postprocess the output.
     tens_orig_l: 1 x 1 x H_orig x W_orig (L channel from original image)
     out_ab: 1 x 2 x H x W (ab channels from model output)
-    saturation_boost: factor to boost color saturation (1.0 = no change)
+    saturation_boost: chroma scaling factor in Lab (1.0 = no change)
+    Returns: H_orig x W_orig x 3 float32 RGB in [0, 1]
     """
+    if mode != 'bilinear':
+        out_ab = F.interpolate(out_ab, size=tens_orig_l.shape[2:], mode=mode)
+    img_l = tens_orig_l[0, 0].detach().cpu().numpy()
+    return postprocess_lab(img_l, out_ab[0], saturation_boost=saturation_boost, as_uint8=False)
+
+
+def postprocess_tens_uint8(tens_orig_l, out_ab, saturation_boost=1.3):
+    """Like postprocess_tens, but writes uint8 RGB directly (no float copy of the result)."""
+    img_l = tens_orig_l[0, 0].detach().cpu().numpy()
+    return postprocess_lab(img_l, out_ab[0], saturation_boost=saturation_boost, as_uint8=True)
+
+
+def preprocess_img_reference(img_rgb_orig, HW=(256, 256), resample=Image.BICUBIC):
+    """Original float64 skimage path of preprocess_img (kept for equivalence checks)."""
+    from skimage import color
+
+    img_rgb_rs = resize_img(img_rgb_orig, HW=HW, resample=resample)
+
+    img_l_orig = color.rgb2lab(img_rgb_orig)[:, :, 0]
+    img_l_rs = color.rgb2lab(img_rgb_rs)[:, :, 0]
+
+    return torch.Tensor(img_l_orig)[None, None, :, :], torch.Tensor(img_l_rs)[None, None, :, :]
+
+
+def postprocess_tens_reference(tens_orig_l, out_ab, mode='bilinear', saturation_boost=1.3):
+    """Original float64 skimage path of postprocess_tens (HSV saturation boost)."""
+    from skimage import color
+
     HW_orig = tens_orig_l.shape[2:]
     HW = out_ab.shape[2:]
 
@@ -72,14 +336,12 @@ def postprocess_tens(tens_orig_l, out_ab, mode='bilinear', saturation_boost=1.3)
         out_ab_orig = out_ab
 
     out_lab_orig = torch.cat((tens_orig_l, out_ab_orig), dim=1)
-    
     out_rgb = color.lab2rgb(out_lab_orig.data.cpu().numpy()[0, ...].transpose((1, 2, 0)))
-    
-    # Boost saturation
+
     if saturation_boost > 1.0:
         out_rgb = adjust_saturation((out_rgb * 255).astype(np.uint8), saturation_boost)
         out_rgb = out_rgb.astype(np.float32) / 255.0
-    
+
     return out_rgb
 
 
@@ -99,10 +361,7 @@ def colorize_eccv16(img_rgb, saturation_boost=1.3):
     with torch.no_grad():
         out_ab = model(tens_l_rs)
     
-    out_img = postprocess_tens(tens_l_orig, out_ab, saturation_boost=saturation_boost)
-    out_img = np.clip(out_img * 255, 0, 255).astype(np.uint8)
-    
-    return out_img
+    return postprocess_tens_uint8(tens_l_orig, out_ab, saturation_boost=saturation_boost)
 
 
 def colorize_siggraph17(img_rgb, saturation_boost=1.3):
@@ -121,7 +380,4 @@ def colorize_siggraph17(img_rgb, saturation_boost=1.3):
     with torch.no_grad():
         out_ab = model(tens_l_rs)
     
-    out_img = postprocess_tens(tens_l_orig, out_ab, saturation_boost=saturation_boost)
-    out_img = np.clip(out_img * 255, 0, 255).astype(np.uint8)
-    
-    return out_img
+    return postprocess_tens_uint8(tens_l_orig, out_ab, saturation_boost=saturation_boost)
@@ -0,0 +1,148 @@
+"""
+Pembagian core CPU antar worker
+Tanpa pembagian, torch, OpenCV, dan engine SR di setiap worker masing-masing
+memakai semua core; beberapa job bersamaan membuat mesin oversubscribed dan
+throughput total malah turun di bawah satu job.
+
+Core yang boleh dipakai proses ini (affinity) dibagi menjadi slot yang tidak
+saling tumpang tindih, satu per worker. Core diurutkan per socket lalu per
+core fisik, jadi satu slot berisi core yang berdekatan (sibling SMT ikut
+bersama). Di dalam worker, affinity dipasang ke slotnya dan jumlah thread
+torch (intra-op), OpenMP/MKL, dan cv2 disamakan dengan ukuran slot.
+
+Policy (ANJAYHD_CPU_POLICY):
+    even  # ANJAYHD_WORKERS worker, core dibagi rata (default)
+    fat   # sedikit worker gemuk: ~8 core per worker (latensi per job rendah)
+    thin  # banyak worker kurus: ~2 core per worker (throughput total tinggi)
+    off   # tanpa pembagian (perilaku lama)
+
+Usage:
+    slots = plan_slots(workers=4, policy='even')   # [(0, 1, ...), (8, 9, ...), ...]
+    apply_slot(slots[0])                           # di proses worker, sebelum import berat
+    configure_threads(len(slots[0]))               # setelah torch/cv2 termuat
+    python cpu_scheduler.py --policy thin          # lihat rencana untuk mesin ini
+"""
+
+import argparse
+import os
+import sys
+
+
+CPU_POLICY = os.environ.get('ANJAYHD_CPU_POLICY', 'even')
+THREADS_PER_WORKER = int(os.environ.get('ANJAYHD_THREADS_PER_WORKER', '0')) or None
+INTEROP_THREADS = int(os.environ.get('ANJAYHD_INTEROP_THREADS', '1'))
+PIN_CPUS = os.environ.get('ANJAYHD_CPU_PIN', '1') != '0'
+
+# Target core per worker untuk policy yang menentukan jumlah worker sendiri
+POLICY_THREADS = {'fat': 8, 'thin': 2}
+POLICIES = ('even', 'fat', 'thin', 'off')
+
+# Library yang membaca jumlah thread dari environment saat pertama diimport
+_THREAD_ENV_VARS = ('OMP_NUM_THREADS', 'MKL_NUM_THREADS', 'OPENBLAS_NUM_THREADS', 'NUMEXPR_NUM_THREADS')
+
+_TOPOLOGY_DIR = '/sys/devices/system/cpu'
+
+
+def available_cpus():
+    """Core yang boleh dipakai proses ini (menghormati taskset/cgroup cpuset)."""
+    if hasattr(os, 'sched_getaffinity'):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+def _topology_key(cpu):
+    """(socket, core fisik, cpu) dari sysfs; fallback ke nomor cpu saja."""
+    base = os.path.join(_TOPOLOGY_DIR, f'cpu{cpu}', 'topology')
+    try:
+        with open(os.path.join(base, 'physical_package_id')) as f:
+            package = int(f.read())
+        with open(os.path.join(base, 'core_id')) as f:
+            core = int(f.read())
+    except (OSError, ValueError):
+        return (0, cpu, cpu)
+    return (package, core, cpu)
+
+
+def plan_slots(workers=None, policy=CPU_POLICY, threads_per_worker=THREADS_PER_WORKER, cpus=None):
+    """
+    Bagi core menjadi slot per worker.
+
+    Args:
+        workers: jumlah worker untuk policy 'even' (diabaikan oleh fat/thin)
+        policy: 'even', 'fat', 'thin', atau 'off'
+        threads_per_worker: ganti target core per worker untuk fat/thin
+        cpus: daftar core (default: affinity proses ini)
+
+    Returns:
+        list tuple core per worker, atau None untuk policy 'off'
+    """
+    if policy not in POLICIES:
+        raise ValueError(f"ANJAYHD_CPU_POLICY tidak dikenal: {policy} (pilih {', '.join(POLICIES)})")
+    if policy == 'off':
+        return None
+
+    cpus = sorted(available_cpus() if cpus is None else cpus, key=_topology_key)
+    if policy == 'even':
+        workers = max(1, int(workers or 1))
+    else:
+        per_worker = threads_per_worker or POLICY_THREADS[policy]
+        workers = max(1, len(cpus) // per_worker)
+
+    if workers > len(cpus):
+        # Lebih banyak worker daripada core: tiap worker 1 thread, core dipakai bergiliran
+        print(f"[WARN] {workers} worker untuk {len(cpus)} core; sebagian core dipakai bersama")
+        return [(cpus[i % len(cpus)],) for i in range(workers)]
+
+    base, extra = divmod(len(cpus), workers)
+    slots, start = [], 0
+    for i in range(workers):
+        size = base + (1 if i < extra else 0)
+        slots.append(tuple(sorted(cpus[start:start + size])))
+        start += size
+    return slots
+
+
+def apply_slot(cpus, pin=PIN_CPUS):
+    """
+    Dipanggil di proses worker sebelum import torch/cv2: pasang affinity dan
+    batasi pool thread OpenMP/MKL lewat environment.
+    """
+    if pin and hasattr(os, 'sched_setaffinity'):
+        try:
+            os.sched_setaffinity(0, cpus)
+        except OSError as e:
+            print(f"[WARN] Gagal memasang affinity {list(cpus)}: {e}")
+    for name in _THREAD_ENV_VARS:
+        os.environ[name] = str(len(cpus))
+
+
+def configure_threads(threads, interop=INTEROP_THREADS):
+    """Samakan jumlah thread torch dan cv2 yang sudah termuat dengan ukuran slot."""
+    torch = sys.modules.get('torch')
+    if torch is not None:
+        torch.set_num_threads(threads)
+        try:
+            # Hanya bisa sekali, sebelum ada kerja paralel inter-op
+            torch.set_num_interop_threads(interop)
+        except RuntimeError:
+            pass
+    cv2 = sys.modules.get('cv2')
+    if cv2 is not None:
+        cv2.setNumThreads(threads)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Lihat pembagian core CPU per worker')
+    parser.add_argument('--workers', type=int, default=int(os.environ.get('ANJAYHD_WORKERS', '2')))
+    parser.add_argument('--policy', type=str, default=CPU_POLICY, choices=POLICIES)
+    parser.add_argument('--threads-per-worker', type=int, default=THREADS_PER_WORKER)
+
+    args = parser.parse_args()
+
+    slots = plan_slots(args.workers, args.policy, args.threads_per_worker)
+    if slots is None:
+        print(f"[INFO] Policy off: {args.workers} worker, masing-masing memakai semua core")
+    else:
+        print(f"[INFO] {len(available_cpus())} core, policy {args.policy}: {len(slots)} worker")
+        for i, slot in enumerate(slots):
+            print(f"  worker {i}: {len(slot)} thread, core {','.join(map(str, slot))}")
@@ -3,23 +3,37 @@ Image HD Enhancement Script
 Menjernihkan foto dari galeri menjadi High Definition (HD)
 
 Fitur:
-1. Restorasi HD dengan Real-ESRGAN NCNN Vulkan
+1. Restorasi HD dengan Real-ESRGAN (NCNN Vulkan atau PyTorch CPU tiled)
 2. Pewarnaan foto BW dengan PyTorch ECCV16
 
 Usage:
     python image_enhancer.py input.jpg output.jpg --mode enhance    # HD saja
     python image_enhancer.py input.jpg output.jpg --mode colorize   # Warnai saja
     python image_enhancer.py input.jpg output.jpg --mode both       # Warnai + HD
+    python image_enhancer.py input.jpg output.jpg --mode both --sr-luma   # Warnai + HD, SR hanya luma
+    python image_enhancer.py input.jpg output.jpg --mode auto       # Pilih sendiri per foto
+    python image_enhancer.py --input-dir arsip/ --output-dir hasil/ --mode auto   # Satu folder
+    python image_enhancer.py klip.mp4 hasil.mp4 --mode both --scale 2   # Video/GIF (video_pipeline)
 """
 
-import cv2
-import numpy as np
-from pathlib import Path
+from __future__ import annotations
+
 import argparse
+import contextlib
+import io
 import sys
 import subprocess
 import os
 import tempfile
+import threading
+import time
+from typing import TYPE_CHECKING
+
+# cv2/numpy/PIL/torch diimport di dalam fungsi yang memakainya, supaya tiap
+# mode hanya membayar import yang benar-benar dipakai (--mode enhance dengan
+# backend ncnn tidak pernah memuat torch maupun cv2).
+if TYPE_CHECKING:
+    import numpy as np
 
 
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
@@ -29,35 +43,202 @@ OUTPUT_DIR = os.path.join(SCRIPT_DIR, "output")
 os.makedirs(INPUT_DIR, exist_ok=True)
 os.makedirs(OUTPUT_DIR, exist_ok=True)
 
+SR_BACKEND = os.environ.get('ANJAYHD_SR_BACKEND', 'auto')
+# Mode both untuk foto BW: SR hanya pada luma (abu-abu), ab colorizer langsung
+# diperbesar ke resolusi akhir (bilinear, atau guided dengan panduan L)
+SR_LUMA = os.environ.get('ANJAYHD_SR_LUMA', '0') == '1'
+LUMA_AB_UPSAMPLE = os.environ.get('ANJAYHD_LUMA_AB', 'bilinear')
+WARMUP_MODELS = os.environ.get('ANJAYHD_WARMUP_MODELS', 'siggraph17,eccv16,sr')
+
+# Deteksi hitam putih: fraksi sampel yang harus monokrom, toleransi chroma
+# (Lab), dan jumlah pixel sampel (gambar besar diperiksa dengan stride)
+GRAY_CONFIDENCE = float(os.environ.get('ANJAYHD_GRAY_CONFIDENCE', '0.98'))
+GRAY_TOLERANCE = float(os.environ.get('ANJAYHD_GRAY_TOLERANCE', '6'))
+GRAY_SAMPLE_PIXELS = int(os.environ.get('ANJAYHD_GRAY_SAMPLE_PIXELS', '65536'))
+# Sudut hue (derajat) yang masih dianggap satu tint: highlight sepia yang
+# ter-clip dan tint cyanotype bergeser hue-nya seiring terang gelapnya
+GRAY_TINT_ANGLE = float(os.environ.get('ANJAYHD_GRAY_TINT_ANGLE', '30'))
+_MAX_TINT = 40.0  # chroma Lab maksimal scan sepia/bertint
+# --mode auto tidak memperbesar foto BW yang sudah sebesar ini (megapixel)
+AUTO_SR_MAX_MP = float(os.environ.get('ANJAYHD_AUTO_SR_MAX_MP', '16'))
+
+MODES = ('enhance', 'colorize', 'both', 'auto')
+
+# Baris per strip pada postprocess colorizer + encode streaming (memori puncak
+# sebanding satu strip, bukan tinggi gambar)
+STRIP_ROWS = int(os.environ.get('ANJAYHD_STRIP_ROWS', '256'))
+
+# Preview job web (proses_gambar progres=True): sisi terpanjang (pixel) dan
+# kualitas JPEG; dikirim ke server sebelum SR dimulai
+PREVIEW_SIZE = int(os.environ.get('ANJAYHD_PREVIEW_SIZE', '1024'))
+PREVIEW_QUALITY = int(os.environ.get('ANJAYHD_PREVIEW_QUALITY', '80'))
+
+# Durasi per tahap (detik) dari job yang sedang berjalan di thread ini
+_pencatat = threading.local()
+
+
+@contextlib.contextmanager
+def catat_tahap(nama: str):
+    """
+    Tambahkan durasi blok ke pencatat tahap job aktif (no-op di luar job).
+    Bisa dipakai sebagai `with` maupun decorator.
+    """
+    timings = getattr(_pencatat, 'timings', None)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        if timings is not None:
+            timings[nama] = timings.get(nama, 0.0) + time.perf_counter() - start
+
+
+@contextlib.contextmanager
+def _catat_job(timings: dict = None):
+    """Aktifkan pencatat tahap untuk satu job; hasilnya dict {tahap: detik}."""
+    previous = getattr(_pencatat, 'timings', None)
+    _pencatat.timings = {} if timings is None else timings
+    try:
+        yield _pencatat.timings
+    finally:
+        _pencatat.timings = previous
+
+
+@contextlib.contextmanager
+def _lapor_progres(kirim=None):
+    """Aktifkan pengirim progres (preview, tile SR, tahap) untuk job di thread ini."""
+    previous = getattr(_pencatat, 'progres', None)
+    _pencatat.progres = kirim
+    try:
+        yield
+    finally:
+        _pencatat.progres = previous
+
+
+def _lapor(**data) -> None:
+    """Kirim progres job aktif (no-op bila tidak ada pengirim, mis. CLI)."""
+    kirim = getattr(_pencatat, 'progres', None)
+    if kirim is not None:
+        kirim(data)
 
-def cek_gambar_hitam_putih(image: np.ndarray) -> bool:
-    """Mengecek apakah gambar adalah hitam putih (grayscale) atau berwarna."""
-    if len(image.shape) == 2:
+
+def _progres_tile(selesai: int, total: int) -> None:
+    _lapor(stage='sr', done=selesai, total=total)
+
+
+def cek_gambar_hitam_putih(image: np.ndarray, confidence: float = GRAY_CONFIDENCE,
+                           tolerance: float = GRAY_TOLERANCE, tint_angle: float = GRAY_TINT_ANGLE) -> bool:
+    """
+    Mengecek apakah gambar adalah hitam putih (grayscale) atau berwarna.
+    
+    Hanya sampel ber-stride (~GRAY_SAMPLE_PIXELS pixel) yang diperiksa, per
+    blok baris, dan berhenti begitu jumlah pixel berwarna melewati batas.
+    Foto sepia atau scan bertint dihitung hitam putih: chroma (a, b di ruang
+    Lab) semua pixel boleh bergeser ke satu arah hue yang sama. Simpangan dari
+    arah itu diukur sebagai sudut (tint_angle) ditambah tolerance absolut,
+    karena hue tint ikut bergeser di highlight yang ter-clip.
+    
+    Args:
+        confidence: fraksi sampel yang harus monokrom (0.98 = maksimal 2%
+            pixel berwarna, mis. noise JPEG atau noda)
+        tolerance: chroma (satuan Lab) yang masih dianggap abu-abu, sekaligus
+            simpangan absolut minimum dari arah tint
+        tint_angle: simpangan hue (derajat) dari arah tint yang masih dianggap tint
+    """
+    import cv2
+    import numpy as np
+    
+    if image.ndim == 2 or image.shape[2] == 1:
         return True
     
-    b, g, r = cv2.split(image.astype(np.float32))
-    diff_rg = np.abs(r - g)
-    diff_gb = np.abs(g - b)
-    diff_rb = np.abs(r - b)
-    total_diff = float(np.mean(diff_rg) + np.mean(diff_gb) + np.mean(diff_rb))
-    threshold = 10.0
-    return total_diff < threshold
+    height, width = image.shape[:2]
+    step = max(1, int((height * width / GRAY_SAMPLE_PIXELS) ** 0.5))
+    sample = np.ascontiguousarray(image[::step, ::step, :3])
+    lab = cv2.cvtColor(sample, cv2.COLOR_BGR2Lab)
+    chroma = lab[:, :, 1:].reshape(-1, 2).astype(np.float32)
+    chroma -= 128.0
+    
+    budget = int((1.0 - confidence) * len(chroma))
+    # Pixel netral tidak memberi arah tint; median semua pixel akan ditarik ke
+    # nol oleh latar putih/hitam, jadi arah tint hanya dari pixel berchroma
+    chroma = chroma[(chroma * chroma).sum(axis=1) > tolerance * tolerance]
+    if len(chroma) <= budget:
+        return True
+    
+    tint = np.median(chroma, axis=0)
+    norm = float(np.hypot(tint[0], tint[1]))
+    if norm <= tolerance:
+        # Banyak pixel berchroma tanpa arah dominan: beberapa hue sekaligus
+        return False
+    direction = tint / norm
+    slope = float(np.tan(np.radians(tint_angle)))
+    
+    berwarna = 0
+    block = max(1, len(chroma) // 8)
+    for start in range(0, len(chroma), block):
+        part = chroma[start:start + block]
+        along = part @ direction
+        across = np.abs(part[:, 0] * direction[1] - part[:, 1] * direction[0])
+        # Hue lain, hue komplementer (sisi berlawanan dari titik netral),
+        # atau terlalu jenuh untuk tint (mis. foto senja yang serba oranye)
+        off = (across > tolerance + slope * np.maximum(along, 0)) | (along < -tolerance) | (along > _MAX_TINT)
+        berwarna += int(np.count_nonzero(off))
+        if berwarna > budget:
+            return False
+    return True
+
+
+def pilih_mode_auto(img: np.ndarray) -> str:
+    """
+    Mode untuk --mode auto: foto hitam putih diwarnai, dan diperbesar bila
+    masih di bawah AUTO_SR_MAX_MP megapixel. Foto berwarna hanya diperbesar.
+    """
+    height, width = img.shape[:2]
+    if not cek_gambar_hitam_putih(img):
+        return 'enhance'
+    if width * height >= AUTO_SR_MAX_MP * 1e6:
+        return 'colorize'
+    return 'both'
+
+
+def baca_ukuran(path: str) -> tuple:
+    """Baca (lebar, tinggi) dari header file gambar tanpa decode pixel."""
+    from PIL import Image
+    
+    with Image.open(path) as img:
+        return img.size
 
 
-def restorasi_hd(input_path: str, output_path: str, scale: int = 4) -> None:
-    """Restorasi gambar HD menggunakan Real-ESRGAN NCNN Vulkan."""
+def cari_exe_realesrgan():
+    """Cari realesrgan-ncnn-vulkan.exe; None bila tidak ada."""
     exe_name = "realesrgan-ncnn-vulkan.exe"
     
-    exe_dir = None
     for search_dir in [os.getcwd(), os.path.dirname(__file__), r"D:\Open Code\ImageHD\models"]:
         exe_path = os.path.join(search_dir, exe_name)
         if os.path.exists(exe_path):
-            exe_dir = search_dir
-            exe_path = os.path.abspath(exe_path)
-            break
+            return os.path.abspath(exe_path)
     
-    if exe_dir is None:
-        raise FileNotFoundError(f"Executable tidak ditemukan: {exe_name}")
+    return None
+
+
+def pilih_backend_sr(backend: str = SR_BACKEND) -> str:
+    """'auto' memakai executable NCNN bila ada, selain itu engine PyTorch in-process."""
+    if backend == 'auto':
+        return 'ncnn' if cari_exe_realesrgan() else 'torch'
+    if backend not in ('ncnn', 'torch'):
+        raise ValueError(f"Backend SR tidak dikenal: {backend}")
+    return backend
+
+
+@catat_tahap('sr')
+def upscale_array(img: np.ndarray, scale: int = 4) -> np.ndarray:
+    """Super resolution in-process (engine PyTorch tiled) dari array BGR ke array BGR."""
+    from sr_engine import upscale_image
+    return upscale_image(img, scale=scale, progress=_progres_tile)
+
+
+def restorasi_hd(input_path: str, output_path: str, scale: int = 4, backend: str = SR_BACKEND) -> None:
+    """Restorasi gambar HD menggunakan Real-ESRGAN (NCNN Vulkan atau PyTorch CPU)."""
+    backend = pilih_backend_sr(backend)
     
     input_path = os.path.abspath(input_path)
     output_path = os.path.abspath(output_path)
@@ -65,76 +246,866 @@ def restorasi_hd(input_path: str, output_path: str, scale: int = 4) -> None:
     if not os.path.exists(input_path):
         raise FileNotFoundError(f"File input tidak ditemukan: {input_path}")
     
+    if backend == 'torch':
+        restorasi_hd_array(baca_gambar(input_path), output_path, scale=scale, backend=backend)
+        return
+    
+    # Executable NCNN tidak membaca/menulis GIF: lewat PNG sementara
+    from strip_writer import PIL_EXTENSIONS
+    if os.path.splitext(input_path)[1].lower() in PIL_EXTENSIONS:
+        restorasi_hd_array(baca_gambar(input_path), output_path, scale=scale, backend=backend)
+        return
+    if os.path.splitext(output_path)[1].lower() in PIL_EXTENSIONS:
+        from PIL import Image
+        
+        with tempfile.NamedTemporaryFile(suffix='.png', delete=False) as tmp:
+            temp_path = tmp.name
+        try:
+            restorasi_hd(input_path, temp_path, scale=scale, backend=backend)
+            with Image.open(temp_path) as hasil:
+                hasil.save(output_path)
+        finally:
+            os.remove(temp_path)
+        return
+    
+    exe_path = cari_exe_realesrgan()
+    if exe_path is None:
+        raise FileNotFoundError("Executable tidak ditemukan: realesrgan-ncnn-vulkan.exe")
+    
     print(f"[INFO] Memproses: {input_path}")
-    img = cv2.imread(input_path)
-    print(f"[INFO] Resolusi awal: {img.shape[1]}x{img.shape[0]}")
+    w, h = baca_ukuran(input_path)
+    print(f"[INFO] Resolusi awal: {w}x{h}")
     print(f"[INFO] Menggunakan Real-ESRGAN NCNN Vulkan...")
     
     try:
-        subprocess.run(
-            [exe_path, "-i", input_path, "-o", output_path, "-s", str(scale)],
-            capture_output=True,
-            text=True,
-            cwd=exe_dir,
-            check=True
-        )
+        # Executable NCNN tidak memberi progres per tile, hanya tahapnya
+        _lapor(stage='sr')
+        with catat_tahap('sr'):
+            subprocess.run(
+                [exe_path, "-i", input_path, "-o", output_path, "-s", str(scale)],
+                capture_output=True,
+                text=True,
+                cwd=os.path.dirname(exe_path),
+                check=True
+            )
     except subprocess.CalledProcessError as e:
         raise RuntimeError(f"Error menjalankan Real-ESRGAN: {e.stderr}")
     
     if not os.path.exists(output_path):
         raise RuntimeError("Gagal memproses gambar HD")
     
-    result_img = cv2.imread(output_path)
-    if result_img is None:
+    try:
+        out_w, out_h = baca_ukuran(output_path)
+    except OSError:
         raise RuntimeError("Gagal memproses gambar HD")
     
     print(f"[INFO] Selesai! Hasil disimpan ke: {output_path}")
-    print(f"[INFO] Resolusi akhir: {result_img.shape[1]}x{result_img.shape[0]}")
+    print(f"[INFO] Resolusi akhir: {out_w}x{out_h}")
 
 
-def warnai_foto(input_path: str, output_path: str, model_type: str = 'siggraph17') -> None:
-    """Pewarnaan foto BW menggunakan PyTorch ECCV16 atau SIGGRAPH17."""
-    img = cv2.imread(input_path)
-    if img is None:
-        raise ValueError(f"Tidak dapat membaca gambar: {input_path}")
+def restorasi_hd_array(img: np.ndarray, output_path: str, scale: int = 4, backend: str = SR_BACKEND) -> None:
+    """
+    Restorasi HD dari array BGR, hasil langsung ditulis ke output_path.
+    Backend PyTorch bekerja langsung di memori. Executable NCNN hanya
+    menerima file, jadi input ditulis sebagai PNG (lossless) sementara;
+    output tidak di-decode ulang.
+    """
+    import cv2
     
-    print(f"[INFO] Memproses: {input_path}")
+    if pilih_backend_sr(backend) == 'torch':
+        print(f"[INFO] Resolusi awal: {img.shape[1]}x{img.shape[0]}")
+        print(f"[INFO] Menggunakan Real-ESRGAN PyTorch (CPU, tiled)...")
+        result = upscale_array(img, scale=scale)
+        simpan_gambar(output_path, result)
+        print(f"[INFO] Selesai! Hasil disimpan ke: {output_path}")
+        print(f"[INFO] Resolusi akhir: {result.shape[1]}x{result.shape[0]}")
+        return
+    
+    with tempfile.NamedTemporaryFile(suffix='.png', delete=False) as tmp:
+        temp_path = tmp.name
+    
+    try:
+        if not cv2.imwrite(temp_path, img):
+            raise RuntimeError("Gagal menulis gambar sementara")
+        restorasi_hd(temp_path, output_path, scale=scale, backend='ncnn')
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+
+def _ke_rgb(img: np.ndarray) -> np.ndarray:
+    """Array BGR/grayscale dari cv2 -> RGB untuk colorizer."""
+    import cv2
+    
+    if img.ndim == 2:
+        return cv2.cvtColor(img, cv2.COLOR_GRAY2RGB)
+    return cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
+
+
+def _mulai_warnai(img: np.ndarray, model_type: str, saturation_boost: float, luma: np.ndarray = None,
+                  out_ab: np.ndarray = None) -> tuple:
+    """
+    Cek BW lalu jalankan forward pass colorizer (thumbnail 256x256).
+    luma: versi abu-abu img hasil SR (jalur luma); L diambil dari sini.
+    out_ab: ab yang sudah diprediksi untuk img (dari buat_preview); forward dilewati.
+    
+    Returns:
+        (strips, None): generator strip RGB hasil pewarnaan (colorize_strips), atau
+        (None, img): array BGR final bila gambar sudah berwarna / colorizer gagal
+    """
+    import cv2
     
     if not cek_gambar_hitam_putih(img):
         print("[WARN] Gambar sudah berwarna, tidak perlu diwarnai")
-        cv2.imwrite(output_path, img)
-        print(f"[INFO] Selesai! Hasil disimpan ke: {output_path}")
-        return
+        return None, img
     
     model_name = "SIGGRAPH17 (Realistis)" if model_type == 'siggraph17' else "ECCV16"
     print(f"[INFO] Mewarnai foto dengan AI Deep Learning ({model_name})...")
+    _lapor(stage='colorize')
     
     try:
-        from colorizers import colorize_image
-        colorized_pil = colorize_image(input_path, model_type=model_type, device='cpu')
-        colorized_np = np.array(colorized_pil)
-        result = cv2.cvtColor(colorized_np, cv2.COLOR_RGB2BGR)
+        from colorizers import colorize_strips
+        return colorize_strips(img, model_type=model_type, device='cpu', saturation_boost=saturation_boost,
+                               strip_rows=STRIP_ROWS, bgr=True, luma=luma,
+                               guided=LUMA_AB_UPSAMPLE == 'guided', out_ab=out_ab), None
     except Exception as e:
         print(f"[WARN] PyTorch colorizer error: {e}")
+        if luma is not None:
+            return None, cv2.cvtColor(luma, cv2.COLOR_GRAY2BGR)
+        if img.ndim == 2:
+            return None, cv2.cvtColor(img, cv2.COLOR_GRAY2BGR)
         gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-        result = cv2.cvtColor(gray, cv2.COLOR_GRAY2BGR)
+        return None, cv2.cvtColor(gray, cv2.COLOR_GRAY2BGR)
+
+
+@catat_tahap('colorize')
+def warnai_array(img: np.ndarray, model_type: str = 'siggraph17', saturation_boost: float = 1.3,
+                 out_ab: np.ndarray = None) -> np.ndarray:
+    """
+    Pewarnaan array BGR (hasil juga BGR). Gambar berwarna dikembalikan apa adanya.
+    Strip hasil langsung ditulis ke buffer BGR output; tidak ada L/ab/RGB float
+    resolusi penuh maupun salinan RGB dari input.
+    """
+    import numpy as np
     
-    cv2.imwrite(output_path, result)
+    strips, hasil = _mulai_warnai(img, model_type, saturation_boost, out_ab=out_ab)
+    if strips is None:
+        return hasil
+    
+    out = np.empty(img.shape[:2] + (3,), dtype=np.uint8)
+    for rows, strip in strips:
+        out[rows] = strip[:, :, ::-1]
+    return out
+
+
+def tulis_strip(strips, width: int, height: int, target, ext: str) -> None:
+    """
+    Tulis strip RGB berurutan ke target (path atau objek file biner). PNG di-encode
+    streaming per strip (strip_writer); durasi dicatat sebagai colorize dan encode.
+    Bila gagal, file output yang sudah tertulis sebagian dihapus.
+    """
+    from strip_writer import buka_penulis
+    
+    _lapor(stage='encode')
+    with catat_tahap('encode'):
+        penulis = buka_penulis(target, ext, width, height)
+    strips = iter(strips)
+    try:
+        while True:
+            with catat_tahap('colorize'):
+                item = next(strips, None)
+            if item is None:
+                break
+            with catat_tahap('encode'):
+                penulis.tulis(item[1])
+        with catat_tahap('encode'):
+            penulis.tutup()
+    except BaseException:
+        # Generator strip atau encoder gagal: jangan tinggalkan handle/file terpotong
+        penulis.batal()
+        raise
+
+
+def warnai_ke_file(img: np.ndarray, target, ext: str, model_type: str = 'siggraph17',
+                   saturation_boost: float = 1.3, out_ab: np.ndarray = None) -> tuple:
+    """
+    Seperti warnai_array + simpan, tetapi hasil tidak pernah utuh di memori:
+    postprocess (upsample ab, Lab->RGB, saturasi, uint8) dan encode berjalan per
+    strip horizontal. Memori puncak di luar input = beberapa strip, tidak
+    bergantung tinggi gambar (JPEG/WebP tetap butuh satu buffer output uint8).
+    
+    Args:
+        target: path file output atau objek file biner (mis. BytesIO)
+        ext: ekstensi format output ('.png', '.jpg', ...)
+        out_ab: ab yang sudah diprediksi untuk img (buat_preview), atau None
+    
+    Returns:
+        (width, height) hasil
+    """
+    with catat_tahap('colorize'):
+        strips, hasil = _mulai_warnai(img, model_type, saturation_boost, out_ab=out_ab)
+    
+    height, width = img.shape[:2]
+    if strips is not None:
+        tulis_strip(strips, width, height, target, ext)
+    elif isinstance(target, str):
+        simpan_gambar(target, hasil)
+    else:
+        target.write(encode_gambar(hasil, ext))
+    return width, height
+
+
+def warnai_hd_luma(img: np.ndarray, target, ext: str, scale: int = 4, model_type: str = 'siggraph17',
+                   saturation_boost: float = 1.3, out_ab: np.ndarray = None) -> tuple:
+    """
+    Mode both jalur luma (backend torch): SR hanya pada versi abu-abu foto BW
+    dengan model yang dilipat ke 1 channel (sr_engine.luma_model). ab 256x256
+    dari colorizer diperbesar langsung ke resolusi akhir lalu digabung dengan L
+    hasil SR per strip sampai encoder, jadi tidak ada RGB hasil SR di memori.
+    Foto berwarna memakai SR RGB biasa.
+    
+    Args:
+        target: path file output atau objek file biner (mis. BytesIO)
+        ext: ekstensi format output
+        out_ab: ab yang sudah diprediksi untuk img (buat_preview), atau None
+    
+    Returns:
+        (width, height) hasil
+    """
+    import cv2
+    from sr_engine import get_upscaler
+    
+    if not cek_gambar_hitam_putih(img):
+        print("[WARN] Gambar sudah berwarna, SR RGB biasa")
+        result = upscale_array(img, scale=scale)
+        if isinstance(target, str):
+            simpan_gambar(target, result)
+        else:
+            target.write(encode_gambar(result, ext))
+        return result.shape[1], result.shape[0]
+    
+    print(f"[INFO] Jalur luma: SR abu-abu {img.shape[1]}x{img.shape[0]} x{scale}, ab diperbesar ({LUMA_AB_UPSAMPLE})")
+    gray = img if img.ndim == 2 else cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+    with catat_tahap('sr'):
+        luma = get_upscaler(scale=scale, luma=True).upscale_gray(gray, progress=_progres_tile)
+    del gray
+    
+    with catat_tahap('colorize'):
+        strips, hasil = _mulai_warnai(img, model_type, saturation_boost, luma=luma, out_ab=out_ab)
+    height, width = luma.shape
+    if strips is not None:
+        tulis_strip(strips, width, height, target, ext)
+    elif isinstance(target, str):
+        simpan_gambar(target, hasil)
+    else:
+        target.write(encode_gambar(hasil, ext))
+    return width, height
+
+
+@catat_tahap('decode')
+def baca_gambar(input_path: str) -> np.ndarray:
+    """Decode file gambar menjadi array BGR. GIF (still) dibaca lewat PIL."""
+    import cv2
+    from strip_writer import PIL_EXTENSIONS
+    
+    if os.path.splitext(input_path)[1].lower() in PIL_EXTENSIONS:
+        return _baca_pil(input_path)
+    img = cv2.imread(input_path)
+    if img is None:
+        raise ValueError(f"Tidak dapat membaca gambar: {input_path}")
+    return img
+
+
+def _baca_pil(input_path: str) -> np.ndarray:
+    """Decode frame pertama lewat PIL (palet/transparansi diratakan ke RGB) menjadi BGR."""
+    import cv2
+    import numpy as np
+    from PIL import Image
+    
+    try:
+        with Image.open(input_path) as pil:
+            rgb = np.asarray(pil.convert('RGB'))
+    except OSError:
+        raise ValueError(f"Tidak dapat membaca gambar: {input_path}")
+    return cv2.cvtColor(rgb, cv2.COLOR_RGB2BGR)
+
+
+@catat_tahap('encode')
+def simpan_gambar(output_path: str, img: np.ndarray) -> None:
+    """Encode array BGR ke file output."""
+    import cv2
+    from strip_writer import PIL_EXTENSIONS, encode_pil
+    
+    _lapor(stage='encode')
+    ext = os.path.splitext(output_path)[1]
+    if ext.lower() in PIL_EXTENSIONS:
+        with open(output_path, 'wb') as f:
+            f.write(encode_pil(img, ext))
+        return
+    if not cv2.imwrite(output_path, img):
+        raise RuntimeError(f"Gagal menyimpan gambar: {output_path}")
+
+
+@catat_tahap('decode')
+def baca_gambar_bytes(data: bytes) -> np.ndarray:
+    """Decode isi file gambar yang sudah ada di memori menjadi array BGR."""
+    import cv2
+    import numpy as np
+    
+    img = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+    if img is None:
+        raise ValueError("Tidak dapat membaca gambar dari data upload")
+    return img
+
+
+@catat_tahap('encode')
+def encode_gambar(img: np.ndarray, ext: str) -> bytes:
+    """Encode array BGR ke bytes dengan format sesuai ekstensi (.png, .jpg, .webp, .gif)."""
+    import cv2
+    from strip_writer import PIL_EXTENSIONS, encode_pil
+    
+    if ext.lower() in PIL_EXTENSIONS:
+        return encode_pil(img, ext)
+    ok, buf = cv2.imencode(ext, img)
+    if not ok:
+        raise RuntimeError(f"Gagal encode gambar ke {ext}")
+    return buf.tobytes()
+
+
+@catat_tahap('preview')
+def buat_preview(img: np.ndarray, mode: str, scale: int = 4, model_type: str = 'siggraph17',
+                 saturation_boost: float = 1.3) -> tuple:
+    """
+    Preview murah hasil job untuk ditampilkan sebelum SR selesai: input
+    diperbesar bicubic ke ukuran hasil (sisi terpanjang dibatasi PREVIEW_SIZE)
+    dan, bila mode mewarnai foto BW, diberi warna dari satu forward pass
+    colorizer 256x256. Biayanya sekitar satu forward colorizer (ratusan ms).
+    
+    Returns:
+        (bytes JPEG, out_ab): out_ab (atau None) sama persis dengan prediksi
+        jalur akhir, jadi diteruskan ke pewarnaan hasil akhir agar forward
+        pass tidak dijalankan dua kali
+    """
+    import cv2
+    import numpy as np
+    
+    height, width = img.shape[:2]
+    factor = scale if mode in ('enhance', 'both') else 1
+    fit = min(factor, PREVIEW_SIZE / max(height, width))
+    size = (max(1, round(width * fit)), max(1, round(height * fit)))
+    preview = cv2.resize(img, size, interpolation=cv2.INTER_CUBIC if fit > 1 else cv2.INTER_AREA)
+    
+    out_ab = None
+    if mode in ('colorize', 'both') and cek_gambar_hitam_putih(img):
+        try:
+            from colorizers import colorize_strips, predict_ab
+            out_ab = predict_ab([img], model_type=model_type, device='cpu', bgr=True)[0]
+            colored = np.empty(preview.shape[:2] + (3,), dtype=np.uint8)
+            for rows, strip in colorize_strips(preview, saturation_boost=saturation_boost, bgr=True,
+                                               out_ab=out_ab):
+                colored[rows] = strip[:, :, ::-1]
+            preview = colored
+        except Exception as e:
+            print(f"[WARN] Preview tanpa warna: {e}")
+    
+    ok, buf = cv2.imencode('.jpg', preview, [cv2.IMWRITE_JPEG_QUALITY, PREVIEW_QUALITY])
+    if not ok:
+        raise RuntimeError("Gagal encode preview")
+    return buf.tobytes(), out_ab
+
+
+def warnai_foto(input_path: str, output_path: str, model_type: str = 'siggraph17',
+                saturation_boost: float = 1.3) -> None:
+    """Pewarnaan foto BW menggunakan PyTorch ECCV16 atau SIGGRAPH17."""
+    img = baca_gambar(input_path)
+    print(f"[INFO] Memproses: {input_path}")
+    
+    warnai_ke_file(img, output_path, os.path.splitext(output_path)[1], model_type=model_type,
+                   saturation_boost=saturation_boost)
     print(f"[INFO] Selesai! Hasil disimpan ke: {output_path}")
 
 
+def warnai_batch(items: list, model_type: str = 'siggraph17', saturation_boost: float = 1.3) -> list:
+    """
+    Pewarnaan beberapa file sekaligus: semua foto BW masuk satu forward pass.
+    
+    Args:
+        items: list dict berisi 'input_path' dan 'output_path', atau (jalur
+            tanpa disk) 'input_data' (bytes) dan 'ext'; hasilnya berisi 'data'
+    
+    Returns:
+        list hasil sesuai urutan items dengan key yang sama seperti proses_gambar
+        (mode 'colorize', scale, width, height, ...) atau proses_bytes ('data');
+        item yang gagal berisi key 'error'.
+        Durasi tahap colorize adalah durasi forward seluruh batch (latensi yang dialami
+        tiap job) ditambah postprocess per strip gambar itu sendiri.
+    """
+    results = [None] * len(items)
+    timings = [{} for _ in items]
+    sizes = [(None, None)] * len(items)
+    bw_index = []
+    bw_images = []
+    
+    def tulis(i, img, strips=None):
+        item = items[i]
+        with _catat_job(timings[i]):
+            target = item.get('output_path') or io.BytesIO()
+            ext = item.get('ext') or os.path.splitext(target)[1]
+            if strips is not None:
+                # Hasil pewarnaan ditulis per strip (tanpa array hasil utuh)
+                tulis_strip(strips, img.shape[1], img.shape[0], target, ext)
+            elif 'output_path' in item:
+                simpan_gambar(target, img)
+            else:
+                target.write(encode_gambar(img, ext))
+        if 'output_path' in item:
+            result = {'output_path': target, 'output_bytes': os.path.getsize(target)}
+        else:
+            data = target.getvalue()
+            result = {'data': data, 'output_bytes': len(data)}
+        # Pewarnaan tidak mengubah ukuran
+        result.update(mode='colorize', scale=item.get('scale'), width=img.shape[1], height=img.shape[0],
+                      input_width=sizes[i][0], input_height=sizes[i][1], timings=timings[i])
+        return result
+    
+    for i, item in enumerate(items):
+        try:
+            with _catat_job(timings[i]):
+                if 'input_path' in item:
+                    img = baca_gambar(item['input_path'])
+                else:
+                    img = baca_gambar_bytes(item['input_data'])
+                sizes[i] = (img.shape[1], img.shape[0])
+                if cek_gambar_hitam_putih(img):
+                    bw_index.append(i)
+                    bw_images.append(img)
+                else:
+                    results[i] = tulis(i, img)
+        except Exception as e:
+            results[i] = {'error': f"{type(e).__name__}: {e}"}
+    
+    if bw_images:
+        print(f"[INFO] Mewarnai {len(bw_images)} foto dalam satu batch ({model_type})...")
+        from colorizers import predict_ab
+        from colorizers.util import iter_postprocess_strips
+        start = time.perf_counter()
+        out_abs = predict_ab(bw_images, model_type=model_type, batch_size=len(bw_images),
+                             device='cpu', bgr=True)
+        for i in bw_index:
+            timings[i]['colorize'] = time.perf_counter() - start
+        for k, (i, out_ab) in enumerate(zip(bw_index, out_abs)):
+            img, bw_images[k] = bw_images[k], None
+            try:
+                strips = iter_postprocess_strips(img, out_ab, saturation_boost=saturation_boost,
+                                                 strip_rows=STRIP_ROWS, bgr=True)
+                results[i] = tulis(i, img, strips)
+            except Exception as e:
+                results[i] = {'error': f"{type(e).__name__}: {e}"}
+    
+    return results
+
+
+def pemanasan(models=WARMUP_MODELS, scales: tuple = (2, 4), batch_size: int = 8,
+              backend: str = SR_BACKEND) -> dict:
+    """
+    Muat model lalu jalankan inferensi dummy pada shape yang dipakai job sungguhan
+    (colorizer: 256x256 per batch 1 dan batch_size; SR: satu tile penuh + pad),
+    supaya job pertama tidak membayar load bobot dan overhead panggilan pertama
+    PyTorch (alokasi memori, pemilihan kernel).
+    
+    Args:
+        models: list atau string dipisah koma, berisi 'siggraph17', 'eccv16', 'sr'
+    
+    Returns:
+        dict {'models': {nama: {'ms'} / {'error'} / {'skipped'}}, 'total_ms'}
+    """
+    import numpy as np
+    
+    if isinstance(models, str):
+        models = [m.strip() for m in models.split(',') if m.strip()]
+    
+    report = {}
+    start = time.perf_counter()
+    for name in models:
+        t = time.perf_counter()
+        try:
+            if name == 'sr':
+                if pilih_backend_sr(backend) != 'torch':
+                    report[name] = {'skipped': 'backend ncnn'}
+                    continue
+                from sr_engine import get_upscaler
+                # Model luma (1 channel) ikut dipanaskan bila jalur luma aktif
+                for scale in scales:
+                    for luma in ((False, True) if SR_LUMA else (False,)):
+                        upscaler = get_upscaler(scale=scale, luma=luma)
+                        size = upscaler.tile + 2 * upscaler.pad
+                        tile = np.zeros((size, size) if luma else (size, size, 3), dtype=np.uint8)
+                        upscaler.upscale_tile(tile, upscaler.pad, size - upscaler.pad,
+                                              upscaler.pad, size - upscaler.pad)
+            elif name in ('eccv16', 'siggraph17'):
+                from colorizers import colorize_batch, get_colorizer
+                get_colorizer(name)
+                dummy = np.full((512, 512, 3), 128, dtype=np.uint8)
+                for n in sorted({1, batch_size}):
+                    colorize_batch([dummy] * n, model_type=name, batch_size=n)
+            else:
+                raise ValueError(f"Model tidak dikenal: {name}")
+            report[name] = {'ms': round((time.perf_counter() - t) * 1000, 1)}
+        except Exception as e:
+            report[name] = {'error': f"{type(e).__name__}: {e}"}
+    
+    return {'models': report, 'total_ms': round((time.perf_counter() - start) * 1000, 1)}
+
+
+def warnai_dan_hd(img: np.ndarray, output_path: str, scale: int = 4, model_type: str = 'siggraph17',
+                  saturation_boost: float = 1.3, backend: str = SR_BACKEND, sr_luma: bool = SR_LUMA,
+                  out_ab: np.ndarray = None) -> None:
+    """Mode both dari array BGR: jalur luma bila diminta (backend torch), selain itu warnai lalu SR RGB."""
+    if sr_luma and pilih_backend_sr(backend) == 'torch':
+        warnai_hd_luma(img, output_path, os.path.splitext(output_path)[1], scale=scale,
+                       model_type=model_type, saturation_boost=saturation_boost, out_ab=out_ab)
+        return
+    if sr_luma:
+        print("[WARN] Jalur luma butuh backend torch, memakai warnai lalu SR RGB")
+    colored = warnai_array(img, model_type=model_type, saturation_boost=saturation_boost, out_ab=out_ab)
+    restorasi_hd_array(colored, output_path, scale=scale, backend=backend)
+
+
+def proses_gambar(input_path: str, output_path: str, mode: str = 'enhance', scale: int = 4,
+                  model_type: str = 'siggraph17', saturation_boost: float = 1.3,
+                  backend: str = SR_BACKEND, sr_luma: bool = SR_LUMA, progres: bool = False) -> dict:
+    """
+    Jalankan satu job (enhance / colorize / both) dan kembalikan info hasil.
+    
+    Antar tahap data dikirim sebagai ndarray; decode hanya di input dan
+    encode hanya di output. Pengecekan hasil memakai header file saja.
+    Hasil juga memuat durasi per tahap (timings, detik) untuk metrik server.
+    Mode 'auto' diganti dengan hasil pilih_mode_auto (ada di 'mode' hasil).
+    sr_luma: mode both memakai jalur luma (warnai_hd_luma).
+    progres: (di worker pool) kirim preview murah (buat_preview) sebelum
+    pemrosesan utama, lalu progres per tahap dan per tile SR ke server.
+    Video dan GIF/WebP animasi diteruskan ke video_pipeline.proses_video.
+    """
+    from video_pipeline import is_animasi, proses_video
+    if is_animasi(input_path):
+        return proses_video(input_path, output_path, mode=mode, scale=scale, model_type=model_type,
+                            saturation_boost=saturation_boost)
+    
+    kirim = None
+    if progres:
+        from worker_pool import kirim_progres as kirim
+    
+    with _catat_job() as timings, _lapor_progres(kirim):
+        img = None
+        if mode in ('auto', 'both') or progres:
+            img = baca_gambar(input_path)
+        if mode == 'auto':
+            mode = pilih_mode_auto(img)
+            print(f"[INFO] Mode auto: {mode}")
+        
+        out_ab = None
+        if progres and mode in MODES:
+            preview, out_ab = buat_preview(img, mode, scale=scale, model_type=model_type,
+                                           saturation_boost=saturation_boost)
+            _lapor(stage='preview', preview=preview)
+        
+        if mode == 'enhance':
+            if img is not None:
+                restorasi_hd_array(img, output_path, scale=scale, backend=backend)
+            else:
+                restorasi_hd(input_path, output_path, scale=scale, backend=backend)
+            
+        elif mode == 'colorize':
+            if img is not None:
+                warnai_ke_file(img, output_path, os.path.splitext(output_path)[1], model_type=model_type,
+                               saturation_boost=saturation_boost, out_ab=out_ab)
+            else:
+                warnai_foto(input_path, output_path, model_type=model_type, saturation_boost=saturation_boost)
+            
+        elif mode == 'both':
+            print("[INFO] Mode: Warnai foto BW + Restorasi HD")
+            warnai_dan_hd(img, output_path, scale=scale, model_type=model_type,
+                          saturation_boost=saturation_boost, backend=backend, sr_luma=sr_luma, out_ab=out_ab)
+        
+        else:
+            raise ValueError(f"Mode tidak dikenal: {mode}")
+    
+    if not os.path.exists(output_path):
+        raise RuntimeError("File output tidak ditemukan")
+    
+    input_width, input_height = baca_ukuran(input_path)
+    width, height = baca_ukuran(output_path)
+    return {'output_path': output_path, 'mode': mode, 'scale': scale,
+            'width': width, 'height': height,
+            'input_width': input_width, 'input_height': input_height,
+            'output_bytes': os.path.getsize(output_path), 'timings': timings}
+
+
+def proses_bytes(input_data: bytes, ext: str, mode: str = 'enhance', scale: int = 4,
+                 model_type: str = 'siggraph17', saturation_boost: float = 1.3,
+                 backend: str = SR_BACKEND, sr_luma: bool = SR_LUMA) -> dict:
+    """
+    Seperti proses_gambar, tetapi input dan output berupa bytes di memori:
+    tidak ada file di input/ maupun output/. Hanya SR lewat executable ncnn
+    (yang butuh file) memakai file sementara di folder temp lokal.
+    
+    Returns:
+        dict dengan 'data' (bytes hasil, format sesuai ext) plus info yang sama
+        dengan proses_gambar
+    """
+    if mode not in MODES:
+        raise ValueError(f"Mode tidak dikenal: {mode}")
+    
+    with _catat_job() as timings:
+        img = baca_gambar_bytes(input_data)
+        input_height, input_width = img.shape[:2]
+        if mode == 'auto':
+            mode = pilih_mode_auto(img)
+        
+        luma = mode == 'both' and sr_luma and pilih_backend_sr(backend) == 'torch'
+        if mode == 'both' and not luma:
+            img = warnai_array(img, model_type=model_type, saturation_boost=saturation_boost)
+        
+        if mode == 'colorize' or luma:
+            buf = io.BytesIO()
+            if luma:
+                width, height = warnai_hd_luma(img, buf, ext, scale=scale, model_type=model_type,
+                                               saturation_boost=saturation_boost)
+            else:
+                width, height = warnai_ke_file(img, buf, ext, model_type=model_type,
+                                               saturation_boost=saturation_boost)
+            data = buf.getvalue()
+        elif pilih_backend_sr(backend) == 'torch':
+            img = upscale_array(img, scale=scale)
+            height, width = img.shape[:2]
+            data = encode_gambar(img, ext)
+        else:
+            with tempfile.TemporaryDirectory() as tmp:
+                output_path = os.path.join(tmp, f"output{ext}")
+                restorasi_hd_array(img, output_path, scale=scale, backend='ncnn')
+                width, height = baca_ukuran(output_path)
+                with open(output_path, 'rb') as f:
+                    data = f.read()
+    
+    return {'data': data, 'mode': mode, 'scale': scale, 'width': width, 'height': height,
+            'input_width': input_width, 'input_height': input_height,
+            'output_bytes': len(data), 'timings': timings}
+
+
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.webp', '.bmp', '.tif', '.tiff')
+
+
+def cari_gambar(input_dir: str, pattern: str = None, exclude_dir: str = None) -> list:
+    """
+    Daftar file gambar di input_dir (rekursif), terurut.
+    
+    Args:
+        pattern: glob relatif terhadap input_dir (mis. '*.jpg', '2019/**/*.png');
+            default semua gambar, GIF, dan video
+        exclude_dir: folder yang dilewati (mis. output di dalam input)
+    """
+    import glob
+    from video_pipeline import ANIMATION_EXTENSIONS, VIDEO_EXTENSIONS
+    
+    extensions = IMAGE_EXTENSIONS + ANIMATION_EXTENSIONS + VIDEO_EXTENSIONS
+    if pattern:
+        paths = glob.glob(os.path.join(glob.escape(input_dir), pattern), recursive=True)
+    else:
+        paths = []
+        for root, dirs, files in os.walk(input_dir):
+            dirs.sort()
+            paths.extend(os.path.join(root, f) for f in files
+                         if os.path.splitext(f)[1].lower() in extensions)
+    exclude = os.path.abspath(exclude_dir) + os.sep if exclude_dir else None
+    return sorted(p for p in paths if os.path.isfile(p)
+                  and not (exclude and os.path.abspath(p).startswith(exclude)))
+
+
+def baca_manifest(manifest_path: str) -> dict:
+    """Status terakhir per file input dari manifest JSONL ({input relatif: record})."""
+    import json
+    
+    records = {}
+    if not os.path.exists(manifest_path):
+        return records
+    with open(manifest_path, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue  # baris terakhir terpotong saat proses dihentikan
+            records[record['input']] = record
+    return records
+
+
+def proses_folder(input_dir: str, output_dir: str, pattern: str = None, mode: str = 'enhance',
+                  scale: int = 4, backend: str = SR_BACKEND, workers: int = None,
+                  manifest_path: str = None, skip_failed: bool = False, timeout: float = None,
+                  sr_luma: bool = SR_LUMA) -> dict:
+    """
+    Proses semua gambar di input_dir ke output_dir (struktur subfolder dipertahankan)
+    memakai WorkerPool: model dimuat sekali per worker, file dibagi ke semua worker.
+    
+    Setiap file yang selesai atau gagal dicatat sebagai satu baris JSON di
+    manifest (default: <output_dir>/manifest.jsonl), lengkap dengan status dan
+    timings. Saat dijalankan ulang, file yang sudah 'done' (output ada, input
+    tidak berubah, mode/scale/backend/sr_luma sama) dilewati; file 'failed'
+    diulang kecuali skip_failed.
+    File yang gagal tidak menghentikan proses.
+    
+    Returns:
+        dict jumlah file per status: done, failed, skipped
+    """
+    import json
+    from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+    from worker_pool import WorkerPool
+    
+    input_dir = os.path.abspath(input_dir)
+    output_dir = os.path.abspath(output_dir)
+    manifest_path = manifest_path or os.path.join(output_dir, 'manifest.jsonl')
+    os.makedirs(output_dir, exist_ok=True)
+    
+    # Backend dicatat setelah 'auto' di-resolve: hasil ncnn dan torch berbeda
+    backend = pilih_backend_sr(backend)
+    settings = {'mode': mode, 'scale': scale, 'backend': backend, 'sr_luma': bool(sr_luma)}
+    
+    previous = baca_manifest(manifest_path)
+    todo = []
+    counts = {'done': 0, 'failed': 0, 'skipped': 0}
+    for input_path in cari_gambar(input_dir, pattern, exclude_dir=output_dir):
+        rel = os.path.relpath(input_path, input_dir)
+        stat = os.stat(input_path)
+        record = previous.get(rel)
+        # Record lama tanpa backend/sr_luma dianggap beda setelan dan diproses ulang
+        if record is not None and (record.get('size'), record.get('mtime')) == (stat.st_size, stat.st_mtime) \
+                and all(record.get(k) == v for k, v in settings.items()):
+            if (record['status'] == 'done' and os.path.exists(os.path.join(output_dir, record['output']))) \
+                    or (record['status'] == 'failed' and skip_failed):
+                counts['skipped'] += 1
+                continue
+        todo.append((rel, stat))
+    
+    print(f"[INFO] {len(todo)} file diproses, {counts['skipped']} dilewati (sudah ada di manifest)")
+    if not todo:
+        return counts
+    
+    # Warm-up hanya model yang dipakai mode ini
+    models = []
+    if mode != 'enhance':
+        models.append('siggraph17')
+    if mode != 'colorize':
+        models.append('sr')
+    warmup = ('image_enhancer:pemanasan', {'models': models, 'scales': (scale,), 'batch_size': 1,
+                                          'backend': backend})
+    pool = WorkerPool(size=workers, timeout=timeout, warmup=warmup)
+    
+    def jalankan(rel):
+        output_path = os.path.join(output_dir, rel)
+        os.makedirs(os.path.dirname(output_path), exist_ok=True)
+        # Tulis ke file sementara dulu supaya output setengah jadi tidak terlihat selesai
+        name, ext = os.path.splitext(output_path)
+        part_path = f"{name}.part{ext}"
+        start = time.perf_counter()
+        try:
+            result = pool.submit('image_enhancer:proses_gambar', input_path=os.path.join(input_dir, rel),
+                                 output_path=part_path, mode=mode, scale=scale, backend=backend,
+                                 sr_luma=sr_luma)
+            os.replace(part_path, output_path)
+        finally:
+            if os.path.exists(part_path):
+                os.remove(part_path)
+        result['seconds'] = time.perf_counter() - start
+        return result
+    
+    start = time.perf_counter()
+    finished = 0
+    try:
+        with open(manifest_path, 'a', encoding='utf-8') as manifest, \
+                ThreadPoolExecutor(max_workers=pool.size) as executor:
+            pending = {}
+            queue = iter(todo)
+            while True:
+                # Batasi future yang antre agar arsip besar tidak memenuhi memori
+                for rel, stat in queue:
+                    pending[executor.submit(jalankan, rel)] = (rel, stat)
+                    if len(pending) >= pool.size * 2:
+                        break
+                if not pending:
+                    break
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    rel, stat = pending.pop(future)
+                    record = dict({'input': rel, 'output': rel, 'size': stat.st_size, 'mtime': stat.st_mtime},
+                                  **settings, finished_at=time.time())
+                    try:
+                        result = future.result()
+                        record.update(status='done', mode_used=result['mode'],
+                                      seconds=round(result['seconds'], 3),
+                                      width=result['width'], height=result['height'],
+                                      timings={k: round(v, 4) for k, v in result['timings'].items()})
+                    except Exception as e:
+                        record.update(status='failed', error=str(e))
+                        print(f"[WARN] Gagal: {rel}: {e}")
+                    counts[record['status']] += 1
+                    manifest.write(json.dumps(record) + '\n')
+                    manifest.flush()
+                    finished += 1
+                    if finished % 50 == 0 or finished == len(todo):
+                        elapsed = time.perf_counter() - start
+                        rate = finished / elapsed
+                        print(f"[INFO] {finished}/{len(todo)} ({rate:.2f} file/detik, "
+                              f"sisa ~{(len(todo) - finished) / rate:.0f} detik)")
+    finally:
+        pool.shutdown()
+    
+    return counts
+
+
 if __name__ == '__main__':
     parser = argparse.ArgumentParser(description='Image HD Enhancement & Colorization')
-    parser.add_argument('input', help='Path gambar input (opsional, gunakan nama file saja)')
-    parser.add_argument('output', help='Path gambar output (opsional, gunakan nama file saja)')
+    parser.add_argument('input', nargs='?', help='Path gambar input (opsional, gunakan nama file saja)')
+    parser.add_argument('output', nargs='?', help='Path gambar output (opsional, gunakan nama file saja)')
     parser.add_argument('--mode', type=str, default='enhance', 
-                        choices=['enhance', 'colorize', 'both'],
-                        help='Mode: enhance (HD saja), colorize (warnai saja), both (warnai + HD)')
+                        choices=list(MODES),
+                        help='Mode: enhance (HD saja), colorize (warnai saja), both (warnai + HD), '
+                             'auto (warnai hanya foto BW/sepia, HD bila belum besar)')
     parser.add_argument('--scale', type=int, default=4, choices=[2, 4],
                         help='Faktor pembesaran (default: 4)')
+    parser.add_argument('--backend', type=str, default=SR_BACKEND, choices=['auto', 'ncnn', 'torch'],
+                        help='Backend super resolution: ncnn (exe Vulkan), torch (CPU in-process), auto')
+    parser.add_argument('--sr-luma', action='store_true', default=SR_LUMA,
+                        help='Mode both untuk foto BW: SR hanya luma, warna (ab) diperbesar terpisah '
+                             '(backend torch; default: ANJAYHD_SR_LUMA)')
+    parser.add_argument('--input-dir', type=str, default=None,
+                        help='Proses semua gambar di folder ini (rekursif) alih-alih satu file')
+    parser.add_argument('--output-dir', type=str, default=None, help='Folder hasil untuk --input-dir')
+    parser.add_argument('--glob', type=str, default=None,
+                        help="Pola file relatif terhadap --input-dir, mis. '**/*.jpg' (default: semua gambar)")
+    parser.add_argument('--workers', type=int, default=None,
+                        help='Jumlah worker proses (default: ANJAYHD_WORKERS / ANJAYHD_CPU_POLICY)')
+    parser.add_argument('--manifest', type=str, default=None,
+                        help='File manifest JSONL (default: <output-dir>/manifest.jsonl)')
+    parser.add_argument('--skip-failed', action='store_true',
+                        help='Saat resume, jangan ulangi file yang sebelumnya gagal')
+    parser.add_argument('--timeout', type=float, default=None,
+                        help='Batas waktu per file dalam detik (default: ANJAYHD_JOB_TIMEOUT)')
     
     args = parser.parse_args()
     
+    if args.input_dir:
+        if not args.output_dir:
+            parser.error('--output-dir wajib diisi bersama --input-dir')
+        counts = proses_folder(args.input_dir, args.output_dir, pattern=args.glob, mode=args.mode,
+                               scale=args.scale, backend=args.backend, workers=args.workers,
+                               manifest_path=args.manifest, skip_failed=args.skip_failed,
+                               timeout=args.timeout, sr_luma=args.sr_luma)
+        print(f"[INFO] Selesai: {counts['done']} berhasil, {counts['failed']} gagal, "
+              f"{counts['skipped']} dilewati")
+        sys.exit(1 if counts['failed'] else 0)
+    
+    if not args.input or not args.output:
+        parser.error('input dan output wajib diisi (atau pakai --input-dir/--output-dir)')
+    
     input_path = args.input
     output_path = args.output
     
@@ -145,21 +1116,8 @@ if __name__ == '__main__':
         output_path = os.path.join(OUTPUT_DIR, output_path)
     
     try:
-        if args.mode == 'enhance':
-            restorasi_hd(input_path, output_path, scale=args.scale)
-            
-        elif args.mode == 'colorize':
-            warnai_foto(input_path, output_path)
-            
-        elif args.mode == 'both':
-            print("[INFO] Mode: Warnai foto BW + Restorasi HD")
-            
-            with tempfile.NamedTemporaryFile(suffix='.jpg', delete=False) as tmp:
-                temp_path = tmp.name
-            
-            warnai_foto(input_path, temp_path)
-            restorasi_hd(temp_path, output_path, scale=args.scale)
-            os.remove(temp_path)
+        proses_gambar(input_path, output_path, mode=args.mode, scale=args.scale, backend=args.backend,
+                      sr_luma=args.sr_luma)
             
     except FileNotFoundError as e:
         print(f"[ERROR] {e}")
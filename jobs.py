@@ -0,0 +1,494 @@
+"""
+Antrian Job Asinkron
+Job diterima langsung (mendapat job_id), lalu dijalankan di WorkerPool oleh
+thread dispatcher. Kedalaman antrian dibatasi; bila penuh, submit gagal dengan
+JobQueueFull beserta estimasi Retry-After sehingga server tidak kebanjiran.
+
+Job dengan dedup_key yang sama dan masih berjalan digabung (single-flight):
+hanya satu komputasi yang dijalankan, job lain menumpang hasilnya.
+
+Job yang punya batch_task (mis. colorize) dikumpulkan menjadi micro-batch:
+job sejenis yang datang dalam batch_window sejak job pertama dijalankan
+bersama dalam satu panggilan worker, maksimal max_batch job per batch.
+
+Selama berjalan, task bisa mengirim progres (worker_pool.kirim_progres):
+dict progres terakhir ikut di status job, dan preview (bytes gambar murah
+yang dikirim sebelum hasil akhir) disimpan sampai job selesai. Setiap
+perubahan status/progres menaikkan versi yang bisa ditunggu lewat watch()
+(mis. untuk Server-Sent Events).
+
+Status job: queued -> running -> done / failed / cancelled
+"""
+
+import collections
+import math
+import os
+import threading
+import time
+import uuid
+
+from worker_pool import WorkerCancelled, WorkerError, WorkerTimeout
+
+
+DEFAULT_QUEUE_DEPTH = int(os.environ.get('ANJAYHD_QUEUE_DEPTH', '16'))
+DEFAULT_JOB_TTL = float(os.environ.get('ANJAYHD_JOB_TTL', '3600'))
+DEFAULT_BATCH_WINDOW = float(os.environ.get('ANJAYHD_BATCH_WINDOW_MS', '50')) / 1000.
+DEFAULT_MAX_BATCH = int(os.environ.get('ANJAYHD_MAX_BATCH', '8'))
+
+QUEUED = 'queued'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+CANCELLED = 'cancelled'
+
+FINISHED = (DONE, FAILED, CANCELLED)
+
+
+class JobQueueFull(RuntimeError):
+    """Antrian penuh; coba lagi setelah retry_after detik."""
+
+    def __init__(self, retry_after):
+        super().__init__(f"Antrian penuh, coba lagi dalam {retry_after} detik")
+        self.retry_after = retry_after
+
+
+class _Run:
+    """Satu komputasi di worker; bisa dipakai bersama oleh beberapa Job."""
+
+    def __init__(self, task, kwargs, dedup_key=None, cleanup=(), on_success=None,
+                 batch_task=None, batch_args=None, timeout=None):
+        self.task = task
+        self.kwargs = kwargs
+        self.timeout = timeout
+        self.dedup_key = dedup_key
+        self.cleanup = list(cleanup)
+        self.on_success = on_success
+        self.batch_task = batch_task
+        self.batch_args = dict(batch_args or {})
+        self.batch_key = (batch_task, tuple(sorted(self.batch_args.items()))) if batch_task else None
+        self.status = QUEUED
+        self.enqueued_at = time.time()
+        self.result = None
+        self.error = None
+        self.started_at = None
+        self.finished_at = None
+        self.subscribers = 0
+        self.progress = None
+        self.preview = None
+        self.cancel_event = threading.Event()
+        self.done_event = threading.Event()
+
+
+class _AllCancelled:
+    """Pengganti cancel_event untuk batch: dianggap batal bila semua run dibatalkan."""
+
+    def __init__(self, runs):
+        self._runs = runs
+
+    def is_set(self):
+        return all(run.cancel_event.is_set() for run in self._runs)
+
+
+class BatchStats:
+    """Distribusi ukuran batch dan delay antrian, untuk tuning micro-batching."""
+
+    def __init__(self, window=1000):
+        self.batch_sizes = collections.Counter()
+        self._delays = collections.deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, batch):
+        with self._lock:
+            self.batch_sizes[len(batch)] += 1
+            self._delays.extend(run.started_at - run.enqueued_at for run in batch)
+
+    def snapshot(self):
+        with self._lock:
+            delays = sorted(self._delays)
+            sizes = dict(sorted(self.batch_sizes.items()))
+
+        def pct(q):
+            return delays[min(len(delays) - 1, int(q * len(delays)))] * 1000. if delays else 0.
+
+        return {
+            'batch_sizes': {str(k): v for k, v in sizes.items()},
+            'queue_delay_ms': {
+                'count': len(delays),
+                'mean': sum(delays) / len(delays) * 1000. if delays else 0.,
+                'p50': pct(0.50),
+                'p95': pct(0.95),
+                'max': delays[-1] * 1000. if delays else 0.,
+            },
+        }
+
+
+class Job:
+    """Handle job milik satu request; statusnya mengikuti _Run yang dipakai."""
+
+    def __init__(self, run, meta=None):
+        self.id = uuid.uuid4().hex[:12]
+        self.run = run
+        self.meta = dict(meta or {})
+        self.created_at = time.time()
+        self.cancelled_at = None
+
+    @property
+    def status(self):
+        return CANCELLED if self.cancelled_at else self.run.status
+
+    @property
+    def finished_at(self):
+        return self.cancelled_at or self.run.finished_at
+
+    def wait(self, timeout=None):
+        """Tunggu sampai job selesai (untuk pemanggil sinkron)."""
+        return self.run.done_event.wait(timeout)
+
+    def to_dict(self):
+        data = {
+            'job_id': self.id,
+            'status': self.status,
+            'created_at': self.created_at,
+            'started_at': self.run.started_at,
+            'finished_at': self.finished_at,
+        }
+        data.update(self.meta)
+        if self.status == RUNNING and self.run.progress:
+            data['progress'] = dict(self.run.progress)
+        if self.status == RUNNING and self.run.preview is not None:
+            data['preview'] = True
+        if self.run.error and not self.cancelled_at:
+            data['error'] = self.run.error
+        return data
+
+
+class JobManager:
+    """Antrian job berbatas yang dilayani oleh WorkerPool."""
+
+    def __init__(self, get_pool, max_depth=None, ttl=None, batch_window=None, max_batch=None,
+                 on_finish=None):
+        """
+        on_finish: callback(run) opsional setiap komputasi selesai (done/failed/
+            cancelled), mis. untuk metrik. Dipanggil dengan lock dipegang, jadi
+            harus ringan dan tidak memanggil balik JobManager.
+        """
+        self._get_pool = get_pool
+        self._on_finish = on_finish
+        self.max_depth = max(1, int(max_depth or DEFAULT_QUEUE_DEPTH))
+        self.ttl = DEFAULT_JOB_TTL if ttl is None else ttl
+        self.batch_window = DEFAULT_BATCH_WINDOW if batch_window is None else batch_window
+        self.max_batch = max(1, int(max_batch or DEFAULT_MAX_BATCH))
+        self.batch_stats = BatchStats()
+
+        self._jobs = {}
+        self._pending = collections.deque()
+        self._inflight = {}
+        self._collecting = {}
+        self._cond = threading.Condition()
+        self._changed = threading.Condition()
+        self._version = 0
+        self._durations = collections.deque(maxlen=20)
+        self._threads = []
+        self.running = 0
+        self.coalesced = 0
+
+    def _notify(self):
+        """Tandai ada perubahan status/progres (boleh dipanggil dengan _cond dipegang)."""
+        with self._changed:
+            self._version += 1
+            self._changed.notify_all()
+
+    def watch(self, version=None, timeout=None):
+        """
+        Tunggu sampai ada perubahan status/progres job mana pun setelah version
+        (None: langsung kembali). Kembalikan versi terbaru; pemanggil lalu
+        membaca status() dan membandingkan sendiri.
+        """
+        with self._changed:
+            if version is not None:
+                self._changed.wait_for(lambda: self._version != version, timeout)
+            return self._version
+
+    def _start_dispatchers(self):
+        if self._threads:
+            return
+        pool = self._get_pool()
+        for i in range(pool.size):
+            t = threading.Thread(target=self._dispatch_loop, name=f"anjayhd-dispatch-{i}", daemon=True)
+            t.start()
+            self._threads.append(t)
+
+    def retry_after(self):
+        """Estimasi (detik) kapan antrian punya slot kosong lagi."""
+        avg = sum(self._durations) / len(self._durations) if self._durations else 30.0
+        workers = max(1, len(self._threads))
+        return max(1, int(math.ceil(avg * len(self._pending) / workers)))
+
+    def submit(self, task, meta=None, cleanup=(), dedup_key=None, on_success=None,
+               batch_task=None, batch_args=None, timeout=None, **kwargs):
+        """
+        Masukkan job ke antrian. Raise JobQueueFull bila antrian penuh.
+
+        Args:
+            task: 'modul:fungsi' yang dijalankan di worker
+            meta: data tambahan yang ikut ditampilkan di status job
+            cleanup: file milik job ini yang dihapus setelah job selesai; bila
+                job digabung ke run yang sudah berjalan, langsung dihapus (jangan
+                masukkan file yang juga dipakai run lain)
+            dedup_key: job dengan key sama yang masih berjalan akan digabung
+            on_success: callback(result) di thread dispatcher setelah sukses
+            batch_task: 'modul:fungsi' yang menerima items=[kwargs, ...] untuk
+                menjalankan beberapa job sejenis sekaligus (opsional)
+            batch_args: argumen tambahan batch_task; job hanya digabung dengan
+                job lain yang batch_task dan batch_args-nya sama
+            timeout: batas waktu job ini di worker (default: timeout pool)
+        """
+        with self._cond:
+            self._prune()
+
+            run = self._inflight.get(dedup_key) if dedup_key else None
+            if run is not None:
+                # Hanya file duplikat ini (input upload-nya); output ditulis run yang berjalan
+                self.coalesced += 1
+                self._remove_files(cleanup)
+            else:
+                run = _Run(task, kwargs, dedup_key=dedup_key, cleanup=cleanup, on_success=on_success,
+                           batch_task=batch_task, batch_args=batch_args, timeout=timeout)
+                batch = self._collecting.get(run.batch_key) if run.batch_key else None
+                if batch is not None and len(batch) < self.max_batch:
+                    run.status = RUNNING
+                    batch.append(run)
+                    self._cond.notify_all()
+                else:
+                    if len(self._pending) >= self.max_depth:
+                        raise JobQueueFull(self.retry_after())
+                    self._pending.append(run)
+                    self._start_dispatchers()
+                    self._cond.notify()
+                if dedup_key:
+                    self._inflight[dedup_key] = run
+
+            job = self._add_job(run, meta)
+            self._notify()
+            return job
+
+    def add_finished(self, meta=None):
+        """Daftarkan job yang sudah selesai tanpa komputasi (mis. cache hit)."""
+        run = _Run(None, {})
+        run.status = DONE
+        run.started_at = run.finished_at = time.time()
+        run.done_event.set()
+        with self._cond:
+            self._prune()
+            return self._add_job(run, meta)
+
+    def _add_job(self, run, meta):
+        run.subscribers += 1
+        job = Job(run, meta=meta)
+        self._jobs[job.id] = job
+        return job
+
+    def get(self, job_id):
+        with self._cond:
+            return self._jobs.get(job_id)
+
+    def status(self, job_id):
+        """Status job sebagai dict (termasuk posisi antrian), atau None."""
+        with self._cond:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+            data = job.to_dict()
+            if job.status == QUEUED:
+                data['queue_position'] = self._pending.index(job.run) + 1
+            return data
+
+    def preview(self, job_id):
+        """Bytes preview job yang masih berjalan, atau None."""
+        with self._cond:
+            job = self._jobs.get(job_id)
+            if job is None or job.status != RUNNING:
+                return None
+            return job.run.preview
+
+    def cancel(self, job_id):
+        """
+        Batalkan job. Komputasinya baru dihentikan bila tidak ada job lain
+        yang masih menunggu hasil yang sama.
+        """
+        with self._cond:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+            if job.status in FINISHED:
+                return job
+
+            job.cancelled_at = time.time()
+            run = job.run
+            run.subscribers -= 1
+            if run.subscribers > 0:
+                return job
+
+            if run.status == QUEUED:
+                self._pending.remove(run)
+                self._finish(run, CANCELLED)
+            elif run.status == RUNNING:
+                run.cancel_event.set()
+            self._notify()
+            return job
+
+    def discard(self, job_id):
+        """
+        Lupakan job yang sudah selesai sebelum ttl (mis. hasil bytes di memori
+        yang sudah dikirim ke client), agar hasilnya tidak tertahan di memori.
+        """
+        with self._cond:
+            job = self._jobs.get(job_id)
+            if job is not None and job.status in FINISHED:
+                del self._jobs[job_id]
+
+    def queue_depth(self):
+        with self._cond:
+            return len(self._pending)
+
+    @staticmethod
+    def _remove_files(paths):
+        for path in paths:
+            if os.path.exists(path):
+                os.remove(path)
+
+    def _finish(self, run, status, result=None, error=None):
+        run.status = status
+        run.result = result
+        run.error = error
+        run.finished_at = time.time()
+        # Preview hanya berguna selama job berjalan; jangan tertahan sampai ttl
+        run.preview = None
+        if run.dedup_key and self._inflight.get(run.dedup_key) is run:
+            del self._inflight[run.dedup_key]
+        self._remove_files(run.cleanup)
+        run.done_event.set()
+        self._notify()
+        if self._on_finish is not None:
+            try:
+                self._on_finish(run)
+            except Exception as e:
+                print(f"[WARN] on_finish gagal: {e}")
+
+    def _prune(self):
+        """Hapus catatan job selesai yang lebih tua dari ttl."""
+        cutoff = time.time() - self.ttl
+        for job_id in [j.id for j in self._jobs.values()
+                       if j.status in FINISHED and j.finished_at < cutoff]:
+            del self._jobs[job_id]
+
+    def _collect_batch(self, first):
+        """
+        Kumpulkan run sejenis untuk satu batch (dipanggil dengan lock dipegang).
+        Menunggu paling lama batch_window sejak run pertama masuk antrian.
+        """
+        batch = [first]
+        key = first.batch_key
+        if self.max_batch <= 1 or key in self._collecting:
+            return batch
+
+        for run in [r for r in self._pending if r.batch_key == key][:self.max_batch - 1]:
+            self._pending.remove(run)
+            run.status = RUNNING
+            batch.append(run)
+
+        deadline = first.enqueued_at + self.batch_window
+        self._collecting[key] = batch
+        try:
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+        finally:
+            del self._collecting[key]
+        return batch
+
+    def _progress(self, run, data):
+        """Simpan progres dari worker (dipanggil di thread dispatcher)."""
+        data = dict(data)
+        preview = data.pop('preview', None)
+        with self._cond:
+            if run.status != RUNNING:
+                return
+            if preview is not None:
+                run.preview = preview
+            run.progress = data
+            self._notify()
+
+    @staticmethod
+    def _execute(pool, task, cancel_event, kwargs, timeout=None, on_progress=None):
+        """Jalankan task di pool; kembalikan (status, result, error)."""
+        try:
+            result = pool.submit(task, timeout=timeout, cancel_event=cancel_event,
+                                 on_progress=on_progress, **kwargs)
+            return DONE, result, None
+        except WorkerCancelled:
+            return CANCELLED, None, None
+        except WorkerTimeout:
+            return FAILED, None, 'Proses timeout (terlalu lama)'
+        except WorkerError as e:
+            return FAILED, None, f'Proses gagal: {e}'
+        except Exception as e:
+            return FAILED, None, str(e)
+
+    @staticmethod
+    def _on_success(run, status, result, error):
+        if status == DONE and run.on_success is not None:
+            try:
+                run.on_success(result)
+            except Exception as e:
+                return FAILED, None, str(e)
+        return status, result, error
+
+    def _run_batch(self, pool, batch):
+        """Jalankan beberapa run dalam satu panggilan worker; hasil per item."""
+        head = batch[0]
+        status, results, error = self._execute(
+            pool, head.batch_task, _AllCancelled(batch),
+            dict(head.batch_args, items=[run.kwargs for run in batch])
+        )
+        outcomes = []
+        for i, run in enumerate(batch):
+            if status != DONE:
+                outcomes.append((status, None, error))
+            elif 'error' in results[i]:
+                outcomes.append((FAILED, None, f"Proses gagal: {results[i]['error']}"))
+            else:
+                outcomes.append(self._on_success(run, DONE, results[i], None))
+        return outcomes
+
+    def _dispatch_loop(self):
+        pool = self._get_pool()
+        while True:
+            with self._cond:
+                while not self._pending:
+                    self._cond.wait()
+                run = self._pending.popleft()
+                run.status = RUNNING
+                batch = self._collect_batch(run) if run.batch_key else [run]
+                started_at = time.time()
+                for r in batch:
+                    r.started_at = started_at
+                self.running += len(batch)
+                self._notify()
+
+            self.batch_stats.record(batch)
+
+            if len(batch) == 1:
+                outcome = self._execute(pool, run.task, run.cancel_event, run.kwargs, run.timeout,
+                                        on_progress=lambda data: self._progress(run, data))
+                outcomes = [self._on_success(run, *outcome)]
+            else:
+                outcomes = self._run_batch(pool, batch)
+
+            with self._cond:
+                self.running -= len(batch)
+                self._durations.append(time.time() - started_at)
+                for r, (status, result, error) in zip(batch, outcomes):
+                    self._finish(r, status, result=result, error=error)
@@ -0,0 +1,199 @@
+"""
+Metrik Server (format teks Prometheus)
+Counter, gauge, dan histogram sederhana dengan label, tanpa dependensi maupun
+service eksternal. Semua metrik tinggal di memori proses Flask; worker
+mengirim durasi per tahap lewat hasil job, lalu dicatat di sini.
+
+Usage:
+    registry = Registry()
+    requests = registry.counter('anjayhd_http_requests_total', 'Jumlah request', ('endpoint', 'status'))
+    requests.inc(endpoint='/jobs', status='202')
+    latency = registry.histogram('anjayhd_stage_seconds', 'Durasi tahap', ('stage',), buckets=(0.1, 1, 10))
+    latency.observe(0.42, stage='decode')
+    registry.gauge_callback('anjayhd_queue_depth', 'Job di antrian', lambda: job_manager.queue_depth())
+    text = registry.render()   # isi endpoint /metrics
+"""
+
+import math
+import threading
+
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# Detik: dari request ringan sampai SR gambar besar di CPU
+SECONDS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+MEGAPIXEL_BUCKETS = (0.1, 0.3, 0.5, 1, 2, 4, 8, 12, 16, 25, 50, 100)
+BYTES_BUCKETS = tuple(4 ** i * 1024 for i in range(2, 11))  # 16 KB - 256 MB
+
+
+def _format_value(value):
+    if value == math.inf:
+        return '+Inf'
+    if value == -math.inf:
+        return '-Inf'
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, help_text, labelnames=()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"Label {self.name} harus {self.labelnames}, bukan {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def header(self):
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+    def samples(self):
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+                for key, value in items]
+
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        if amount < 0:
+            raise ValueError("Counter tidak boleh turun")
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    kind = 'gauge'
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, help_text, labelnames=(), buckets=SECONDS_BUCKETS):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[0][i] += 1
+                    break
+            state[1] += value
+            state[2] += 1
+
+    def samples(self):
+        with self._lock:
+            items = sorted((key, (list(counts), total, count)) for key, (counts, total, count) in self._values.items())
+        lines = []
+        for key, (counts, total, count) in items:
+            cumulative = 0
+            for bound, n in zip(self.buckets, counts):
+                cumulative += n
+                labels = _format_labels(self.labelnames, key, [('le', _format_value(float(bound)))])
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, key, [('le', '+Inf')])
+            lines.append(f"{self.name}_bucket{labels} {count}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+class _Callback(_Metric):
+    """Nilai diambil saat render dari fungsi: angka, atau dict {tuple label: angka}."""
+
+    def __init__(self, name, help_text, fn, kind, labelnames=()):
+        super().__init__(name, help_text, labelnames)
+        self.kind = kind
+        self._fn = fn
+
+    def samples(self):
+        try:
+            value = self._fn()
+        except Exception:
+            return []
+        if value is None:
+            return []
+        if not isinstance(value, dict):
+            value = {(): value}
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(v)}"
+                for key, v in sorted(value.items())]
+
+
+class Registry:
+    """Kumpulan metrik satu proses; render() menghasilkan teks untuk /metrics."""
+
+    def __init__(self):
+        self._metrics = []
+        self._lock = threading.Lock()
+
+    def _register(self, metric):
+        with self._lock:
+            if any(m.name == metric.name for m in self._metrics):
+                raise ValueError(f"Metrik sudah terdaftar: {metric.name}")
+            self._metrics.append(metric)
+        return metric
+
+    def counter(self, name, help_text, labelnames=()):
+        return self._register(Counter(name, help_text, labelnames))
+
+    def gauge(self, name, help_text, labelnames=()):
+        return self._register(Gauge(name, help_text, labelnames))
+
+    def histogram(self, name, help_text, labelnames=(), buckets=SECONDS_BUCKETS):
+        return self._register(Histogram(name, help_text, labelnames, buckets))
+
+    def gauge_callback(self, name, help_text, fn, labelnames=()):
+        return self._register(_Callback(name, help_text, fn, 'gauge', labelnames))
+
+    def counter_callback(self, name, help_text, fn, labelnames=()):
+        """Counter yang sudah dihitung di tempat lain (mis. pool.restarts)."""
+        return self._register(_Callback(name, help_text, fn, 'counter', labelnames))
+
+    def render(self):
+        with self._lock:
+            metrics = list(self._metrics)
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.header())
+            lines.extend(metric.samples())
+        return '\n'.join(lines) + '\n'
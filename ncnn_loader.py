@@ -0,0 +1,368 @@
+"""
+Loader Model ncnn (.param/.bin) -> PyTorch
+Membaca graph ncnn (.param) dan bobot (.bin) yang sudah ada di models/models,
+lalu membangun jaringan in-process yang setara (lihat sr_engine.py).
+
+Hasil konversi disimpan di models/converted sebagai file torch (.pt) yang
+dimuat dengan mmap: load berikutnya hampir instan, dan semua worker proses
+berbagi page bobot yang sama dari page cache (tidak ada salinan per proses).
+Setiap file hasil konversi punya sidecar .json berisi checksum sha256 file
+sumber; bila sumber berubah, konversi diulang otomatis.
+
+Arsitektur yang dikenali:
+- SRVGGNetCompact : Convolution/PReLU berulang + PixelShuffle (realesr-animevideov3)
+- RRDBNet         : Convolution + Concat/Eltwise (realesrgan-x4plus, -anime)
+
+Usage:
+    python ncnn_loader.py models/models/realesr-animevideov3-x4.param
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import threading
+import time
+
+import numpy as np
+import torch
+
+from sr_engine import MODELS_DIR, RRDBNet, SRVGGNetCompact
+
+
+NCNN_DIR = os.path.join(MODELS_DIR, "models")
+CONVERTED_DIR = os.environ.get('ANJAYHD_CONVERTED_DIR', os.path.join(MODELS_DIR, "converted"))
+
+PARAM_MAGIC = 7767517
+
+# Tag header blok bobot ncnn (ModelBinFromDataReader::load, type 0)
+_TAG_FP16 = 0x01306B47
+_TAG_INT8 = 0x000D4B38
+_TAG_FP32_SCALED = 0x0002C056
+
+
+class NcnnFormatError(ValueError):
+    """File .param/.bin tidak valid atau memakai fitur yang belum didukung."""
+
+
+class NcnnLayer:
+    """Satu baris layer di file .param."""
+
+    def __init__(self, type, name, bottoms, tops, params):
+        self.type = type
+        self.name = name
+        self.bottoms = bottoms
+        self.tops = tops
+        self.params = params
+
+    def get(self, key, default=None):
+        return self.params.get(key, default)
+
+    def __repr__(self):
+        return f"NcnnLayer({self.type}, {self.name})"
+
+
+def _parse_value(value):
+    return float(value) if any(c in value for c in '.eE') else int(value)
+
+
+def parse_param(path):
+    """Parse file .param ncnn menjadi list NcnnLayer (urutan sesuai file)."""
+    with open(path, 'r') as f:
+        lines = [line.split() for line in f if line.strip()]
+
+    if not lines or int(lines[0][0]) != PARAM_MAGIC:
+        raise NcnnFormatError(f"Bukan file .param ncnn: {path}")
+    layer_count = int(lines[1][0])
+
+    layers = []
+    for parts in lines[2:]:
+        type, name = parts[0], parts[1]
+        n_bottom, n_top = int(parts[2]), int(parts[3])
+        pos = 4
+        bottoms = parts[pos:pos + n_bottom]
+        pos += n_bottom
+        tops = parts[pos:pos + n_top]
+        pos += n_top
+
+        params = {}
+        for item in parts[pos:]:
+            key, value = item.split('=', 1)
+            key = int(key)
+            if key <= -23300:
+                # Parameter array: -23300-id=count,v1,v2,...
+                values = value.split(',')
+                params[-key - 23300] = [_parse_value(v) for v in values[1:]]
+            else:
+                params[key] = _parse_value(value)
+        layers.append(NcnnLayer(type, name, bottoms, tops, params))
+
+    if len(layers) != layer_count:
+        raise NcnnFormatError(f"Jumlah layer tidak cocok ({len(layers)} != {layer_count}): {path}")
+    return layers
+
+
+class _BinReader:
+    """Pembaca blok bobot dari file .bin (little endian, blok di-align 4 byte)."""
+
+    def __init__(self, path):
+        self.data = np.fromfile(path, dtype=np.uint8)
+        self.pos = 0
+
+    def _take(self, nbytes):
+        end = self.pos + nbytes
+        if end > self.data.size:
+            raise NcnnFormatError("File .bin terlalu pendek untuk graph ini")
+        chunk = self.data[self.pos:end]
+        self.pos = end + (-nbytes % 4)
+        return chunk
+
+    def raw(self, count):
+        """Blok float32 tanpa header (bias, slope PReLU)."""
+        return self._take(count * 4).view('<f4').copy()
+
+    def tagged(self, count):
+        """Blok bobot dengan header 4 byte (fp32 mentah atau fp16)."""
+        tag = int(self._take(4).view('<u4')[0])
+        if tag == _TAG_FP16:
+            return self._take(count * 2).view('<f2').astype(np.float32)
+        if tag == 0 or tag == _TAG_FP32_SCALED:
+            return self._take(count * 4).view('<f4').copy()
+        if tag == _TAG_INT8:
+            raise NcnnFormatError("Bobot int8 ncnn belum didukung")
+        raise NcnnFormatError(f"Bobot ncnn terkuantisasi (tag {tag:#x}) belum didukung")
+
+    def remaining(self):
+        return self.data.size - self.pos
+
+
+def read_weights(layers, bin_path):
+    """
+    Baca bobot semua layer berparameter dari .bin, urut sesuai graph.
+
+    Returns:
+        list of (layer, [array, ...]); Convolution -> [weight OIHW, bias],
+        PReLU -> [slope]
+    """
+    reader = _BinReader(bin_path)
+    weights = []
+    for layer in layers:
+        if layer.type == 'Convolution':
+            if layer.get(8, 0):
+                raise NcnnFormatError(f"Convolution int8 belum didukung: {layer.name}")
+            out_ch, k = layer.get(0), layer.get(1)
+            size = layer.get(6)
+            w = reader.tagged(size).reshape(out_ch, size // (out_ch * k * k), k, k)
+            arrays = [w]
+            if layer.get(5, 0):
+                arrays.append(reader.raw(out_ch))
+            weights.append((layer, arrays))
+        elif layer.type == 'PReLU':
+            weights.append((layer, [reader.raw(layer.get(0))]))
+        elif layer.type in ('Input', 'Split', 'Concat', 'Eltwise', 'BinaryOp', 'Interp', 'PixelShuffle'):
+            continue
+        else:
+            raise NcnnFormatError(f"Layer ncnn belum didukung: {layer.type} ({layer.name})")
+
+    if reader.remaining():
+        raise NcnnFormatError(f"Sisa {reader.remaining()} byte di .bin tidak terpakai (graph tidak cocok)")
+    return weights
+
+
+def output_scale(layers):
+    """Skala akhir graph: PixelShuffle/upsample dikali Interp terakhir (varian x2/x3)."""
+    # Blob yang masih identik dengan input (Input/Split); Interp di atasnya
+    # adalah cabang residual, bukan bagian dari jalur utama.
+    input_blobs = set()
+    scale = 1.0
+    for layer in layers:
+        if layer.type == 'Input' or (layer.type == 'Split' and layer.bottoms[0] in input_blobs):
+            input_blobs.update(layer.tops)
+        elif layer.type == 'PixelShuffle':
+            scale *= layer.get(0)
+        elif layer.type == 'Interp' and layer.bottoms[0] not in input_blobs:
+            scale *= layer.get(1, 1.0)
+    return int(round(scale))
+
+
+def build_network(layers):
+    """Bangun jaringan PyTorch yang cocok dengan struktur graph ncnn."""
+    types = [layer.type for layer in layers]
+    convs = [layer for layer in layers if layer.type == 'Convolution']
+    if not convs:
+        raise NcnnFormatError("Graph tidak punya layer Convolution")
+    num_in_ch = convs[0].get(6) // (convs[0].get(0) * convs[0].get(1) ** 2)
+    num_feat = convs[0].get(0)
+
+    if 'PixelShuffle' in types and 'PReLU' in types:
+        upscale = next(layer.get(0) for layer in layers if layer.type == 'PixelShuffle')
+        num_out_ch = convs[-1].get(0) // (upscale * upscale)
+        return SRVGGNetCompact(num_in_ch=num_in_ch, num_out_ch=num_out_ch, num_feat=num_feat,
+                               num_conv=len(convs) - 2, upscale=upscale)
+
+    if 'Concat' in types and 'Eltwise' in types:
+        # conv_first + 15 conv per RRDB + conv_body/up1/up2/hr/last
+        num_block, rest = divmod(len(convs) - 6, 15)
+        if rest:
+            raise NcnnFormatError(f"Jumlah Convolution ({len(convs)}) tidak cocok dengan RRDBNet")
+        return RRDBNet(num_in_ch=num_in_ch, num_out_ch=convs[-1].get(0), num_feat=num_feat,
+                       num_block=num_block, num_grow_ch=convs[1].get(0))
+
+    raise NcnnFormatError("Arsitektur graph ncnn tidak dikenali")
+
+
+def to_state_dict(model, weights):
+    """Petakan bobot ncnn (urut graph) ke parameter model (urut definisi modul)."""
+    params = list(model.state_dict().items())
+    arrays = [a for _, layer_arrays in weights for a in layer_arrays]
+    if len(arrays) != len(params):
+        raise NcnnFormatError(f"Jumlah tensor tidak cocok ({len(arrays)} != {len(params)})")
+
+    state = {}
+    for (key, ref), arr in zip(params, arrays):
+        if tuple(ref.shape) != arr.shape:
+            raise NcnnFormatError(f"Shape {key} tidak cocok: {arr.shape} != {tuple(ref.shape)}")
+        state[key] = torch.from_numpy(arr)
+    return state
+
+
+def file_sha256(path):
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _source_info(paths):
+    """Ukuran + mtime file sumber (cek murah sebelum menghitung ulang sha256)."""
+    return [[os.path.basename(p), os.path.getsize(p), os.stat(p).st_mtime_ns] for p in paths]
+
+
+def _source_checksum(paths, meta):
+    """Checksum sumber; dipakai ulang dari sidecar bila ukuran/mtime tidak berubah."""
+    info = _source_info(paths)
+    if meta and meta.get('source_info') == info:
+        return meta['source_sha256'], info
+    h = hashlib.sha256()
+    for p in paths:
+        h.update(file_sha256(p).encode('ascii'))
+    return h.hexdigest(), info
+
+
+def _read_meta(meta_path):
+    try:
+        with open(meta_path, 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def convert(param_path, bin_path, out_path):
+    """Konversi .param/.bin ke file .pt (state dict + deskripsi arsitektur)."""
+    layers = parse_param(param_path)
+    model = build_network(layers)
+    state = to_state_dict(model, read_weights(layers, bin_path))
+
+    tmp_path = f"{out_path}.tmp"
+    torch.save({'arch': _describe(model), 'scale': output_scale(layers), 'state_dict': state}, tmp_path)
+    os.replace(tmp_path, out_path)
+    return model
+
+
+def _describe(model):
+    if isinstance(model, SRVGGNetCompact):
+        body_convs = [m for m in model.body if isinstance(m, torch.nn.Conv2d)]
+        return {'type': 'SRVGGNetCompact', 'num_in_ch': body_convs[0].in_channels,
+                'num_out_ch': body_convs[-1].out_channels // model.upscale ** 2,
+                'num_feat': body_convs[0].out_channels, 'num_conv': len(body_convs) - 2,
+                'upscale': model.upscale}
+    return {'type': 'RRDBNet', 'num_in_ch': model.conv_first.in_channels,
+            'num_out_ch': model.conv_last.out_channels, 'num_feat': model.conv_first.out_channels,
+            'num_block': len(model.body), 'num_grow_ch': model.body[0].rdb1.conv1.out_channels}
+
+
+def _from_arch(arch):
+    arch = dict(arch)
+    cls = {'SRVGGNetCompact': SRVGGNetCompact, 'RRDBNet': RRDBNet}[arch.pop('type')]
+    return cls(**arch)
+
+
+_load_lock = threading.Lock()
+
+
+def load_ncnn_model(param_path, bin_path=None, converted_dir=CONVERTED_DIR):
+    """
+    Muat model ncnn sebagai jaringan PyTorch (eval, tanpa grad).
+
+    Konversi hanya dilakukan sekali; load berikutnya memakai file .pt di
+    converted_dir lewat torch.load(mmap=True), dan tensor bobot model langsung
+    menunjuk ke halaman mmap (load_state_dict(assign=True)).
+
+    Returns:
+        (model, scale) - scale adalah skala akhir graph (mis. 2 untuk -x2)
+    """
+    if bin_path is None:
+        bin_path = os.path.splitext(param_path)[0] + '.bin'
+    for path in (param_path, bin_path):
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"File model ncnn tidak ditemukan: {path}")
+
+    name = os.path.splitext(os.path.basename(param_path))[0]
+    out_path = os.path.join(converted_dir, f"{name}.pt")
+    meta_path = os.path.join(converted_dir, f"{name}.json")
+
+    with _load_lock:
+        os.makedirs(converted_dir, exist_ok=True)
+        meta = _read_meta(meta_path)
+        checksum, info = _source_checksum([param_path, bin_path], meta)
+        fresh = (meta is not None and meta.get('source_sha256') == checksum
+                 and os.path.exists(out_path))
+
+        if not fresh:
+            start = time.time()
+            convert(param_path, bin_path, out_path)
+            meta = {'source_sha256': checksum, 'source_info': info,
+                    'converted_at': time.time(), 'convert_seconds': round(time.time() - start, 3)}
+            with open(f"{meta_path}.tmp", 'w') as f:
+                json.dump(meta, f, indent=2)
+            os.replace(f"{meta_path}.tmp", meta_path)
+        elif meta.get('source_info') != info:
+            meta['source_info'] = info
+            with open(f"{meta_path}.tmp", 'w') as f:
+                json.dump(meta, f, indent=2)
+            os.replace(f"{meta_path}.tmp", meta_path)
+
+    data = torch.load(out_path, map_location='cpu', mmap=True, weights_only=True)
+    with torch.device('meta'):
+        model = _from_arch(data['arch'])
+    model.load_state_dict(data['state_dict'], assign=True)
+    model.requires_grad_(False)
+    return model.eval(), data['scale']
+
+
+def find_ncnn_files(name, models_dir=MODELS_DIR):
+    """Cari pasangan .param/.bin untuk model (nama persis atau varian -x4)."""
+    for folder in (os.path.join(models_dir, "models"), models_dir):
+        for stem in (name, f"{name}-x4"):
+            param_path = os.path.join(folder, f"{stem}.param")
+            if os.path.exists(param_path):
+                return param_path, os.path.join(folder, f"{stem}.bin")
+    return None
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Konversi/cek model ncnn ke PyTorch')
+    parser.add_argument('param', help='Path file .param')
+    parser.add_argument('--bin', type=str, default=None, help='Path file .bin (default: sama dengan .param)')
+
+    args = parser.parse_args()
+
+    try:
+        start = time.time()
+        model, scale = load_ncnn_model(args.param, args.bin)
+        n_params = sum(p.numel() for p in model.parameters())
+        print(f"[INFO] {type(model).__name__} x{scale}, {n_params:,} parameter, "
+              f"dimuat dalam {(time.time() - start) * 1000:.1f} ms")
+    except (FileNotFoundError, NcnnFormatError) as e:
+        print(f"[ERROR] {e}")
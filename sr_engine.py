@@ -0,0 +1,384 @@
+"""
+Super Resolution Engine (PyTorch, CPU)
+Pengganti in-process untuk realesrgan-ncnn-vulkan.exe, jalan di Linux/CPU.
+
+Gambar diproses per tile yang saling overlap. Setiap tile diberi konteks
+tambahan (pad) di sekelilingnya yang dibuang setelah inferensi, lalu area
+overlap di-blend dengan ramp linear supaya tidak ada sambungan (seam).
+Memori puncak hanya sebesar satu tile (plus buffer output uint8), berapa pun
+ukuran gambarnya.
+
+Arsitektur:
+- SRVGGNetCompact : realesr-animevideov3 (x4; x2/x3 = x4 lalu bicubic turun)
+- RRDBNet         : realesrgan-x4plus / realesrgan-x4plus-anime
+
+Bobot dicari di folder models/ sebagai <nama>.pth (format Real-ESRGAN,
+key 'params_ema' / 'params' atau state dict langsung). Bila tidak ada,
+model ncnn (.param/.bin) bawaan di models/models dikonversi lewat
+ncnn_loader.py dan dimuat dari cache mmap.
+
+Usage:
+    python sr_engine.py input.jpg output.png --scale 4 --tile 256
+"""
+
+import argparse
+import copy
+import os
+import threading
+
+import cv2
+import numpy as np
+import torch
+import torch.nn as nn
+import torch.nn.functional as F
+
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+MODELS_DIR = os.path.join(SCRIPT_DIR, "models")
+
+DEFAULT_MODEL = os.environ.get('ANJAYHD_SR_MODEL', 'realesr-animevideov3')
+DEFAULT_TILE = int(os.environ.get('ANJAYHD_SR_TILE', '256'))
+DEFAULT_TILE_OVERLAP = 16
+DEFAULT_TILE_PAD = 10
+
+# Bobot luma Rec.601 (sama dengan cv2 COLOR_BGR2GRAY); jumlahnya 1
+LUMA_WEIGHTS = (0.299, 0.587, 0.114)
+
+
+class SRVGGNetCompact(nn.Module):
+    """Jaringan VGG-style kecil dari Real-ESRGAN (realesr-animevideov3)."""
+
+    def __init__(self, num_in_ch=3, num_out_ch=3, num_feat=64, num_conv=16, upscale=4):
+        super(SRVGGNetCompact, self).__init__()
+        self.upscale = upscale
+
+        self.body = nn.ModuleList()
+        self.body.append(nn.Conv2d(num_in_ch, num_feat, 3, 1, 1))
+        self.body.append(nn.PReLU(num_parameters=num_feat))
+        for _ in range(num_conv):
+            self.body.append(nn.Conv2d(num_feat, num_feat, 3, 1, 1))
+            self.body.append(nn.PReLU(num_parameters=num_feat))
+        self.body.append(nn.Conv2d(num_feat, num_out_ch * upscale * upscale, 3, 1, 1))
+        self.upsampler = nn.PixelShuffle(upscale)
+
+    def forward(self, x):
+        out = x
+        for layer in self.body:
+            out = layer(out)
+        out = self.upsampler(out)
+        return out + F.interpolate(x, scale_factor=self.upscale, mode='nearest')
+
+
+class ResidualDenseBlock(nn.Module):
+    def __init__(self, num_feat=64, num_grow_ch=32):
+        super(ResidualDenseBlock, self).__init__()
+        self.conv1 = nn.Conv2d(num_feat, num_grow_ch, 3, 1, 1)
+        self.conv2 = nn.Conv2d(num_feat + num_grow_ch, num_grow_ch, 3, 1, 1)
+        self.conv3 = nn.Conv2d(num_feat + 2 * num_grow_ch, num_grow_ch, 3, 1, 1)
+        self.conv4 = nn.Conv2d(num_feat + 3 * num_grow_ch, num_grow_ch, 3, 1, 1)
+        self.conv5 = nn.Conv2d(num_feat + 4 * num_grow_ch, num_feat, 3, 1, 1)
+        self.lrelu = nn.LeakyReLU(negative_slope=0.2, inplace=True)
+
+    def forward(self, x):
+        x1 = self.lrelu(self.conv1(x))
+        x2 = self.lrelu(self.conv2(torch.cat((x, x1), 1)))
+        x3 = self.lrelu(self.conv3(torch.cat((x, x1, x2), 1)))
+        x4 = self.lrelu(self.conv4(torch.cat((x, x1, x2, x3), 1)))
+        x5 = self.conv5(torch.cat((x, x1, x2, x3, x4), 1))
+        return x5 * 0.2 + x
+
+
+class RRDB(nn.Module):
+    def __init__(self, num_feat, num_grow_ch=32):
+        super(RRDB, self).__init__()
+        self.rdb1 = ResidualDenseBlock(num_feat, num_grow_ch)
+        self.rdb2 = ResidualDenseBlock(num_feat, num_grow_ch)
+        self.rdb3 = ResidualDenseBlock(num_feat, num_grow_ch)
+
+    def forward(self, x):
+        out = self.rdb3(self.rdb2(self.rdb1(x)))
+        return out * 0.2 + x
+
+
+class RRDBNet(nn.Module):
+    """Generator ESRGAN (realesrgan-x4plus)."""
+
+    def __init__(self, num_in_ch=3, num_out_ch=3, num_feat=64, num_block=23, num_grow_ch=32):
+        super(RRDBNet, self).__init__()
+        self.upscale = 4
+        self.conv_first = nn.Conv2d(num_in_ch, num_feat, 3, 1, 1)
+        self.body = nn.Sequential(*[RRDB(num_feat, num_grow_ch) for _ in range(num_block)])
+        self.conv_body = nn.Conv2d(num_feat, num_feat, 3, 1, 1)
+        self.conv_up1 = nn.Conv2d(num_feat, num_feat, 3, 1, 1)
+        self.conv_up2 = nn.Conv2d(num_feat, num_feat, 3, 1, 1)
+        self.conv_hr = nn.Conv2d(num_feat, num_feat, 3, 1, 1)
+        self.conv_last = nn.Conv2d(num_feat, num_out_ch, 3, 1, 1)
+        self.lrelu = nn.LeakyReLU(negative_slope=0.2, inplace=True)
+
+    def forward(self, x):
+        feat = self.conv_first(x)
+        feat = feat + self.conv_body(self.body(feat))
+        feat = self.lrelu(self.conv_up1(F.interpolate(feat, scale_factor=2, mode='nearest')))
+        feat = self.lrelu(self.conv_up2(F.interpolate(feat, scale_factor=2, mode='nearest')))
+        return self.conv_last(self.lrelu(self.conv_hr(feat)))
+
+
+SR_MODELS = {
+    'realesr-animevideov3': lambda: SRVGGNetCompact(num_feat=64, num_conv=16, upscale=4),
+    'realesrgan-x4plus': lambda: RRDBNet(num_feat=64, num_block=23),
+    'realesrgan-x4plus-anime': lambda: RRDBNet(num_feat=64, num_block=6),
+}
+
+
+def build_sr_model(name=DEFAULT_MODEL):
+    """Buat jaringan SR (bobot acak) sesuai nama model."""
+    if name not in SR_MODELS:
+        raise ValueError(f"Model SR tidak dikenal: {name}")
+    return SR_MODELS[name]()
+
+
+def load_sr_model(name=DEFAULT_MODEL, models_dir=MODELS_DIR):
+    """Muat model SR dari <models_dir>/<nama>.pth, atau dari file ncnn bila .pth tidak ada."""
+    path = os.path.join(models_dir, f"{name}.pth")
+    if not os.path.exists(path):
+        import ncnn_loader
+
+        files = ncnn_loader.find_ncnn_files(name, models_dir)
+        if files is None:
+            raise FileNotFoundError(f"Bobot model SR tidak ditemukan: {path}")
+        model, _ = ncnn_loader.load_ncnn_model(*files)
+        return model
+
+    model = build_sr_model(name)
+
+    state = torch.load(path, map_location='cpu', weights_only=True)
+    for key in ('params_ema', 'params'):
+        if key in state:
+            state = state[key]
+            break
+    model.load_state_dict(state)
+    return model.eval()
+
+
+def _fold_conv(conv, in_weights=None, out_weights=None, groups=1):
+    """
+    Conv baru dengan channel input/output dilipat: input abu-abu (semua channel
+    sama) -> bobot dijumlah per channel input; output luma -> kombinasi linear
+    channel output. groups: jumlah channel output per warna (PixelShuffle s*s).
+    """
+    weight = conv.weight.detach()
+    bias = conv.bias.detach()
+    if in_weights is not None:
+        weight = weight.sum(dim=1, keepdim=True)
+    if out_weights is not None:
+        w = torch.tensor(out_weights, dtype=weight.dtype)
+        weight = torch.tensordot(w, weight.reshape(len(out_weights), groups, *weight.shape[1:]), dims=1)
+        bias = torch.tensordot(w, bias.reshape(len(out_weights), groups), dims=1)
+    folded = nn.Conv2d(weight.shape[1], weight.shape[0], conv.kernel_size, conv.stride, conv.padding)
+    folded.weight.data.copy_(weight)
+    folded.bias.data.copy_(bias)
+    return folded
+
+
+def luma_model(model, weights=LUMA_WEIGHTS):
+    """
+    Salinan model SR RGB untuk gambar abu-abu, 1 channel masuk dan 1 channel keluar.
+
+    Input abu-abu (R=G=B) membuat conv pertama cukup memakai jumlah bobot per
+    channel input, dan luma output adalah kombinasi linear channel RGB, jadi
+    conv terakhir (sebelum PixelShuffle) ikut dilipat. Hasilnya sama dengan
+    model RGB pada gambar abu-abu lalu diambil lumanya (sebelum clamp).
+    Yang hemat hanya conv pertama/terakhir dan buffer output (1/3); badan
+    jaringan (64 fitur) tetap sama.
+    """
+    model = copy.deepcopy(model).eval()
+    if isinstance(model, SRVGGNetCompact):
+        body = model.body
+        body[0] = _fold_conv(body[0], in_weights=weights)
+        body[-1] = _fold_conv(body[-1], out_weights=weights, groups=model.upscale * model.upscale)
+    elif isinstance(model, RRDBNet):
+        model.conv_first = _fold_conv(model.conv_first, in_weights=weights)
+        model.conv_last = _fold_conv(model.conv_last, out_weights=weights)
+    else:
+        raise ValueError(f"Model SR tidak mendukung jalur luma: {type(model).__name__}")
+    return model
+
+
+def _tile_starts(size, tile, overlap):
+    """Posisi awal tile di satu sumbu; tile terakhir digeser agar tetap penuh."""
+    if size <= tile:
+        return [0]
+    step = tile - overlap
+    starts = list(range(0, size - tile, step))
+    starts.append(size - tile)
+    return starts
+
+
+def _ramp(length, overlap, ramp_up):
+    """Bobot blend 1D: naik linear sepanjang overlap di awal tile (kecuali tile pertama)."""
+    w = np.ones(length, dtype=np.float32)
+    if ramp_up and overlap > 0:
+        n = min(overlap, length)
+        w[:n] = (np.arange(n, dtype=np.float32) + 0.5) / overlap
+    return w
+
+
+class TiledUpscaler:
+    """
+    Upscaler berbasis tile untuk model SR PyTorch.
+
+    Args:
+        model: jaringan SR (input RGB float [0, 1], output x model.upscale)
+        scale: skala akhir (2, 3, 4); bila lebih kecil dari skala model,
+            hasil diperkecil dengan bicubic seperti varian ncnn x2/x3
+        tile: ukuran sisi tile input (pixel)
+        overlap: lebar area overlap antar tile yang di-blend (pixel input)
+        pad: konteks tambahan di sekitar tile yang dibuang setelah inferensi
+    """
+
+    def __init__(self, model, scale=4, tile=DEFAULT_TILE, overlap=DEFAULT_TILE_OVERLAP,
+                 pad=DEFAULT_TILE_PAD, device='cpu'):
+        self.model = model.to(device).eval()
+        self.model_scale = model.upscale
+        self.scale = scale
+        self.tile = max(int(tile), 2 * overlap + 1)
+        self.overlap = overlap
+        self.pad = pad
+        self.device = device
+
+        if scale > self.model_scale:
+            raise ValueError(f"Skala {scale} lebih besar dari skala model ({self.model_scale})")
+
+    def _forward(self, img_rgb):
+        if img_rgb.ndim == 2:
+            tens = torch.from_numpy(img_rgb)[None, None].float().div_(255.)
+        else:
+            tens = torch.from_numpy(img_rgb).permute(2, 0, 1)[None].float().div_(255.)
+        with torch.no_grad():
+            out = self.model(tens.to(self.device))
+        out = out[0].clamp_(0, 1).mul_(255.).round_().byte()
+        if img_rgb.ndim == 2:
+            return out[0].cpu().numpy()
+        return out.permute(1, 2, 0).cpu().numpy()
+
+    def tiles(self, height, width):
+        """Daftar (y0, y1, x0, x1) tile input, dalam urutan raster."""
+        return [(y0, min(y0 + self.tile, height), x0, min(x0 + self.tile, width))
+                for y0 in _tile_starts(height, self.tile, self.overlap)
+                for x0 in _tile_starts(width, self.tile, self.overlap)]
+
+    def upscale_tile(self, img_rgb, y0, y1, x0, x1):
+        """Inferensi satu tile (dengan konteks pad), hasil dipotong ke area tile."""
+        h, w = img_rgb.shape[:2]
+        s = self.model_scale
+        cy0, cy1 = max(y0 - self.pad, 0), min(y1 + self.pad, h)
+        cx0, cx1 = max(x0 - self.pad, 0), min(x1 + self.pad, w)
+        out = self._forward(np.ascontiguousarray(img_rgb[cy0:cy1, cx0:cx1]))
+        return out[(y0 - cy0) * s:(y1 - cy0) * s, (x0 - cx0) * s:(x1 - cx0) * s]
+
+    def blend_tile(self, out, tile_out, y0, x0):
+        """Tempel hasil tile ke output; tepi atas/kiri di-blend dengan isi sebelumnya."""
+        s = self.model_scale
+        th, tw = tile_out.shape[:2]
+        oy, ox = y0 * s, x0 * s
+        wy = _ramp(th, self.overlap * s, ramp_up=y0 > 0)
+        wx = _ramp(tw, self.overlap * s, ramp_up=x0 > 0)
+
+        region = out[oy:oy + th, ox:ox + tw]
+        if y0 == 0 and x0 == 0:
+            region[:] = tile_out
+            return
+        alpha = wy[:, None] * wx[None, :]
+        if tile_out.ndim == 3:
+            alpha = alpha[:, :, None]
+        blended = region * (1 - alpha) + tile_out * alpha
+        region[:] = np.clip(blended + 0.5, 0, 255).astype(np.uint8)
+
+    def upscale_rgb(self, img_rgb, out=None, tiles=None, progress=None):
+        """
+        Hasil RGB pada skala model. Bila out (hasil sebelumnya) dan tiles
+        diberikan, hanya tile tersebut yang dihitung ulang dan ditempel ke out
+        (in place), mis. untuk frame video yang hanya berubah sebagian.
+        Model luma (luma_model) menerima dan menghasilkan array 2D.
+        progress: callback(selesai, total) opsional setelah tiap tile.
+        """
+        h, w = img_rgb.shape[:2]
+        s = self.model_scale
+        if out is None:
+            out = np.empty((h * s, w * s) + img_rgb.shape[2:], dtype=np.uint8)
+            tiles = self.tiles(h, w)
+        for i, (y0, y1, x0, x1) in enumerate(tiles):
+            self.blend_tile(out, self.upscale_tile(img_rgb, y0, y1, x0, x1), y0, x0)
+            if progress is not None:
+                progress(i + 1, len(tiles))
+        return out
+
+    def finish(self, out_rgb, inplace=True):
+        """RGB skala model -> BGR pada skala akhir (bicubic bila skala < skala model)."""
+        out = cv2.cvtColor(out_rgb, cv2.COLOR_RGB2BGR, dst=out_rgb if inplace else None)
+        if self.scale != self.model_scale:
+            h, w = out.shape[0] // self.model_scale, out.shape[1] // self.model_scale
+            out = cv2.resize(out, (w * self.scale, h * self.scale), interpolation=cv2.INTER_CUBIC)
+        return out
+
+    def upscale_gray(self, img_gray, progress=None):
+        """Upscale array abu-abu uint8 (H x W) dengan model luma, hasil abu-abu pada skala akhir."""
+        out = self.upscale_rgb(img_gray, progress=progress)
+        if self.scale != self.model_scale:
+            h, w = img_gray.shape
+            out = cv2.resize(out, (w * self.scale, h * self.scale), interpolation=cv2.INTER_CUBIC)
+        return out
+
+    def __call__(self, img_bgr, progress=None):
+        """Upscale array BGR uint8 (atau grayscale), hasil BGR uint8."""
+        if img_bgr.ndim == 2:
+            img_bgr = cv2.cvtColor(img_bgr, cv2.COLOR_GRAY2BGR)
+        img_rgb = cv2.cvtColor(img_bgr, cv2.COLOR_BGR2RGB)
+        return self.finish(self.upscale_rgb(img_rgb, progress=progress))
+
+
+_upscaler_cache = {}
+_upscaler_lock = threading.Lock()
+
+
+def get_upscaler(scale=4, model_name=DEFAULT_MODEL, tile=DEFAULT_TILE, device='cpu', luma=False):
+    """
+    Upscaler yang di-cache per proses (model cukup dimuat sekali per worker).
+    luma=True: model dilipat ke 1 channel (luma_model), untuk upscale_gray.
+    """
+    cache_key = (model_name, scale, tile, device, luma)
+    with _upscaler_lock:
+        if cache_key not in _upscaler_cache:
+            model = load_sr_model(model_name)
+            if luma:
+                model = luma_model(model)
+            _upscaler_cache[cache_key] = TiledUpscaler(model, scale=scale, tile=tile, device=device)
+        return _upscaler_cache[cache_key]
+
+
+def upscale_image(img_bgr, scale=4, model_name=DEFAULT_MODEL, tile=DEFAULT_TILE, device='cpu', progress=None):
+    """Upscale array BGR dengan model SR in-process; progress: callback(selesai, total) per tile."""
+    return get_upscaler(scale=scale, model_name=model_name, tile=tile, device=device)(img_bgr, progress=progress)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Super Resolution CPU (PyTorch, tiled)')
+    parser.add_argument('input', help='Path gambar input')
+    parser.add_argument('output', help='Path gambar output')
+    parser.add_argument('--scale', type=int, default=4, choices=[2, 3, 4], help='Faktor pembesaran (default: 4)')
+    parser.add_argument('--model', type=str, default=DEFAULT_MODEL, choices=sorted(SR_MODELS),
+                        help='Nama model SR')
+    parser.add_argument('--tile', type=int, default=DEFAULT_TILE, help='Ukuran tile (default: 256)')
+
+    args = parser.parse_args()
+
+    try:
+        img = cv2.imread(args.input)
+        if img is None:
+            raise ValueError(f"Tidak dapat membaca gambar: {args.input}")
+        print(f"[INFO] Memproses: {args.input} ({img.shape[1]}x{img.shape[0]})")
+        result = upscale_image(img, scale=args.scale, model_name=args.model, tile=args.tile)
+        cv2.imwrite(args.output, result)
+        print(f"[INFO] Selesai! Hasil disimpan ke: {args.output} ({result.shape[1]}x{result.shape[0]})")
+    except (FileNotFoundError, ValueError) as e:
+        print(f"[ERROR] {e}")
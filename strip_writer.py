@@ -0,0 +1,174 @@
+"""
+Penulis Gambar per Strip
+Hasil ditulis per strip horizontal (baris atas ke bawah), sehingga gambar
+output tidak perlu ada utuh di memori sebelum di-encode.
+
+PNG di-encode streaming: tiap strip difilter (Up), dikompres zlib, dan
+chunk IDAT langsung ditulis ke file/buffer tujuan. Memori puncak hanya
+beberapa kali satu strip, tidak bergantung pada tinggi gambar.
+Format lain (JPEG, WebP, ...) tidak punya encoder per baris di cv2/PIL;
+strip dirakit ke satu buffer BGR uint8 lalu di-encode sekali saat tutup().
+GIF selalu lewat PIL: OpenCV sebelum 4.11 tidak punya codec GIF.
+"""
+
+import os
+import struct
+import zlib
+
+import numpy as np
+
+
+PNG_LEVEL = int(os.environ.get('ANJAYHD_PNG_LEVEL', '1'))
+
+_PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+_IDAT_BYTES = 1 << 20  # ukuran chunk IDAT yang ditulis sekaligus
+
+PIL_EXTENSIONS = ('.gif',)
+
+
+def encode_pil(img: np.ndarray, ext: str) -> bytes:
+    """Encode array BGR (atau grayscale) lewat PIL, untuk format di PIL_EXTENSIONS."""
+    import io
+
+    from PIL import Image
+
+    pil = Image.fromarray(img[..., ::-1] if img.ndim == 3 else img)
+    buf = io.BytesIO()
+    pil.save(buf, Image.registered_extensions()[ext.lower()])
+    return buf.getvalue()
+
+
+def _chunk(tag: bytes, data: bytes) -> bytes:
+    return (struct.pack('>I', len(data)) + tag + data
+            + struct.pack('>I', zlib.crc32(data, zlib.crc32(tag)) & 0xffffffff))
+
+
+def _filter_up(strip: np.ndarray, prev_row: np.ndarray) -> np.ndarray:
+    """
+    Filter PNG "Up" untuk satu strip (h x w x c uint8), termasuk byte tipe
+    filter di awal tiap baris. prev_row: baris terakhir strip sebelumnya
+    (nol untuk strip pertama). Paeth memberi file ~5% lebih kecil, tetapi
+    di numpy membuat encode ~3x lebih lambat; Up hampir gratis.
+    """
+    h = strip.shape[0]
+    x = strip.reshape(h, -1)
+    out = np.empty((h, x.shape[1] + 1), dtype=np.uint8)
+    out[:, 0] = 2
+    np.subtract(x[0], prev_row.reshape(-1), out=out[0, 1:])
+    np.subtract(x[1:], x[:-1], out=out[1:, 1:])
+    return out
+
+
+class PenulisPng:
+    """Encoder PNG streaming (8-bit RGB atau grayscale, tanpa interlace)."""
+
+    def __init__(self, target, width: int, height: int, channels: int = 3, level: int = PNG_LEVEL):
+        self._own = isinstance(target, str)
+        self._target = target
+        self._file = open(target, 'wb') if self._own else target
+        self.width = width
+        self.height = height
+        self.channels = channels
+        self._rows = 0
+        self._prev = np.zeros((width, channels), dtype=np.uint8)
+        self._zlib = zlib.compressobj(level)
+        self._pending = []
+        self._pending_bytes = 0
+
+        color_type = 2 if channels == 3 else 0
+        try:
+            self._file.write(_PNG_SIGNATURE)
+            self._file.write(_chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, color_type, 0, 0, 0)))
+        except BaseException:
+            self.batal()
+            raise
+
+    def _simpan(self, data: bytes, force: bool = False) -> None:
+        if data:
+            self._pending.append(data)
+            self._pending_bytes += len(data)
+        if self._pending_bytes >= _IDAT_BYTES or (force and self._pending_bytes):
+            self._file.write(_chunk(b'IDAT', b''.join(self._pending)))
+            self._pending = []
+            self._pending_bytes = 0
+
+    def tulis(self, strip: np.ndarray) -> None:
+        """Tulis strip berikutnya (h x W x 3 RGB, atau h x W grayscale)."""
+        strip = strip.reshape(strip.shape[0], self.width, self.channels)
+        if self._rows + strip.shape[0] > self.height:
+            raise ValueError("Strip melebihi tinggi gambar")
+        filtered = _filter_up(strip, self._prev)
+        self._prev = strip[-1].copy()
+        self._rows += strip.shape[0]
+        self._simpan(self._zlib.compress(filtered))
+
+    def tutup(self) -> None:
+        try:
+            if self._rows != self.height:
+                raise ValueError(f"Baru {self._rows} dari {self.height} baris yang ditulis")
+            self._simpan(self._zlib.flush(), force=True)
+            self._file.write(_chunk(b'IEND', b''))
+        finally:
+            if self._own:
+                self._file.close()
+
+    def batal(self) -> None:
+        """Gagal di tengah jalan: tutup file dan hapus PNG yang terpotong (target path saja)."""
+        if self._own:
+            self._file.close()
+            if os.path.exists(self._target):
+                os.remove(self._target)
+
+
+class PenulisBuffer:
+    """Kumpulkan strip ke satu buffer BGR, lalu encode lewat cv2 (GIF: PIL) saat tutup()."""
+
+    def __init__(self, target, ext: str, width: int, height: int, channels: int = 3):
+        self.target = target
+        self.ext = ext
+        shape = (height, width, 3) if channels == 3 else (height, width)
+        self.buffer = np.empty(shape, dtype=np.uint8)
+        self._rows = 0
+
+    def tulis(self, strip: np.ndarray) -> None:
+        rows = slice(self._rows, self._rows + strip.shape[0])
+        self.buffer[rows] = strip[..., ::-1] if strip.ndim == 3 else strip
+        self._rows = rows.stop
+
+    def tutup(self) -> None:
+        import cv2
+
+        if self.ext.lower() in PIL_EXTENSIONS:
+            data = encode_pil(self.buffer, self.ext)
+            if isinstance(self.target, str):
+                with open(self.target, 'wb') as f:
+                    f.write(data)
+            else:
+                self.target.write(data)
+            ok = True
+        elif isinstance(self.target, str):
+            ok = cv2.imwrite(self.target, self.buffer)
+        else:
+            ok, buf = cv2.imencode(self.ext, self.buffer)
+            if ok:
+                self.target.write(buf)
+        self.buffer = None
+        if not ok:
+            raise RuntimeError(f"Gagal encode gambar ke {self.ext}")
+
+    def batal(self) -> None:
+        """Gagal di tengah jalan: lepas buffer dan hapus file yang mungkin sudah tertulis sebagian."""
+        self.buffer = None
+        if isinstance(self.target, str) and os.path.exists(self.target):
+            os.remove(self.target)
+
+
+def buka_penulis(target, ext: str, width: int, height: int, channels: int = 3):
+    """
+    Penulis strip untuk target (path file atau objek file biner) sesuai ekstensi.
+    Strip yang ditulis berurutan RGB (bukan BGR seperti array cv2). Akhiri
+    dengan tutup(), atau batal() bila gagal agar tidak ada file setengah jadi.
+    """
+    if ext.lower() == '.png':
+        return PenulisPng(target, width, height, channels)
+    return PenulisBuffer(target, ext, width, height, channels)
@@ -0,0 +1,51 @@
+"""
+Validasi upload server (app.py) yang tidak butuh worker pool: /process
+sinkron hanya menerima gambar diam, video dan animasi harus lewat /jobs.
+
+Usage:
+    python -m pytest tests/test_app.py -q
+"""
+
+import io
+import os
+import sys
+
+import numpy as np
+import pytest
+from PIL import Image
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+import app as server  # noqa: E402
+
+
+def _gif(frames):
+    images = [Image.fromarray(np.full((16, 16, 3), i * 40, dtype=np.uint8)) for i in range(frames)]
+    buf = io.BytesIO()
+    images[0].save(buf, 'GIF', save_all=True, append_images=images[1:], duration=100)
+    return buf.getvalue()
+
+
+def _post(path, data, filename):
+    return server.app.test_client().post(
+        path, data={'file': (io.BytesIO(data), filename), 'mode': 'enhance', 'scale': '2'},
+        content_type='multipart/form-data')
+
+
+@pytest.mark.parametrize('filename', ['klip.mp4', 'klip.webm', 'klip.MOV'])
+def test_process_menolak_video(filename):
+    response = _post('/process', b'\x00' * 64, filename)
+    assert response.status_code == 400
+    assert '/jobs' in response.get_json()['error']
+
+
+def test_process_menolak_gif_animasi():
+    response = _post('/process', _gif(3), 'anim.gif')
+    assert response.status_code == 400
+    assert '/jobs' in response.get_json()['error']
+
+
+def test_process_menolak_format_lain():
+    response = _post('/process', b'data', 'dokumen.pdf')
+    assert response.status_code == 400
@@ -0,0 +1,132 @@
+"""
+Micro-batching colorize: pengelompokan job di JobManager (batch_args sama,
+max_batch) dan image_enhancer.warnai_batch (satu forward pass untuk semua
+foto BW, hasil per item sesuai urutan, error per item).
+
+Usage:
+    python -m pytest tests/test_batching.py -q
+"""
+
+import os
+import sys
+import threading
+
+import cv2
+import numpy as np
+import pytest
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+import colorizers  # noqa: E402
+import image_enhancer as ie  # noqa: E402
+from jobs import DONE, FAILED, JobManager  # noqa: E402
+
+
+class _PoolBatch:
+    """Pool palsu: job pertama ditahan sampai gate dibuka agar job lain sempat antre."""
+
+    size = 1
+
+    def __init__(self, gagal=()):
+        self.gate = threading.Event()
+        self.started = threading.Semaphore(0)
+        self.calls = []
+        self.gagal = set(gagal)
+
+    def submit(self, task, timeout=None, cancel_event=None, on_progress=None, **kwargs):
+        self.calls.append((task, kwargs))
+        self.started.release()
+        self.gate.wait(5)
+        if 'items' not in kwargs:
+            return {'mode': 'colorize'}
+        return [{'error': 'rusak'} if item['nama'] in self.gagal else {'mode': 'colorize'}
+                for item in kwargs['items']]
+
+
+def _submit(manager, nama, model='siggraph17'):
+    return manager.submit('image_enhancer:proses_gambar', batch_task='image_enhancer:warnai_batch',
+                          batch_args={'model_type': model}, nama=nama)
+
+
+def _ukuran_batch(pool):
+    return sorted(len(kwargs['items']) for task, kwargs in pool.calls if 'items' in kwargs)
+
+
+def test_batch_dipisah_per_model_dan_max_batch():
+    pool = _PoolBatch()
+    manager = JobManager(lambda: pool, batch_window=0.05, max_batch=3)
+
+    penahan = manager.submit('image_enhancer:proses_gambar', nama='penahan')
+    assert pool.started.acquire(timeout=5)
+    jobs = [_submit(manager, f's{i}') for i in range(4)] + [_submit(manager, f'e{i}', 'eccv16') for i in range(2)]
+    pool.gate.set()
+
+    for job in [penahan] + jobs:
+        assert job.wait(5)
+        assert job.status == DONE
+    # Sisa satu job dijalankan lewat task biasa, bukan batch berisi satu item
+    assert _ukuran_batch(pool) == [2, 3]
+    assert len(pool.calls) == 4
+    for task, kwargs in pool.calls:
+        if 'items' in kwargs:
+            models = {item['nama'][0] for item in kwargs['items']}
+            assert models == ({'e'} if kwargs['model_type'] == 'eccv16' else {'s'})
+
+
+def test_error_per_item_hanya_menggagalkan_job_itu():
+    pool = _PoolBatch(gagal={'b'})
+    manager = JobManager(lambda: pool, batch_window=0.05, max_batch=4)
+
+    penahan = manager.submit('image_enhancer:proses_gambar', nama='penahan')
+    assert pool.started.acquire(timeout=5)
+    jobs = {nama: _submit(manager, nama) for nama in 'abc'}
+    pool.gate.set()
+
+    for job in [penahan] + list(jobs.values()):
+        assert job.wait(5)
+    assert _ukuran_batch(pool) == [3]
+    assert jobs['a'].status == DONE and jobs['c'].status == DONE
+    assert jobs['b'].status == FAILED
+    assert 'rusak' in jobs['b'].run.error
+
+
+@pytest.fixture
+def ab_palsu(monkeypatch):
+    """predict_ab tanpa bobot model: ab konstan, panggilan dicatat."""
+    calls = []
+
+    def predict_ab(images, model_type='siggraph17', batch_size=8, device='cpu', bgr=False):
+        calls.append((len(images), batch_size))
+        return [np.full((2, 256, 256), 20., dtype=np.float32) for _ in images]
+
+    monkeypatch.setattr(colorizers, 'predict_ab', predict_ab)
+    return calls
+
+
+def test_warnai_batch_satu_forward_dan_urutan_hasil(tmp_path, ab_palsu):
+    rng = np.random.default_rng(0)
+    gray = np.repeat(rng.integers(0, 256, size=(40, 50, 1), dtype=np.uint8), 3, axis=2)
+    warna = rng.integers(0, 256, size=(30, 20, 3), dtype=np.uint8)
+    cv2.imwrite(str(tmp_path / 'bw1.png'), gray)
+    cv2.imwrite(str(tmp_path / 'warna.png'), warna)
+    ok, buf = cv2.imencode('.png', gray[:20])
+
+    items = [
+        {'input_path': str(tmp_path / 'bw1.png'), 'output_path': str(tmp_path / 'out1.png'), 'scale': 2},
+        {'input_path': str(tmp_path / 'hilang.png'), 'output_path': str(tmp_path / 'out2.png')},
+        {'input_path': str(tmp_path / 'warna.png'), 'output_path': str(tmp_path / 'out3.png')},
+        {'input_data': buf.tobytes(), 'ext': '.png'},
+    ]
+    results = ie.warnai_batch(items)
+
+    assert ab_palsu == [(2, 2)]
+    assert results[0]['mode'] == 'colorize' and results[0]['scale'] == 2
+    assert (results[0]['width'], results[0]['height']) == (50, 40)
+    assert 'error' in results[1]
+    # Foto berwarna tidak diwarnai ulang
+    assert np.array_equal(cv2.imread(str(tmp_path / 'out3.png')), warna)
+    hasil = cv2.imread(str(tmp_path / 'out1.png'))
+    assert hasil.shape == gray.shape and not np.array_equal(hasil[:, :, 0], hasil[:, :, 2])
+    data = cv2.imdecode(np.frombuffer(results[3]['data'], np.uint8), cv2.IMREAD_COLOR)
+    assert data.shape == (20, 50, 3)
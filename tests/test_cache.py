@@ -0,0 +1,104 @@
+"""
+ResultCache (cache.py): commit, file pendamping meta, eviksi LRU dengan byte
+budget, dan penulisan bersamaan untuk hasil yang sama.
+
+Usage:
+    python -m pytest tests/test_cache.py -q
+"""
+
+import os
+import sys
+import threading
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+from cache import ResultCache, make_key  # noqa: E402
+
+
+def _tulis(cache, filename, data, meta=None):
+    temp_path = cache.temp_path_for(filename)
+    with open(temp_path, 'wb') as f:
+        f.write(data)
+    return cache.commit(filename, temp_path, meta=meta)
+
+
+def _sisa_sementara(cache):
+    return [n for n in os.listdir(cache.directory) if '.tmp' in n]
+
+
+def test_penulisan_bersamaan_hasil_sama(tmp_path):
+    """Seperti /jobs dan /process/stream untuk isi yang sama: semua commit berhasil."""
+    cache = ResultCache(str(tmp_path), max_bytes=1 << 20)
+    filename = cache.filename_for(make_key(b'foto', mode='enhance'), '.png')
+    errors = []
+    mulai = threading.Barrier(8)
+
+    def penulis(i):
+        try:
+            temp_path = cache.temp_path_for(filename)
+            with open(temp_path, 'wb') as f:
+                mulai.wait()
+                f.write(b'hasil-%d' % i)
+            cache.commit(filename, temp_path, meta={'mode': 'enhance'})
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=penulis, args=(i,)) for i in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert errors == []
+    with open(cache.lookup(filename), 'rb') as f:
+        assert f.read().startswith(b'hasil-')
+    assert cache.meta(filename) == {'mode': 'enhance'}
+    assert cache.stats()['entries'] == 1
+    assert _sisa_sementara(cache) == []
+
+
+def test_eviksi_lru_menurut_akses_terakhir(tmp_path):
+    cache = ResultCache(str(tmp_path), max_bytes=250)
+    _tulis(cache, 'a_output.png', b'a' * 100, meta={'mode': 'colorize'})
+    _tulis(cache, 'b_output.png', b'b' * 100)
+    assert cache.lookup('a_output.png') is not None  # a jadi yang terbaru
+
+    _tulis(cache, 'c_output.png', b'c' * 100)
+
+    assert cache.lookup('b_output.png') is None
+    assert not os.path.exists(cache.path_for('b_output.png'))
+    assert cache.lookup('a_output.png') is not None
+    assert cache.lookup('c_output.png') is not None
+    assert cache.stats()['bytes'] == 200
+
+
+def test_meta_ikut_dihapus_dan_dimuat_ulang(tmp_path):
+    cache = ResultCache(str(tmp_path), max_bytes=150)
+    _tulis(cache, 'a_output.png', b'a' * 100, meta={'mode': 'colorize'})
+    assert os.path.exists(cache.path_for('a_output.png.meta.json'))
+
+    # Restart: index dan meta dibangun ulang dari disk, sisa file sementara dibuang
+    open(cache.temp_path_for('x_output.png'), 'wb').close()
+    cache = ResultCache(str(tmp_path), max_bytes=150)
+    assert cache.meta('a_output.png') == {'mode': 'colorize'}
+    assert _sisa_sementara(cache) == []
+
+    _tulis(cache, 'b_output.png', b'b' * 100)
+    assert cache.meta('a_output.png') == {}
+    assert not os.path.exists(cache.path_for('a_output.png.meta.json'))
+
+
+def test_commit_ulang_menggantikan_ukuran(tmp_path):
+    cache = ResultCache(str(tmp_path), max_bytes=1 << 20)
+    _tulis(cache, 'a_output.png', b'a' * 100, meta={'mode': 'both'})
+    _tulis(cache, 'a_output.png', b'a' * 40)
+
+    assert cache.stats()['bytes'] == 40
+    assert cache.meta('a_output.png') == {}
+
+
+def test_key_bergantung_isi_dan_parameter():
+    assert make_key(b'x', mode='enhance', scale=2) == make_key(b'x', scale=2, mode='enhance')
+    assert make_key(b'x', mode='enhance', scale=2) != make_key(b'x', mode='enhance', scale=4)
+    assert make_key(b'x', mode='enhance') != make_key(b'y', mode='enhance')
@@ -0,0 +1,102 @@
+"""
+Kesetaraan numerik engine warna float32 (colorizers/util.py) dengan jalur
+lama skimage float64 (preprocess_img_reference / postprocess_tens_reference).
+
+Saturation boost tidak dibandingkan: jalur baru menskalakan chroma Lab,
+jalur lama memakai HSV, jadi keduanya dijalankan dengan boost 1.0.
+
+Butuh scikit-image (hanya untuk test ini; dilewati bila tidak terpasang).
+
+Usage:
+    python -m pytest tests/test_color_engine.py -q
+"""
+
+import os
+import sys
+
+import numpy as np
+import pytest
+import torch
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+pytest.importorskip('skimage')
+
+# ab acak sengaja di luar gamut; skimage memperingatkan Z negatif yang di-clip
+pytestmark = pytest.mark.filterwarnings('ignore:Conversion from CIE-LAB:UserWarning')
+
+from colorizers.util import (  # noqa: E402
+    load_img, postprocess_tens, postprocess_tens_reference, postprocess_tens_uint8,
+    preprocess_img, preprocess_img_reference,
+)
+
+
+def _gradien():
+    y, x = np.mgrid[0:200, 0:300]
+    img = np.stack([x * 255 // 299, y * 255 // 199, (x + y) * 255 // 498], axis=2)
+    return img.astype(np.uint8)
+
+
+def _acak():
+    return np.random.default_rng(0).integers(0, 256, size=(123, 217, 3), dtype=np.uint8)
+
+
+def _abu_abu():
+    gray = np.random.default_rng(1).integers(0, 256, size=(160, 96), dtype=np.uint8)
+    return np.repeat(gray[:, :, None], 3, axis=2)
+
+
+def _sakura():
+    img = load_img(os.path.join(REPO_DIR, 'sakura.png'))
+    return np.ascontiguousarray(img[::4, ::4, :3])
+
+
+IMAGES = {'gradien': _gradien, 'acak': _acak, 'abu_abu': _abu_abu, 'sakura': _sakura}
+
+
+@pytest.fixture(params=sorted(IMAGES), scope='module')
+def img_rgb(request):
+    return IMAGES[request.param]()
+
+
+def _ab(seed):
+    """ab 1 x 2 x 256 x 256 deterministik, sebagian di luar gamut sRGB."""
+    rng = np.random.default_rng(seed)
+    return torch.from_numpy(rng.uniform(-80., 80., size=(1, 2, 256, 256)).astype(np.float32))
+
+
+def test_l_sama_dengan_skimage(img_rgb):
+    tens_orig, tens_rs = preprocess_img(img_rgb)
+    ref_orig, ref_rs = preprocess_img_reference(img_rgb)
+
+    assert tens_orig.shape == ref_orig.shape
+    assert tens_rs.shape == ref_rs.shape
+    np.testing.assert_allclose(tens_orig.numpy(), ref_orig.numpy(), rtol=0, atol=1e-4)
+    np.testing.assert_allclose(tens_rs.numpy(), ref_rs.numpy(), rtol=0, atol=1e-4)
+
+
+@pytest.mark.parametrize('seed', [0, 1])
+def test_rgb_float_sama_dengan_skimage(img_rgb, seed):
+    tens_orig, _ = preprocess_img_reference(img_rgb)
+    out_ab = _ab(seed)
+
+    out = postprocess_tens(tens_orig, out_ab, saturation_boost=1.0)
+    ref = postprocess_tens_reference(tens_orig, out_ab, saturation_boost=1.0)
+
+    assert out.shape == ref.shape
+    np.testing.assert_allclose(out, ref, rtol=0, atol=1e-3)
+
+
+@pytest.mark.parametrize('seed', [0, 1])
+def test_rgb_uint8_selisih_maksimal_satu(img_rgb, seed):
+    tens_orig, _ = preprocess_img_reference(img_rgb)
+    out_ab = _ab(seed)
+
+    out = postprocess_tens_uint8(tens_orig, out_ab, saturation_boost=1.0)
+    ref = postprocess_tens_reference(tens_orig, out_ab, saturation_boost=1.0)
+    ref = np.clip(np.round(ref * 255.), 0, 255).astype(np.uint8)
+
+    assert out.dtype == np.uint8
+    assert out.shape == ref.shape
+    assert np.abs(out.astype(np.int16) - ref.astype(np.int16)).max() <= 1
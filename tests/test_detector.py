@@ -0,0 +1,111 @@
+"""
+Detektor hitam putih (image_enhancer.cek_gambar_hitam_putih) dan pilihan
+--mode auto (pilih_mode_auto): abu-abu murni, sepia (matriks sepia standar,
+seperti CSS sepia()), cyanotype, dan foto berwarna bersaturasi rendah.
+
+Usage:
+    python -m pytest tests/test_detector.py -q
+"""
+
+import os
+import sys
+
+import cv2
+import numpy as np
+import pytest
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+import image_enhancer as ie  # noqa: E402
+
+# Matriks sepia standar (W3C Filter Effects / CSS sepia(1)), baris = R, G, B
+SEPIA = np.array([[0.393, 0.769, 0.189],
+                  [0.349, 0.686, 0.168],
+                  [0.272, 0.534, 0.131]], dtype=np.float32)
+
+
+def _abu_abu(seed=0):
+    """Foto abu-abu sintetis: gradien penuh 0..255, tekstur, dan noise."""
+    rng = np.random.default_rng(seed)
+    y, x = np.mgrid[0:240, 0:320].astype(np.float32)
+    v = 255. * x / 319. + 25. * np.sin(y / 9.) + rng.normal(0, 4, y.shape)
+    return np.clip(v, 0, 255).astype(np.uint8)
+
+
+def _bgr(rgb):
+    return cv2.cvtColor(np.clip(rgb, 0, 255).astype(np.uint8), cv2.COLOR_RGB2BGR)
+
+
+def _sepia(gray):
+    rgb = np.repeat(gray[:, :, None].astype(np.float32), 3, axis=2)
+    return _bgr(rgb @ SEPIA.T)
+
+
+def _cyanotype(gray):
+    """Biru prussia di bayangan ke putih kebiruan di highlight."""
+    v = gray[:, :, None].astype(np.float32) / 255.
+    gelap = np.array([20., 40., 90.], dtype=np.float32)
+    terang = np.array([235., 245., 255.], dtype=np.float32)
+    return _bgr(gelap + (terang - gelap) * v)
+
+
+def _berwarna_pudar(seed=0):
+    """Foto berwarna pudar: langit biru, daun hijau, tanah hangat; chroma Lab ~6-9."""
+    rng = np.random.default_rng(seed)
+    h, w = 240, 320
+    y, x = np.mgrid[0:h, 0:w]
+    L = 30. + 50. * (1. - y / h) + 10. * np.sin(x / 17.) + rng.normal(0, 3, (h, w))
+    a = np.zeros((h, w))
+    b = np.zeros((h, w))
+    langit = y < h * 0.4
+    daun = (y >= h * 0.4) & (x < w * 0.6)
+    tanah = (y >= h * 0.4) & (x >= w * 0.6)
+    a[langit], b[langit] = -1.5, -6.
+    a[daun], b[daun] = -6., 5.
+    a[tanah], b[tanah] = 5., 7.
+    lab = np.stack([L * 255. / 100., a + 128. + rng.normal(0, 1, (h, w)),
+                    b + 128. + rng.normal(0, 1, (h, w))], axis=2)
+    return cv2.cvtColor(np.clip(lab, 0, 255).astype(np.uint8), cv2.COLOR_Lab2BGR)
+
+
+def test_abu_abu_murni():
+    gray = _abu_abu()
+    assert ie.cek_gambar_hitam_putih(gray)
+    assert ie.cek_gambar_hitam_putih(cv2.cvtColor(gray, cv2.COLOR_GRAY2BGR))
+
+
+@pytest.mark.parametrize('skala', [1.0, 0.6])
+def test_sepia_standar(skala):
+    # Highlight ter-clip (R lalu G jenuh) sehingga hue bergeser ke kuning
+    gray = (_abu_abu() * skala).astype(np.uint8)
+    assert ie.cek_gambar_hitam_putih(_sepia(gray))
+
+
+def test_cyanotype():
+    assert ie.cek_gambar_hitam_putih(_cyanotype(_abu_abu()))
+
+
+@pytest.mark.parametrize('seed', [0, 1])
+def test_berwarna_saturasi_rendah(seed):
+    assert not ie.cek_gambar_hitam_putih(_berwarna_pudar(seed))
+
+
+def test_berwarna_jenuh():
+    assert not ie.cek_gambar_hitam_putih(cv2.imread(os.path.join(REPO_DIR, 'sakura.png')))
+
+
+def test_tint_terlalu_jenuh_dianggap_berwarna():
+    """Gambar serba oranye pekat (mis. senja) bukan scan bertint."""
+    gray = _abu_abu()
+    oranye = np.stack([gray * 0. + 230., gray * 0.55 + 20., gray * 0.1], axis=2)
+    assert not ie.cek_gambar_hitam_putih(_bgr(oranye))
+
+
+def test_pilih_mode_auto(monkeypatch):
+    assert ie.pilih_mode_auto(_sepia(_abu_abu())) == 'both'
+    assert ie.pilih_mode_auto(_berwarna_pudar()) == 'enhance'
+    # Foto BW yang sudah besar hanya diwarnai
+    monkeypatch.setattr(ie, 'AUTO_SR_MAX_MP', 0.05)
+    assert ie.pilih_mode_auto(_cyanotype(_abu_abu())) == 'colorize'
+    assert ie.pilih_mode_auto(_berwarna_pudar()) == 'enhance'
@@ -0,0 +1,110 @@
+"""
+Resume proses folder (image_enhancer.proses_folder): file yang sudah 'done' di
+manifest dilewati hanya bila input, mode, scale, backend, dan sr_luma sama.
+
+Usage:
+    python -m pytest tests/test_folder.py -q
+"""
+
+import os
+import shutil
+import sys
+
+import pytest
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+import image_enhancer as ie  # noqa: E402
+import worker_pool  # noqa: E402
+
+
+class _PoolSalin:
+    """WorkerPool palsu: menyalin input ke output tanpa memuat model."""
+
+    size = 2
+    diproses = []
+
+    def __init__(self, size=None, timeout=None, warmup=None):
+        pass
+
+    def submit(self, task, input_path, output_path, **kwargs):
+        _PoolSalin.diproses.append(os.path.basename(input_path))
+        if os.path.basename(input_path).startswith('rusak'):
+            raise RuntimeError('gambar rusak')
+        shutil.copyfile(input_path, output_path)
+        return {'mode': kwargs['mode'], 'width': 1, 'height': 1, 'timings': {}}
+
+    def shutdown(self):
+        pass
+
+
+@pytest.fixture
+def folder(tmp_path, monkeypatch):
+    monkeypatch.setattr(worker_pool, 'WorkerPool', _PoolSalin)
+    _PoolSalin.diproses = []
+    input_dir = tmp_path / 'masuk'
+    (input_dir / 'sub').mkdir(parents=True)
+    for rel in ('a.png', 'sub/b.jpg', 'rusak.png'):
+        (input_dir / rel).write_bytes(b'isi ' + rel.encode())
+    return str(input_dir), str(tmp_path / 'keluar')
+
+
+def _jalankan(input_dir, output_dir, **kwargs):
+    _PoolSalin.diproses = []
+    settings = dict({'mode': 'enhance', 'scale': 4, 'backend': 'torch', 'sr_luma': False}, **kwargs)
+    counts = ie.proses_folder(input_dir, output_dir, **settings)
+    return counts, sorted(_PoolSalin.diproses)
+
+
+def test_jalan_ulang_melewati_yang_selesai(folder):
+    input_dir, output_dir = folder
+    counts, diproses = _jalankan(input_dir, output_dir)
+    assert counts == {'done': 2, 'failed': 1, 'skipped': 0}
+    assert os.path.exists(os.path.join(output_dir, 'sub', 'b.jpg'))
+
+    # File gagal diulang, kecuali skip_failed
+    counts, diproses = _jalankan(input_dir, output_dir)
+    assert counts == {'done': 0, 'failed': 1, 'skipped': 2}
+    assert diproses == ['rusak.png']
+    counts, diproses = _jalankan(input_dir, output_dir, skip_failed=True)
+    assert counts == {'done': 0, 'failed': 0, 'skipped': 3}
+
+
+@pytest.mark.parametrize('ubah', [{'mode': 'both'}, {'scale': 2}, {'backend': 'ncnn'}, {'sr_luma': True}])
+def test_setelan_berbeda_diproses_ulang(folder, ubah):
+    input_dir, output_dir = folder
+    _jalankan(input_dir, output_dir, skip_failed=True)
+
+    counts, diproses = _jalankan(input_dir, output_dir, skip_failed=True, **ubah)
+    assert counts['skipped'] == 0
+    assert diproses == ['a.png', 'b.jpg', 'rusak.png']
+    # Setelah itu setelan baru tercatat dan dilewati
+    counts, diproses = _jalankan(input_dir, output_dir, skip_failed=True, **ubah)
+    assert counts['skipped'] == 3 and diproses == []
+
+
+def test_input_berubah_atau_output_hilang_diproses_ulang(folder):
+    input_dir, output_dir = folder
+    _jalankan(input_dir, output_dir, skip_failed=True)
+
+    with open(os.path.join(input_dir, 'a.png'), 'ab') as f:
+        f.write(b'baru')
+    os.remove(os.path.join(output_dir, 'sub', 'b.jpg'))
+    counts, diproses = _jalankan(input_dir, output_dir, skip_failed=True)
+    assert diproses == ['a.png', 'b.jpg']
+    assert counts == {'done': 2, 'failed': 0, 'skipped': 1}
+
+
+def test_record_lama_tanpa_backend_diproses_ulang(folder):
+    input_dir, output_dir = folder
+    _jalankan(input_dir, output_dir, skip_failed=True)
+
+    manifest = os.path.join(output_dir, 'manifest.jsonl')
+    with open(manifest, encoding='utf-8') as f:
+        lines = [line.replace('"backend": "torch", ', '') for line in f]
+    assert not any('backend' in line for line in lines)
+    with open(manifest, 'w', encoding='utf-8') as f:
+        f.writelines(lines)
+    counts, diproses = _jalankan(input_dir, output_dir, skip_failed=True)
+    assert counts['skipped'] == 0 and len(diproses) == 3
@@ -0,0 +1,66 @@
+"""
+SR sebagian FrameReuse (video_pipeline) harus sama dengan SR penuh frame
+yang sama: tile berubah di-blend ulang dengan tetangganya, tanpa sambungan.
+
+Model SR di sini model mainan (blur kotak zero-pad + nearest x2), jadi hasil
+tile bergantung pada batas tile dan sambungan blend langsung kelihatan.
+
+Usage:
+    python -m pytest tests/test_frame_reuse.py -q
+"""
+
+import os
+import sys
+
+import numpy as np
+import torch
+import torch.nn.functional as F
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+from sr_engine import TiledUpscaler  # noqa: E402
+from video_pipeline import FrameReuse  # noqa: E402
+
+
+class _Mainan(torch.nn.Module):
+    upscale = 2
+
+    def forward(self, x):
+        x = F.avg_pool2d(x, 5, stride=1, padding=2, count_include_pad=True)
+        return F.interpolate(x, scale_factor=2, mode='nearest')
+
+
+def _upscaler():
+    return TiledUpscaler(_Mainan(), scale=2, tile=32, overlap=8, pad=0)
+
+
+def _frame(seed):
+    return np.random.default_rng(seed).integers(0, 256, size=(120, 150, 3), dtype=np.uint8)
+
+
+def test_sr_sebagian_sama_dengan_sr_penuh():
+    upscaler = _upscaler()
+    lama = _frame(0)
+    baru = lama.copy()
+    baru[50:60, 70:80] = 255 - baru[50:60, 70:80]
+
+    reuse = FrameReuse(tile_delta=1, max_tiles=0.9)
+    reuse.upscale(lama, True, upscaler)
+    hasil = reuse.upscale(baru, False, upscaler)
+
+    assert reuse.stats['sr_partial'] == 1
+    penuh = upscaler.finish(upscaler.upscale_rgb(baru[:, :, ::-1].copy()))
+    np.testing.assert_array_equal(hasil, penuh)
+
+
+def test_tanpa_perubahan_pakai_ulang():
+    upscaler = _upscaler()
+    frame = _frame(1)
+
+    reuse = FrameReuse(tile_delta=1)
+    pertama = reuse.upscale(frame, True, upscaler)
+    kedua = reuse.upscale(frame.copy(), False, upscaler)
+
+    assert reuse.stats['sr_reused'] == 1
+    assert kedua is pertama
@@ -0,0 +1,198 @@
+"""
+Perilaku JobManager (jobs.py) bersama ResultCache (cache.py) dengan pool
+palsu di thread yang sama: dedup/single-flight, batas antrian, micro-batch,
+dan pembatalan. Tidak ada proses worker atau model yang dimuat.
+
+Usage:
+    python -m pytest tests/test_jobs.py -q
+"""
+
+import os
+import sys
+import threading
+
+import pytest
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+from cache import ResultCache  # noqa: E402
+from jobs import CANCELLED, DONE, FAILED, JobManager, JobQueueFull  # noqa: E402
+from worker_pool import WorkerCancelled  # noqa: E402
+
+
+class _PoolPalsu:
+    """Pengganti WorkerPool: output_path dibuka, task ditahan sampai gate dibuka, lalu ditulis."""
+
+    def __init__(self, size=1):
+        self.size = size
+        self.gate = threading.Event()
+        self.started = threading.Semaphore(0)
+        self.calls = []
+
+    def submit(self, task, timeout=None, cancel_event=None, on_progress=None, **kwargs):
+        self.calls.append((task, kwargs))
+        items = kwargs.get('items', [kwargs])
+        # Seperti worker sungguhan: file output sudah dibuka sebelum job selesai
+        files = [open(item['output_path'], 'wb') for item in items]
+        try:
+            self.started.release()
+            while not self.gate.wait(0.01):
+                if cancel_event is not None and cancel_event.is_set():
+                    raise WorkerCancelled("dibatalkan")
+            for f in files:
+                f.write(b'hasil')
+        finally:
+            for f in files:
+                f.close()
+        results = [{'mode': 'enhance', 'output_path': item['output_path']} for item in items]
+        return results if 'items' in kwargs else results[0]
+
+
+def _manager(pool, **kwargs):
+    return JobManager(lambda: pool, **kwargs)
+
+
+def _submit(manager, cache, tmp_path, key, name='foto', **kwargs):
+    """Seperti app._submit_job: input upload sendiri + file sementara unik."""
+    input_path = tmp_path / f"{name}_{len(os.listdir(tmp_path))}_input.png"
+    input_path.write_bytes(b'input')
+    output_file = cache.filename_for(key, '.png')
+    temp_path = cache.temp_path_for(output_file)
+    job = manager.submit(
+        'image_enhancer:proses_gambar',
+        cleanup=[str(input_path), temp_path],
+        dedup_key=key,
+        on_success=lambda result: cache.commit(output_file, temp_path, meta={'mode': result['mode']}),
+        input_path=str(input_path),
+        output_path=temp_path,
+        **kwargs
+    )
+    return job, str(input_path), output_file
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return ResultCache(str(tmp_path / 'output'), max_bytes=1 << 20)
+
+
+def test_duplikat_digabung_dan_keduanya_sukses(tmp_path, cache):
+    pool = _PoolPalsu()
+    manager = _manager(pool)
+    uploads = tmp_path / 'input'
+    uploads.mkdir()
+
+    pertama, input_1, output_file = _submit(manager, cache, uploads, 'a' * 64)
+    assert pool.started.acquire(timeout=5)
+    kedua, input_2, _ = _submit(manager, cache, uploads, 'a' * 64)
+
+    assert kedua.run is pertama.run
+    assert manager.coalesced == 1
+    # Duplikat hanya menghapus input miliknya sendiri
+    assert not os.path.exists(input_2)
+    assert os.path.exists(input_1)
+
+    pool.gate.set()
+    assert pertama.wait(5) and kedua.wait(5)
+    assert pertama.status == DONE and kedua.status == DONE, pertama.run.error
+    assert len(pool.calls) == 1
+    assert cache.lookup(output_file) is not None
+    assert cache.meta(output_file) == {'mode': 'enhance'}
+    assert not os.path.exists(input_1)
+    assert not [n for n in os.listdir(cache.directory) if '.tmp' in n]
+
+
+def test_temp_path_unik_per_penulisan(cache):
+    output_file = cache.filename_for('b' * 64, '.webp')
+    a, b = cache.temp_path_for(output_file), cache.temp_path_for(output_file)
+    assert a != b
+    assert a.endswith('.webp') and b.endswith('.webp')
+
+
+def test_antrian_penuh_memberi_retry_after(tmp_path, cache):
+    pool = _PoolPalsu()
+    manager = _manager(pool, max_depth=1)
+    uploads = tmp_path / 'input'
+    uploads.mkdir()
+
+    jalan, _, _ = _submit(manager, cache, uploads, 'c' * 64)
+    assert pool.started.acquire(timeout=5)
+    antri, _, _ = _submit(manager, cache, uploads, 'd' * 64)
+    assert manager.status(antri.id)['queue_position'] == 1
+
+    with pytest.raises(JobQueueFull) as info:
+        _submit(manager, cache, uploads, 'e' * 64)
+    assert info.value.retry_after >= 1
+
+    pool.gate.set()
+    assert jalan.wait(5) and antri.wait(5)
+    assert jalan.status == DONE and antri.status == DONE
+
+
+def test_micro_batch_satu_panggilan(tmp_path, cache):
+    pool = _PoolPalsu()
+    pool.gate.set()
+    manager = _manager(pool, batch_window=0.3, max_batch=4)
+    uploads = tmp_path / 'input'
+    uploads.mkdir()
+
+    batch = {'batch_task': 'image_enhancer:warnai_batch', 'batch_args': {'model_type': 'siggraph17'}}
+    jobs = [_submit(manager, cache, uploads, ch * 64, **batch)[0] for ch in 'fgh']
+    for job in jobs:
+        assert job.wait(5)
+        assert job.status == DONE, job.run.error
+
+    assert [task for task, _ in pool.calls] == ['image_enhancer:warnai_batch']
+    assert len(pool.calls[0][1]['items']) == 3
+    assert manager.batch_stats.snapshot()['batch_sizes'] == {'3': 1}
+
+
+def test_batal_hanya_bila_tidak_ada_yang_menunggu(tmp_path, cache):
+    pool = _PoolPalsu()
+    manager = _manager(pool)
+    uploads = tmp_path / 'input'
+    uploads.mkdir()
+
+    pertama, _, _ = _submit(manager, cache, uploads, 'i' * 64)
+    assert pool.started.acquire(timeout=5)
+    kedua, _, _ = _submit(manager, cache, uploads, 'i' * 64)
+
+    manager.cancel(pertama.id)
+    assert pertama.status == CANCELLED
+    assert not kedua.run.cancel_event.is_set()
+
+    manager.cancel(kedua.id)
+    assert kedua.run.cancel_event.is_set()
+    assert kedua.wait(5)
+    assert kedua.status == CANCELLED
+    assert not [n for n in os.listdir(cache.directory) if '.tmp' in n]
+
+
+def test_job_antri_dibatalkan_tidak_dijalankan(tmp_path, cache):
+    pool = _PoolPalsu()
+    manager = _manager(pool)
+    uploads = tmp_path / 'input'
+    uploads.mkdir()
+
+    jalan, _, _ = _submit(manager, cache, uploads, 'j' * 64)
+    assert pool.started.acquire(timeout=5)
+    antri, input_antri, _ = _submit(manager, cache, uploads, 'k' * 64)
+    manager.cancel(antri.id)
+    assert antri.status == CANCELLED
+    assert not os.path.exists(input_antri)
+
+    pool.gate.set()
+    assert jalan.wait(5)
+    assert len(pool.calls) == 1
+
+
+def test_commit_gagal_menandai_job_gagal(tmp_path, cache):
+    pool = _PoolPalsu()
+    pool.gate.set()
+    manager = _manager(pool)
+
+    job = manager.submit('x:y', on_success=lambda result: cache.commit('z_output.png', '/tidak/ada.png'),
+                         output_path=str(tmp_path / 'keluar.png'))
+    assert job.wait(5)
+    assert job.status == FAILED
+    assert 'ada.png' in job.run.error
@@ -0,0 +1,86 @@
+"""
+Ekspor ONNX colorizer (colorizers/onnx_backend.py): BatchNorm yang dilipat
+(fold_batchnorm + _ExportNet) harus identik dengan net asli, dan graph ONNX
+hasil ekspor cocok dengan torch. Bobot acak, jadi tidak butuh file bobot;
+bagian ONNX Runtime dilewati bila onnx/onnxscript/onnxruntime tidak terpasang.
+
+Usage:
+    python -m pytest tests/test_onnx_backend.py -q
+"""
+
+import os
+import sys
+
+import pytest
+import torch
+import torch.nn as nn
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+from colorizers import onnx_backend as ob  # noqa: E402
+from colorizers.quantize import _fp32_model  # noqa: E402
+from colorizers.registry import WeightRegistry  # noqa: E402
+
+MODELS = ['eccv16', 'siggraph17']
+
+
+def _net_acak(model_type, seed=0):
+    """Generator dengan statistik BN acak; sebagian skala BN negatif agar jalur tanda ikut teruji."""
+    torch.manual_seed(seed)
+    net = _fp32_model(model_type, pretrained=False)
+    with torch.no_grad():
+        for bn in net.modules():
+            if isinstance(bn, nn.BatchNorm2d):
+                n = bn.num_features
+                bn.weight.copy_(torch.randn(n))
+                bn.bias.copy_(torch.randn(n) * 0.1)
+                bn.running_mean.copy_(torch.randn(n) * 0.1)
+                bn.running_var.copy_(torch.rand(n) + 0.5)
+    return net.eval()
+
+
+def _input_l(batch):
+    return torch.rand(batch, 1, 256, 256, generator=torch.Generator().manual_seed(1)) * 100
+
+
+def _batas(ref):
+    return 1e-4 * max(1., float(ref.abs().max()))
+
+
+@pytest.mark.parametrize('model_type', MODELS)
+def test_fold_batchnorm_sama_dengan_net_asli(model_type):
+    net = _net_acak(model_type)
+    folded = ob.fold_batchnorm(net)
+
+    assert not any(isinstance(m, nn.BatchNorm2d) for m in folded.modules())
+    assert any(isinstance(m, nn.BatchNorm2d) for m in net.modules())  # net asli tidak diubah
+    tens = _input_l(1)
+    with torch.no_grad():
+        ref = net(tens)
+        out = ob._ExportNet(folded).eval()(tens)
+    assert out.shape == ref.shape
+    assert float((out - ref).abs().max()) <= _batas(ref)
+
+
+@pytest.mark.parametrize('model_type', MODELS)
+def test_ekspor_onnx_cocok_dengan_torch(model_type, tmp_path, monkeypatch):
+    pytest.importorskip('onnx')
+    pytest.importorskip('onnxscript')
+    pytest.importorskip('onnxruntime')
+
+    net = _net_acak(model_type)
+    monkeypatch.setattr(ob, '_fp32_model', lambda name: net)
+    registry = WeightRegistry(str(tmp_path / 'bobot'))
+    ob.export(model_type, registry=registry)
+    model = ob.load_onnx(model_type, registry=registry)
+
+    # Batch berbeda dari saat ekspor: dimensi batch dinamis
+    tens = _input_l(3)
+    with torch.no_grad():
+        ref = net(tens)
+    out = model(tens)
+    assert out.shape == ref.shape
+    assert float((out - ref).abs().max()) <= _batas(ref)
+    with pytest.raises(ValueError):
+        model(tens, input_B=torch.zeros(3, 2, 256, 256))
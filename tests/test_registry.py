@@ -0,0 +1,124 @@
+"""
+Registry bobot colorizer (colorizers/registry.py): cek sha256, cap verifikasi
+di manifest, tanpa unduhan bila tidak diizinkan, dan folder bobot read-only.
+
+Usage:
+    python -m pytest tests/test_registry.py -q
+"""
+
+import errno
+import os
+import sys
+
+import pytest
+import torch
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+from colorizers import registry as reg  # noqa: E402
+
+
+def _state():
+    return {'conv.weight': torch.arange(12, dtype=torch.float32).reshape(3, 4), 'conv.bias': torch.ones(3)}
+
+
+def _checkpoint(path, zip_format=True):
+    torch.save(_state(), str(path), _use_new_zipfile_serialization=zip_format)
+    return str(path)
+
+
+def _read_only(registry, monkeypatch):
+    def gagal(manifest):
+        raise OSError(errno.EROFS, 'Read-only file system', registry.manifest_path)
+    monkeypatch.setattr(registry, '_write_manifest', gagal)
+
+
+def test_add_mencatat_hash_dan_memuat(tmp_path):
+    registry = reg.WeightRegistry(str(tmp_path / 'bobot'))
+    path = registry.add('mini', _checkpoint(tmp_path / 'mini.pth'))
+
+    entry = registry.read_manifest()['mini']
+    assert entry['sha256'] == reg.file_sha256(path)
+    assert entry['verified'][0] == os.path.getsize(path)
+    state = registry.load_state_dict('mini')
+    assert torch.equal(state['conv.weight'], _state()['conv.weight'])
+
+
+def test_file_berubah_ditolak(tmp_path):
+    registry = reg.WeightRegistry(str(tmp_path / 'bobot'))
+    path = registry.add('mini', _checkpoint(tmp_path / 'mini.pth'))
+
+    with open(path, 'ab') as f:
+        f.write(b'rusak')
+    with pytest.raises(reg.ChecksumMismatch):
+        registry.verify('mini')
+
+
+def test_cap_verifikasi_melewati_hash_ulang(tmp_path, monkeypatch):
+    registry = reg.WeightRegistry(str(tmp_path / 'bobot'))
+    registry.add('mini', _checkpoint(tmp_path / 'mini.pth'))
+
+    dihitung = []
+    monkeypatch.setattr(reg, 'file_sha256', lambda path: dihitung.append(path) or '')
+    registry.verify('mini')
+    assert dihitung == []
+
+
+def test_prefix_hash_di_nama_file(tmp_path):
+    directory = tmp_path / 'bobot'
+    directory.mkdir()
+    path = _checkpoint(directory / 'model.pth')
+    digest = reg.file_sha256(path)
+    os.rename(path, directory / f'model-{digest[:8]}.pth')
+
+    registry = reg.WeightRegistry(str(directory))
+    registry._update_entry('mini', file=f'model-{digest[:8]}.pth')
+    assert registry.verify('mini').endswith(f'model-{digest[:8]}.pth')
+    assert registry.read_manifest()['mini']['sha256'] == digest
+
+    registry._update_entry('salah', file='model-00000000.pth')
+    os.link(directory / f'model-{digest[:8]}.pth', directory / 'model-00000000.pth')
+    with pytest.raises(reg.ChecksumMismatch):
+        registry.verify('salah')
+
+
+def test_tanpa_unduhan_bila_tidak_diizinkan(tmp_path, monkeypatch):
+    registry = reg.WeightRegistry(str(tmp_path / 'kosong'), allow_download=False)
+    monkeypatch.setattr(reg.urllib.request, 'urlopen', pytest.fail)
+    with pytest.raises(reg.WeightsNotAvailable, match='ANJAYHD_ALLOW_DOWNLOAD'):
+        registry.load_state_dict('eccv16')
+
+
+def test_folder_read_only_tetap_bisa_memuat(tmp_path, monkeypatch):
+    directory = tmp_path / 'bobot'
+    reg.WeightRegistry(str(directory)).add('mini', _checkpoint(tmp_path / 'mini.pth'))
+    # Cap verifikasi basi (mis. file disalin ulang) -> verify ingin menulis manifest
+    os.utime(directory / 'mini.pth', ns=(1, 1))
+
+    registry = reg.WeightRegistry(str(directory))
+    _read_only(registry, monkeypatch)
+    state = registry.load_state_dict('mini')
+    assert torch.equal(state['conv.bias'], torch.ones(3))
+
+    # Cap disimpan di memori: panggilan berikutnya tidak menghitung hash lagi
+    dihitung = []
+    monkeypatch.setattr(reg, 'file_sha256', lambda path: dihitung.append(path) or '')
+    registry.verify('mini')
+    assert dihitung == []
+
+
+def test_checkpoint_lama_di_folder_read_only(tmp_path, monkeypatch):
+    directory = tmp_path / 'bobot'
+    reg.WeightRegistry(str(directory)).add('lama', _checkpoint(tmp_path / 'lama.pth', zip_format=False))
+
+    registry = reg.WeightRegistry(str(directory))
+    _read_only(registry, monkeypatch)
+
+    def save_gagal(*args, **kwargs):
+        raise OSError(errno.EROFS, 'Read-only file system')
+    monkeypatch.setattr(reg.torch, 'save', save_gagal)
+
+    state = registry.load_state_dict('lama')
+    assert torch.equal(state['conv.weight'], _state()['conv.weight'])
+    assert not os.path.exists(directory / 'lama.zip.pth')
@@ -0,0 +1,75 @@
+"""
+Batas panjang output WebP animasi (video_pipeline.WEBP_MAX_FRAMES): encoder
+WebP PIL menahan semua frame, jadi klip yang lebih panjang ditolak di awal,
+baik oleh proses_video maupun saat upload ke server.
+
+Usage:
+    python -m pytest tests/test_video_pipeline.py -q
+"""
+
+import io
+import os
+import sys
+
+import numpy as np
+import pytest
+from PIL import Image
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+import video_pipeline  # noqa: E402
+
+
+def _webp(target, frames=5):
+    """WebP animasi berwarna (tidak ada frame BW, jadi colorize tidak memuat model)."""
+    rng = np.random.default_rng(0)
+    images = [Image.fromarray(rng.integers(0, 256, size=(24, 32, 3), dtype=np.uint8)) for _ in range(frames)]
+    images[0].save(target, 'WEBP', save_all=True, append_images=images[1:], duration=80, lossless=True)
+    return target
+
+
+def test_webp_terlalu_panjang_ditolak_sebelum_diproses(tmp_path, monkeypatch):
+    monkeypatch.setattr(video_pipeline, 'WEBP_MAX_FRAMES', 4)
+    output_path = tmp_path / 'hasil.webp'
+
+    with pytest.raises(ValueError, match='maksimal 4 frame'):
+        video_pipeline.proses_video(_webp(str(tmp_path / 'anim.webp')), str(output_path),
+                                    mode='colorize', reuse=False)
+    assert not output_path.exists()
+
+
+def test_webp_dalam_batas(tmp_path, monkeypatch):
+    monkeypatch.setattr(video_pipeline, 'WEBP_MAX_FRAMES', 5)
+    output_path = str(tmp_path / 'hasil.webp')
+
+    result = video_pipeline.proses_video(_webp(str(tmp_path / 'anim.webp')), output_path,
+                                         mode='colorize', reuse=False)
+    assert result['frames'] == 5
+    with Image.open(output_path) as img:
+        assert img.n_frames == 5
+
+
+def test_penulis_webp_menolak_frame_lebih(tmp_path, monkeypatch):
+    monkeypatch.setattr(video_pipeline, 'WEBP_MAX_FRAMES', 2)
+    writer = video_pipeline.buat_penulis(str(tmp_path / 'hasil.webp'))
+    frame = np.zeros((8, 8, 3), dtype=np.uint8)
+    writer.tulis(frame, 100)
+    writer.tulis(frame, 100)
+    with pytest.raises(ValueError):
+        writer.tulis(frame, 100)
+    writer.batal()
+    assert not (tmp_path / 'hasil.webp').exists()
+
+
+def test_upload_webp_terlalu_panjang_400(tmp_path, monkeypatch):
+    import app as server
+
+    monkeypatch.setattr(video_pipeline, 'WEBP_MAX_FRAMES', 4)
+    data = open(_webp(str(tmp_path / 'anim.webp')), 'rb').read()
+    response = server.app.test_client().post(
+        '/jobs', data={'file': (io.BytesIO(data), 'anim.webp'), 'mode': 'colorize'},
+        content_type='multipart/form-data')
+
+    assert response.status_code == 400
+    assert 'maksimal 4 frame' in response.get_json()['error']
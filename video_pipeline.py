@@ -0,0 +1,707 @@
+"""
+Pipeline Video / GIF / WebP Animasi
+Warnai dan/atau perbesar klip frame demi frame. Decode, inferensi, dan encode
+berjalan bersamaan sebagai tiga tahap yang dihubungkan antrean berbatas
+(ANJAYHD_VIDEO_QUEUE frame), jadi memori tetap datar berapa pun panjang
+klipnya: tidak pernah ada lebih dari beberapa frame sekaligus di memori.
+
+- decode  : cv2.VideoCapture (video) atau PIL ImageSequence (GIF/WebP), di thread sendiri
+- olah    : colorize per batch frame (satu forward pass) lalu SR torch tiled
+            (model realesr-animevideov3 x2/x3/x4), di thread pemanggil
+- encode  : cv2.VideoWriter (video), penulis GIF streaming, atau animasi
+            WebP lewat PIL save_all, di thread sendiri. Output WebP menahan
+            frame (PNG terkompresi) sampai akhir, jadi dibatasi
+            ANJAYHD_WEBP_MAX_FRAMES; memori datar berlaku untuk video/GIF
+
+SR selalu memakai engine PyTorch in-process; menjalankan exe ncnn per frame
+terlalu lambat. Audio tidak ikut disalin (cv2 tidak bisa mux audio).
+
+Usage:
+    python video_pipeline.py klip.mp4 hasil.mp4 --mode both --scale 2
+    python video_pipeline.py anim.gif hasil.gif --mode colorize
+    proses_video('klip.mp4', 'hasil.mp4', mode='enhance', scale=4)
+"""
+
+from __future__ import annotations
+
+import argparse
+import io
+import os
+import queue
+import struct
+import threading
+import time
+
+
+VIDEO_EXTENSIONS = ('.mp4', '.mov', '.avi', '.mkv', '.webm', '.m4v')
+ANIMATION_EXTENSIONS = ('.gif', '.webp')
+
+QUEUE_FRAMES = int(os.environ.get('ANJAYHD_VIDEO_QUEUE', '4'))
+FRAME_BATCH = int(os.environ.get('ANJAYHD_VIDEO_BATCH', '4'))
+
+# Pakai ulang hasil frame sebelumnya untuk frame yang hampir sama (lihat FrameReuse)
+REUSE = os.environ.get('ANJAYHD_VIDEO_REUSE', '1') != '0'
+SCENE_CUT = float(os.environ.get('ANJAYHD_SCENE_CUT', '0.3'))
+AB_REUSE_DELTA = float(os.environ.get('ANJAYHD_AB_REUSE_DELTA', '4'))
+TILE_DELTA = float(os.environ.get('ANJAYHD_TILE_DELTA', '6'))
+REUSE_MAX_TILES = float(os.environ.get('ANJAYHD_REUSE_MAX_TILES', '0.5'))
+
+# Encoder WebP animasi PIL menahan semua frame sampai akhir (lihat _PenulisWebp),
+# jadi panjang output WebP dibatasi; klip lebih panjang ditolak di awal
+WEBP_MAX_FRAMES = int(os.environ.get('ANJAYHD_WEBP_MAX_FRAMES', '300'))
+
+_THUMB = 64   # sisi thumbnail abu-abu untuk deteksi pergantian adegan
+_CUT_PIXEL_DELTA = 24  # pixel thumbnail dihitung berubah bila selisihnya lebih dari ini
+_BLOCK = 8    # perubahan per tile diukur sebagai rata-rata blok 8x8 (noise kompresi teredam)
+
+# Codec dicoba berurutan sampai VideoWriter berhasil dibuka
+FOURCC = {
+    '.mp4': ('avc1', 'mp4v'),
+    '.m4v': ('avc1', 'mp4v'),
+    '.mov': ('avc1', 'mp4v'),
+    '.mkv': ('avc1', 'mp4v'),
+    '.avi': ('MJPG', 'XVID'),
+    '.webm': ('VP80', 'VP90'),
+}
+
+_SELESAI = object()
+
+
+class _Dihentikan(Exception):
+    """Tahap lain gagal; tahap ini berhenti tanpa error sendiri."""
+
+
+def is_animasi(path: str) -> bool:
+    """True untuk file video, GIF, atau WebP dengan lebih dari satu frame."""
+    ext = os.path.splitext(path)[1].lower()
+    if ext in VIDEO_EXTENSIONS:
+        return True
+    if ext not in ANIMATION_EXTENSIONS:
+        return False
+    from PIL import Image
+    try:
+        with Image.open(path) as img:
+            return getattr(img, 'n_frames', 1) > 1
+    except OSError:
+        return False
+
+
+def jumlah_frame(path: str) -> int:
+    """Jumlah frame dari header (GIF/WebP: PIL, video: metadata container); 0 bila tidak diketahui."""
+    ext = os.path.splitext(path)[1].lower()
+    if ext in ANIMATION_EXTENSIONS:
+        from PIL import Image
+        try:
+            with Image.open(path) as img:
+                return getattr(img, 'n_frames', 1)
+        except OSError:
+            return 0
+
+    import cv2
+
+    cap = cv2.VideoCapture(path)
+    try:
+        return max(0, int(cap.get(cv2.CAP_PROP_FRAME_COUNT))) if cap.isOpened() else 0
+    finally:
+        cap.release()
+
+
+def cek_batas_webp(frames: int) -> None:
+    """ValueError bila output WebP animasi akan melebihi WEBP_MAX_FRAMES frame."""
+    if frames > WEBP_MAX_FRAMES:
+        raise ValueError(f"WebP animasi maksimal {WEBP_MAX_FRAMES} frame (input {frames} frame); "
+                         f"pakai output GIF atau video untuk klip yang lebih panjang")
+
+
+def baca_frame(path: str):
+    """
+    Generator frame BGR uint8 beserta durasinya (ms), dibaca satu per satu.
+    """
+    import cv2
+    import numpy as np
+
+    ext = os.path.splitext(path)[1].lower()
+    if ext in ANIMATION_EXTENSIONS:
+        from PIL import Image, ImageSequence
+
+        with Image.open(path) as img:
+            for frame in ImageSequence.Iterator(img):
+                rgb = np.asarray(frame.convert('RGB'))
+                yield cv2.cvtColor(rgb, cv2.COLOR_RGB2BGR), frame.info.get('duration') or 100
+        return
+
+    cap = cv2.VideoCapture(path)
+    if not cap.isOpened():
+        raise ValueError(f"Tidak dapat membuka video: {path}")
+    try:
+        fps = cap.get(cv2.CAP_PROP_FPS) or 25.0
+        while True:
+            ok, frame = cap.read()
+            if not ok:
+                break
+            yield frame, 1000.0 / fps
+    finally:
+        cap.release()
+
+
+class _PenulisVideo:
+    """cv2.VideoWriter; fps diambil dari durasi frame pertama."""
+
+    def __init__(self, path):
+        self.path = path
+        self._writer = None
+
+    def tulis(self, frame, duration):
+        import cv2
+
+        if self._writer is None:
+            height, width = frame.shape[:2]
+            fps = 1000.0 / duration
+            for code in FOURCC.get(os.path.splitext(self.path)[1].lower(), ('mp4v',)):
+                writer = cv2.VideoWriter(self.path, cv2.VideoWriter_fourcc(*code), fps, (width, height))
+                if writer.isOpened():
+                    self._writer = writer
+                    break
+                writer.release()
+            else:
+                raise RuntimeError(f"Tidak ada codec video yang bisa dipakai untuk: {self.path}")
+        self._writer.write(frame)
+
+    def tutup(self):
+        if self._writer is not None:
+            self._writer.release()
+
+    def batal(self):
+        self.tutup()
+        _hapus(self.path)
+
+
+class _PenulisGif:
+    """
+    Penulis GIF animasi streaming. PIL save_all mengumpulkan semua frame di
+    memori sebelum menulis, jadi tiap frame di-encode sendiri oleh PIL
+    (palet 256 warna) lalu blok gambarnya disalin ke file dengan palet lokal.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._file = None
+
+    def tulis(self, frame, duration):
+        import cv2
+        from PIL import Image
+
+        img = Image.fromarray(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+        img = img.quantize(256, method=Image.Quantize.FASTOCTREE)
+        buf = io.BytesIO()
+        img.save(buf, 'GIF')
+        data = buf.getvalue()
+
+        if self._file is None:
+            self._file = open(self.path, 'wb')
+            # Header + logical screen tanpa palet global + loop selamanya
+            self._file.write(b'GIF89a' + struct.pack('<HHBBB', img.width, img.height, 0, 0, 0))
+            self._file.write(b'\x21\xff\x0bNETSCAPE2.0\x03\x01\x00\x00\x00')
+
+        flags = data[10]
+        pos = 13
+        palette = b''
+        if flags & 0x80:
+            palette_len = 3 << ((flags & 0x07) + 1)
+            palette = data[pos:pos + palette_len]
+            pos += palette_len
+        # Lewati extension bawaan PIL (komentar, dll.)
+        while data[pos] == 0x21:
+            pos += 2
+            while data[pos]:
+                pos += data[pos] + 1
+            pos += 1
+        if data[pos] != 0x2C:
+            raise RuntimeError("Format GIF dari PIL tidak dikenali")
+
+        descriptor = bytearray(data[pos:pos + 10])
+        if palette and not descriptor[9] & 0x80:
+            descriptor[9] = (descriptor[9] & 0x40) | 0x80 | (flags & 0x07)
+        else:
+            palette = b''
+        delay = max(1, int(round(duration / 10.0)))
+        self._file.write(b'\x21\xf9\x04\x00' + struct.pack('<H', delay) + b'\x00\x00')
+        self._file.write(bytes(descriptor) + palette)
+        self._file.write(data[pos + 10:-1])  # tanpa trailer ';'
+
+    def tutup(self):
+        if self._file is not None:
+            try:
+                self._file.write(b'\x3b')
+            finally:
+                self._file.close()
+
+    def batal(self):
+        if self._file is not None:
+            self._file.close()
+        _hapus(self.path)
+
+
+class _PenulisWebp:
+    """
+    Animasi WebP lewat API publik PIL (save_all + append_images). Encoder WebP
+    PIL mengumpulkan semua frame sebelum encode (append_images di-list()),
+    jadi sampai tutup() frame ditahan sebagai PNG terkompresi cepat dan baru
+    di-decode saat PIL meng-encode-nya. Karena memorinya tumbuh sebanding
+    panjang klip, jumlah frame dibatasi WEBP_MAX_FRAMES: proses_video menolak
+    klip yang lebih panjang sebelum mulai, dan tulis() menolak frame lebihnya.
+    """
+
+    QUALITY = 80
+
+    def __init__(self, path):
+        self.path = path
+        self._frames = []
+        self._durations = []
+
+    def tulis(self, frame, duration):
+        import cv2
+
+        cek_batas_webp(len(self._frames) + 1)
+        ok, buf = cv2.imencode('.png', frame, [cv2.IMWRITE_PNG_COMPRESSION, 1])
+        if not ok:
+            raise RuntimeError(f"Gagal menyimpan frame WebP: {self.path}")
+        self._frames.append(buf.tobytes())
+        self._durations.append(max(1, int(round(duration))))
+
+    @staticmethod
+    def _gambar(data):
+        from PIL import Image
+
+        # Dibuka lazy: piksel baru di-decode saat PIL memuat frame ini
+        return Image.open(io.BytesIO(data))
+
+    def tutup(self):
+        if not self._frames:
+            return
+        frames = self._frames
+        self._frames = []
+        first = self._gambar(frames[0])
+        first.save(self.path, 'WEBP', save_all=True, append_images=(self._gambar(d) for d in frames[1:]),
+                   duration=self._durations, loop=0, quality=self.QUALITY, method=0)
+
+    def batal(self):
+        self._frames = []
+        _hapus(self.path)
+
+
+def _hapus(path):
+    """Hapus output setengah jadi dari penulis yang dibatalkan."""
+    if os.path.exists(path):
+        os.remove(path)
+
+
+def buat_penulis(path: str):
+    """Penulis frame sesuai ekstensi: tulis(frame, duration), lalu tutup() atau batal() bila gagal."""
+    ext = os.path.splitext(path)[1].lower()
+    if ext == '.gif':
+        return _PenulisGif(path)
+    if ext == '.webp':
+        return _PenulisWebp(path)
+    if ext in VIDEO_EXTENSIONS:
+        return _PenulisVideo(path)
+    raise ValueError(f"Format output video tidak didukung: {ext}")
+
+
+class FrameReuse:
+    """
+    Pakai ulang inferensi antar frame video yang hampir sama.
+
+    - Pergantian adegan: lebih dari fraksi scene_cut pixel thumbnail 64x64
+      berubah jelas dibanding frame sebelumnya. Semua referensi dibuang
+      (refresh penuh), jadi tiap adegan baru selalu dihitung dari nol.
+    - Colorize: prediksi ab dari frame referensi dipakai ulang selama
+      thumbnail frame ini berbeda <= ab_delta dari thumbnail referensi;
+      L resolusi penuh tetap dari frame ini (hanya forward pass yang dilewati).
+    - SR: per tile SR, rata-rata blok 8x8 dari selisih terhadap input referensi
+      dibandingkan dengan tile_delta. Tanpa tile berubah, hasil sebelumnya
+      dipakai apa adanya; bila sebagian kecil (<= max_tiles, termasuk tetangga
+      yang beririsan) yang berubah, hanya tile itu yang dihitung ulang dan
+      di-blend ulang dengan tetangganya; selain itu SR penuh.
+
+    Referensi hanya diperbarui di tempat yang dihitung ulang, jadi perubahan
+    lambat tidak menumpuk melewati ambang.
+    """
+
+    def __init__(self, scene_cut=SCENE_CUT, ab_delta=AB_REUSE_DELTA, tile_delta=TILE_DELTA,
+                 max_tiles=REUSE_MAX_TILES):
+        self.scene_cut = scene_cut
+        self.ab_delta = ab_delta
+        self.tile_delta = tile_delta
+        self.max_tiles = max_tiles
+        self.stats = {'frames': 0, 'scene_cuts': 0, 'ab_computed': 0, 'ab_reused': 0,
+                      'sr_full': 0, 'sr_partial': 0, 'sr_reused': 0, 'tiles_total': 0, 'tiles_computed': 0}
+        self._prev_thumb = None
+        self._ab = None
+        self._ab_thumb = None
+        self._sr_in = None
+        self._sr_out = None
+        self._sr_final = None
+
+    @staticmethod
+    def _thumb(img):
+        import cv2
+
+        gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY) if img.ndim == 3 else img
+        return cv2.resize(gray, (_THUMB, _THUMB), interpolation=cv2.INTER_AREA)
+
+    @staticmethod
+    def _delta(a, b):
+        import cv2
+
+        return float(cv2.absdiff(a, b).mean())
+
+    def deteksi(self, images):
+        """Thumbnail dan penanda pergantian adegan per frame (frame pertama = adegan baru)."""
+        import cv2
+        import numpy as np
+
+        marks = []
+        for img in images:
+            thumb = self._thumb(img)
+            cut = (self._prev_thumb is None or
+                   np.count_nonzero(cv2.absdiff(thumb, self._prev_thumb) > _CUT_PIXEL_DELTA) > self.scene_cut * thumb.size)
+            self._prev_thumb = thumb
+            self.stats['frames'] += 1
+            self.stats['scene_cuts'] += int(cut)
+            marks.append((thumb, cut))
+        return marks
+
+    def warnai(self, images, marks, model_type='siggraph17', saturation_boost=1.3):
+        """Colorize frame BW; forward pass hanya untuk frame yang tidak bisa memakai ab referensi."""
+        import cv2
+        from colorizers import predict_ab
+        from colorizers.util import postprocess_lab, rgb_to_l
+        import image_enhancer as ie
+
+        # Tentukan sumber ab per frame: ab lama, frame baru di batch ini, atau None (berwarna)
+        sources = []
+        fresh = []
+        ref, ref_thumb = ('lama', self._ab) if self._ab is not None else None, self._ab_thumb
+        for i, (img, (thumb, cut)) in enumerate(zip(images, marks)):
+            if cut:
+                ref = None
+            if ref is not None and self._delta(thumb, ref_thumb) <= self.ab_delta:
+                sources.append(ref)
+                self.stats['ab_reused'] += 1
+            elif ie.cek_gambar_hitam_putih(img):
+                ref, ref_thumb = ('baru', len(fresh)), thumb
+                fresh.append(i)
+                sources.append(ref)
+                self.stats['ab_computed'] += 1
+            else:
+                ref = None
+                sources.append(None)
+
+        rgbs = [ie._ke_rgb(img) for img in images]
+        predicted = predict_ab([rgbs[i] for i in fresh], model_type=model_type,
+                               batch_size=max(1, len(fresh))) if fresh else []
+        result = []
+        for img, rgb, source in zip(images, rgbs, sources):
+            if source is None:
+                result.append(img)
+                continue
+            ab = self._ab if source[0] == 'lama' else predicted[source[1]]
+            colored = postprocess_lab(rgb_to_l(rgb), ab, saturation_boost=saturation_boost)
+            result.append(cv2.cvtColor(colored, cv2.COLOR_RGB2BGR, dst=colored))
+
+        if ref is None:
+            self._ab, self._ab_thumb = None, None
+        elif ref[0] == 'baru':
+            self._ab, self._ab_thumb = predicted[ref[1]], ref_thumb
+        return result
+
+    def upscale(self, img, cut, upscaler):
+        """SR satu frame BGR dengan pemakaian ulang per tile; hasil BGR skala akhir."""
+        import cv2
+
+        if img.ndim == 2:
+            img = cv2.cvtColor(img, cv2.COLOR_GRAY2BGR)
+        h, w = img.shape[:2]
+        tiles = upscaler.tiles(h, w)
+        self.stats['tiles_total'] += len(tiles)
+
+        changed = tiles
+        if not cut and self._sr_in is not None and self._sr_in.shape == img.shape:
+            diff = cv2.absdiff(img, self._sr_in).max(axis=2)
+            blocks = cv2.resize(diff, (max(1, w // _BLOCK), max(1, h // _BLOCK)), interpolation=cv2.INTER_AREA)
+            bh, bw = blocks.shape
+            changed = [(y0, y1, x0, x1) for y0, y1, x0, x1 in tiles
+                       if blocks[y0 * bh // h:max(y0 * bh // h + 1, -(-y1 * bh // h)),
+                                 x0 * bw // w:max(x0 * bw // w + 1, -(-x1 * bw // w))].max() > self.tile_delta]
+
+        if not changed:
+            self.stats['sr_reused'] += 1
+            return self._sr_final
+
+        rgb = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
+        # Overlap tile berubah juga di-blend dengan tile tetangganya, jadi tetangga
+        # ikut dihitung ulang (lihat _perbarui_tile)
+        ring = changed if changed is tiles else [t for t in tiles if any(_beririsan(t, c) for c in changed)]
+        if changed is tiles or len(ring) > self.max_tiles * len(tiles):
+            self.stats['sr_full'] += 1
+            self.stats['tiles_computed'] += len(tiles)
+            self._sr_out = upscaler.upscale_rgb(rgb)
+            self._sr_in = img
+        else:
+            self.stats['sr_partial'] += 1
+            self.stats['tiles_computed'] += len(ring)
+            self._perbarui_tile(rgb, changed, ring, upscaler)
+            self._sr_in = self._sr_in.copy()
+            for y0, y1, x0, x1 in changed:
+                self._sr_in[y0:y1, x0:x1] = img[y0:y1, x0:x1]
+        self._sr_final = upscaler.finish(self._sr_out, inplace=False)
+        return self._sr_final
+
+    def _perbarui_tile(self, rgb, changed, ring, upscaler):
+        """
+        Hitung ulang area tile berubah persis seperti SR penuh. Pixel hasil
+        ditentukan oleh semua tile yang menutupinya, di-blend berurutan raster
+        (tile pertama yang menutupi selalu berbobot penuh). Karena itu tile
+        berubah plus tetangga yang beririsan (ring) dikomposisi ulang di
+        salinan, lalu hanya area tile berubah yang disalin ke hasil. Tepi luar
+        ring tidak pernah ditempel, jadi tidak ada sambungan dengan tile lama.
+        """
+        s = upscaler.model_scale
+        scratch = upscaler.upscale_rgb(rgb, out=self._sr_out.copy(), tiles=ring)
+        for y0, y1, x0, x1 in changed:
+            area = (slice(y0 * s, y1 * s), slice(x0 * s, x1 * s))
+            self._sr_out[area] = scratch[area]
+
+    def ringkasan(self):
+        """Statistik plus rasio lewati: forward colorizer dan tile SR yang tidak dihitung."""
+        stats = dict(self.stats)
+        ab_total = stats['ab_computed'] + stats['ab_reused']
+        stats['ab_skip_ratio'] = round(stats['ab_reused'] / ab_total, 4) if ab_total else 0.0
+        stats['sr_skip_ratio'] = (round(1 - stats['tiles_computed'] / stats['tiles_total'], 4)
+                                  if stats['tiles_total'] else 0.0)
+        return stats
+
+
+def _beririsan(a, b):
+    """True bila dua tile (y0, y1, x0, x1) berbagi pixel."""
+    return a[0] < b[1] and b[0] < a[1] and a[2] < b[3] and b[2] < a[3]
+
+
+def _put(q, item, stop):
+    while not stop.is_set():
+        try:
+            q.put(item, timeout=0.1)
+            return
+        except queue.Full:
+            continue
+    raise _Dihentikan()
+
+
+def _get(q, stop):
+    while not stop.is_set():
+        try:
+            return q.get(timeout=0.1)
+        except queue.Empty:
+            continue
+    raise _Dihentikan()
+
+
+def proses_video(input_path: str, output_path: str, mode: str = 'enhance', scale: int = 4,
+                 model_type: str = 'siggraph17', saturation_boost: float = 1.3,
+                 batch_size: int = FRAME_BATCH, queue_frames: int = QUEUE_FRAMES,
+                 reuse: bool = REUSE) -> dict:
+    """
+    Proses video/GIF/WebP animasi frame demi frame (lihat docstring modul).
+    Mode 'auto' ditentukan sekali dari frame pertama. Dengan reuse, frame yang
+    hampir sama dengan frame sebelumnya memakai ulang hasil inferensi
+    (FrameReuse); statistiknya ada di 'reuse' pada hasil.
+
+    Returns:
+        dict seperti image_enhancer.proses_gambar ditambah 'frames', 'fps', dan
+        timings per tahap (total waktu sibuk tiap tahap, bisa tumpang tindih)
+    """
+    import cv2
+    import numpy as np
+    import image_enhancer as ie
+
+    if mode not in ie.MODES:
+        raise ValueError(f"Mode tidak dikenal: {mode}")
+    if not os.path.exists(input_path):
+        raise FileNotFoundError(f"File input tidak ditemukan: {input_path}")
+    if os.path.splitext(output_path)[1].lower() == '.webp':
+        cek_batas_webp(jumlah_frame(input_path))
+
+    frames_in = queue.Queue(maxsize=queue_frames)
+    frames_out = queue.Queue(maxsize=queue_frames)
+    stop = threading.Event()
+    errors = []
+    stage_timings = {'decode': {}, 'olah': {}, 'encode': {}}
+    info = {'frames': 0, 'input_size': None, 'output_size': None, 'durations': 0.0}
+    writer = buat_penulis(output_path)
+    reuse = FrameReuse() if reuse else None
+
+    def decoder():
+        try:
+            with ie._catat_job(stage_timings['decode']):
+                frames = baca_frame(input_path)
+                while True:
+                    with ie.catat_tahap('decode'):
+                        item = next(frames, None)
+                    if item is None:
+                        break
+                    _put(frames_in, item, stop)
+            _put(frames_in, _SELESAI, stop)
+        except _Dihentikan:
+            pass
+        except Exception as e:
+            errors.append(e)
+            stop.set()
+
+    def encoder():
+        selesai = False
+        try:
+            with ie._catat_job(stage_timings['encode']):
+                while True:
+                    item = _get(frames_out, stop)
+                    if item is _SELESAI:
+                        break
+                    frame, duration = item
+                    with ie.catat_tahap('encode'):
+                        writer.tulis(frame, duration)
+                    info['frames'] += 1
+                    info['durations'] += duration
+                    info['output_size'] = (frame.shape[1], frame.shape[0])
+                with ie.catat_tahap('encode'):
+                    writer.tutup()
+            selesai = True
+        except _Dihentikan:
+            pass
+        except Exception as e:
+            errors.append(e)
+            stop.set()
+        finally:
+            # Tahap mana pun gagal: lepas handle file/VideoWriter dan hapus output terpotong
+            if not selesai:
+                writer.batal()
+
+    threads = [threading.Thread(target=decoder, daemon=True, name='anjayhd-video-decode'),
+               threading.Thread(target=encoder, daemon=True, name='anjayhd-video-encode')]
+    for thread in threads:
+        thread.start()
+
+    def olah(batch):
+        """Colorize satu batch frame dalam satu forward pass, lalu SR per frame."""
+        images = [frame for frame, _ in batch]
+        if reuse is not None:
+            marks = reuse.deteksi(images)
+            if mode in ('colorize', 'both'):
+                with ie.catat_tahap('colorize'):
+                    images = reuse.warnai(images, marks, model_type=model_type,
+                                          saturation_boost=saturation_boost)
+            if mode in ('enhance', 'both'):
+                from sr_engine import get_upscaler
+                upscaler = get_upscaler(scale=scale)
+                with ie.catat_tahap('sr'):
+                    images = [reuse.upscale(img, cut, upscaler) for img, (_, cut) in zip(images, marks)]
+        elif mode in ('colorize', 'both'):
+            bw = [i for i, img in enumerate(images) if ie.cek_gambar_hitam_putih(img)]
+            if bw:
+                from colorizers import colorize_batch
+                with ie.catat_tahap('colorize'):
+                    colored = colorize_batch([ie._ke_rgb(images[i]) for i in bw], model_type=model_type,
+                                             batch_size=len(bw), saturation_boost=saturation_boost)
+                for i, pil in zip(bw, colored):
+                    images[i] = cv2.cvtColor(np.asarray(pil), cv2.COLOR_RGB2BGR)
+        if reuse is None and mode in ('enhance', 'both'):
+            images = [ie.upscale_array(img, scale=scale) for img in images]
+        for img, (_, duration) in zip(images, batch):
+            _put(frames_out, (img, duration), stop)
+
+    start = time.perf_counter()
+    processed = 0
+    try:
+        with ie._catat_job(stage_timings['olah']):
+            selesai = False
+            while not selesai:
+                batch = []
+                item = _get(frames_in, stop)
+                while item is not _SELESAI:
+                    if info['input_size'] is None:
+                        info['input_size'] = (item[0].shape[1], item[0].shape[0])
+                        if mode == 'auto':
+                            mode = ie.pilih_mode_auto(item[0])
+                            print(f"[INFO] Mode auto: {mode}")
+                    batch.append(item)
+                    if len(batch) >= batch_size:
+                        break
+                    # Ambil frame yang sudah siap tanpa menunggu decoder
+                    try:
+                        item = frames_in.get_nowait()
+                    except queue.Empty:
+                        break
+                selesai = item is _SELESAI
+                if batch:
+                    olah(batch)
+                    if (processed + len(batch)) // 100 > processed // 100:
+                        print(f"[INFO] {processed + len(batch)} frame diproses "
+                              f"({(processed + len(batch)) / (time.perf_counter() - start):.2f} frame/detik)")
+                    processed += len(batch)
+            _put(frames_out, _SELESAI, stop)
+    except _Dihentikan:
+        pass
+    except Exception as e:
+        errors.append(e)
+        stop.set()
+    finally:
+        for thread in threads:
+            thread.join()
+
+    if errors:
+        if os.path.exists(output_path):
+            os.remove(output_path)
+        raise errors[0]
+    if not info['frames']:
+        raise ValueError(f"Tidak ada frame yang bisa dibaca: {input_path}")
+
+    timings = {}
+    for stage in stage_timings.values():
+        for name, seconds in stage.items():
+            timings[name] = timings.get(name, 0.0) + seconds
+    elapsed = time.perf_counter() - start
+    print(f"[INFO] {info['frames']} frame selesai dalam {elapsed:.1f} detik, hasil: {output_path}")
+    if reuse is not None:
+        stats = reuse.ringkasan()
+        print(f"[INFO] Pakai ulang: ab {stats['ab_skip_ratio']:.0%}, tile SR {stats['sr_skip_ratio']:.0%}, "
+              f"{stats['scene_cuts']} pergantian adegan")
+
+    width, height = info['output_size']
+    input_width, input_height = info['input_size']
+    return {'output_path': output_path, 'mode': mode, 'scale': scale,
+            'width': width, 'height': height,
+            'input_width': input_width, 'input_height': input_height,
+            'output_bytes': os.path.getsize(output_path), 'timings': timings,
+            'frames': info['frames'], 'fps': round(info['frames'] * 1000.0 / info['durations'], 3),
+            'reuse': reuse.ringkasan() if reuse is not None else None}
+
+
+if __name__ == '__main__':
+    import image_enhancer
+
+    parser = argparse.ArgumentParser(description='Warnai/perbesar video, GIF, atau WebP animasi')
+    parser.add_argument('input', help='File video/GIF/WebP input')
+    parser.add_argument('output', help='File output (format dari ekstensi)')
+    parser.add_argument('--mode', type=str, default='enhance', choices=list(image_enhancer.MODES))
+    parser.add_argument('--scale', type=int, default=2, choices=[2, 3, 4],
+                        help='Faktor pembesaran (model realesr-animevideov3 x2/x3/x4)')
+    parser.add_argument('--model', type=str, default='siggraph17', choices=['eccv16', 'siggraph17'])
+    parser.add_argument('--batch-size', type=int, default=FRAME_BATCH,
+                        help='Frame per forward pass colorizer')
+    parser.add_argument('--no-reuse', action='store_true',
+                        help='Hitung ulang setiap frame (tanpa pemakaian ulang antar frame)')
+
+    args = parser.parse_args()
+
+    result = proses_video(args.input, args.output, mode=args.mode, scale=args.scale,
+                          model_type=args.model, batch_size=args.batch_size, reuse=not args.no_reuse)
+    print(f"[INFO] {result['frames']} frame, {result['width']}x{result['height']} @ {result['fps']:g} fps")
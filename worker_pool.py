@@ -0,0 +1,366 @@
+"""
+Worker Pool untuk inferensi
+Menjaga beberapa proses worker tetap hidup supaya import torch/cv2 dan bobot
+model (ECCV16/SIGGRAPH17) cukup dimuat sekali per worker, bukan per request.
+
+Setiap worker menerima job lewat Pipe dalam bentuk (job_id, task, kwargs),
+dengan task berupa path "modul:fungsi", lalu mengirim balik hasilnya.
+Worker yang crash atau melewati timeout dimatikan dan diganti worker baru.
+
+Bila pool diberi task warm-up, setiap worker (termasuk pengganti setelah
+restart) menjalankannya dulu sebelum menerima job. ready() menjadi True
+setelah minimal satu worker berhasil warm-up, dan tetap True selama masih ada
+worker hidup: restart karena cancel/timeout tidak membuat node dianggap
+belum siap. Worker yang warm-up-nya gagal tetap melayani job, tetapi tidak
+pernah ditandai siap.
+
+Selama job berjalan, task boleh memanggil kirim_progres(data) untuk mengirim
+progres (mis. tile SR yang selesai, preview awal) lewat Pipe yang sama;
+parent meneruskannya ke callback on_progress milik submit().
+
+Core CPU dibagi antar worker oleh cpu_scheduler (ANJAYHD_CPU_POLICY): tiap
+worker dipasang ke slot core-nya sendiri dan jumlah thread torch/cv2/OpenMP
+disesuaikan, sehingga job yang berjalan bersamaan tidak saling berebut core.
+
+Usage:
+    pool = WorkerPool(size=2, timeout=300,
+                      warmup=('image_enhancer:pemanasan', {'batch_size': 8}))
+    pool.submit('image_enhancer:proses_gambar', input_path='a.jpg',
+                output_path='b.jpg', mode='both', scale=4)
+    pool.shutdown()
+"""
+
+import importlib
+import itertools
+import multiprocessing as mp
+import os
+import queue
+import sys
+import threading
+import time
+import traceback
+
+import cpu_scheduler
+
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+DEFAULT_POOL_SIZE = int(os.environ.get('ANJAYHD_WORKERS', '2'))
+DEFAULT_TIMEOUT = float(os.environ.get('ANJAYHD_JOB_TIMEOUT', '300'))
+# image_enhancer dan colorizers mengimport dependensi berat secara lazy;
+# worker yang hidup lama tetap membayarnya di awal, bukan di job pertama.
+DEFAULT_PRELOAD = ('image_enhancer', 'cv2', 'sr_engine',
+                   'colorizers.util', 'colorizers.eccv16', 'colorizers.siggraph17')
+
+_POLL_INTERVAL = 0.1
+
+# Ujung Pipe dan id job yang sedang berjalan di proses worker ini (untuk
+# kirim_progres); None di luar worker atau di antara job.
+_progres_conn = None
+_progres_job = None
+_progres_lock = threading.Lock()
+
+
+class WorkerError(RuntimeError):
+    """Job gagal dijalankan di worker."""
+
+
+class WorkerCrashed(WorkerError):
+    """Proses worker mati di tengah job."""
+
+
+class WorkerTimeout(WorkerError):
+    """Job melewati batas waktu dan worker-nya dimatikan."""
+
+
+class WorkerCancelled(WorkerError):
+    """Job dibatalkan saat berjalan dan worker-nya dimatikan."""
+
+
+def _resolve_task(task, cache):
+    """Ubah 'modul:fungsi' menjadi callable (di-cache per worker)."""
+    if task not in cache:
+        module_name, func_name = task.split(':', 1)
+        module = importlib.import_module(module_name)
+        cache[task] = getattr(module, func_name)
+    return cache[task]
+
+
+def kirim_progres(data):
+    """
+    Kirim progres job yang sedang berjalan ke parent (no-op di luar worker).
+    Aman dipanggil dari thread lain di dalam task; data harus bisa di-pickle.
+    """
+    with _progres_lock:
+        if _progres_conn is None:
+            return
+        _progres_conn.send(('progress', _progres_job, data))
+
+
+def _set_job_aktif(conn, job_id):
+    global _progres_conn, _progres_job
+    with _progres_lock:
+        _progres_conn, _progres_job = conn, job_id
+
+
+def _worker_main(conn, preload, cpus=None):
+    """Loop utama proses worker: import sekali, lalu layani job sampai ditutup."""
+    if SCRIPT_DIR not in sys.path:
+        sys.path.insert(0, SCRIPT_DIR)
+
+    if cpus:
+        cpu_scheduler.apply_slot(cpus)
+
+    for module_name in preload:
+        try:
+            importlib.import_module(module_name)
+        except Exception as e:
+            print(f"[WARN] Worker {os.getpid()} gagal preload {module_name}: {e}")
+
+    if cpus:
+        cpu_scheduler.configure_threads(len(cpus))
+
+    tasks = {}
+    while True:
+        try:
+            msg = conn.recv()
+        except (EOFError, OSError):
+            break
+        if msg is None:
+            break
+
+        job_id, task, kwargs = msg
+        _set_job_aktif(conn, job_id)
+        try:
+            result = _resolve_task(task, tasks)(**kwargs)
+        except Exception as e:
+            reply = ('error', job_id, f"{type(e).__name__}: {e}", traceback.format_exc())
+        else:
+            reply = ('ok', job_id, result)
+        finally:
+            _set_job_aktif(None, None)
+        # Lock ikut dipegang agar tidak bertabrakan dengan kirim_progres dari thread lain
+        with _progres_lock:
+            conn.send(reply)
+
+    conn.close()
+
+
+class _Worker:
+    """Satu proses worker beserta ujung Pipe milik parent."""
+
+    def __init__(self, index, ctx, preload, cpus=None):
+        self.index = index
+        self.cpus = cpus
+        self._ctx = ctx
+        self._preload = preload
+        self.process = None
+        self.conn = None
+        self.ready = False
+        self.warmup_result = None
+        self.warmup_error = None
+
+    def start(self):
+        parent_conn, child_conn = self._ctx.Pipe()
+        self.process = self._ctx.Process(
+            target=_worker_main,
+            args=(child_conn, self._preload, self.cpus),
+            name=f"anjayhd-worker-{self.index}",
+            daemon=True,
+        )
+        self.process.start()
+        child_conn.close()
+        self.conn = parent_conn
+        self.ready = False
+        self.warmup_result = None
+        self.warmup_error = None
+
+    def stop(self, kill=False):
+        if self.process is None:
+            return
+        if not kill and self.process.is_alive():
+            try:
+                self.conn.send(None)
+            except (BrokenPipeError, OSError):
+                pass
+            self.process.join(timeout=5)
+        if self.process.is_alive():
+            self.process.kill()
+            self.process.join()
+        self.conn.close()
+        self.process = None
+        self.conn = None
+
+    def restart(self):
+        self.stop(kill=True)
+        self.start()
+
+    def run(self, job_id, task, kwargs, timeout, cancel_event=None, on_progress=None):
+        """Kirim satu job dan tunggu hasilnya; pesan progres diteruskan ke on_progress."""
+        try:
+            self.conn.send((job_id, task, kwargs))
+        except (BrokenPipeError, OSError):
+            raise WorkerCrashed(f"Worker {self.index} tidak bisa menerima job")
+
+        # Batas waktu memakai jam, bukan jumlah poll: pesan progres yang sering
+        # membuat poll langsung kembali
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            try:
+                ready = self.conn.poll(_POLL_INTERVAL)
+            except (EOFError, OSError):
+                ready = True
+
+            if ready:
+                try:
+                    msg = self.conn.recv()
+                except (EOFError, OSError):
+                    raise WorkerCrashed(f"Worker {self.index} mati saat memproses job")
+                if msg[1] == job_id:
+                    if msg[0] == 'ok':
+                        return msg[2]
+                    if msg[0] == 'error':
+                        raise WorkerError(msg[2])
+                    if on_progress is not None:
+                        try:
+                            on_progress(msg[2])
+                        except Exception as e:
+                            print(f"[WARN] on_progress gagal: {e}")
+
+            if not self.process.is_alive():
+                raise WorkerCrashed(
+                    f"Worker {self.index} mati saat memproses job (exit code {self.process.exitcode})"
+                )
+
+            if cancel_event is not None and cancel_event.is_set():
+                raise WorkerCancelled("Job dibatalkan")
+
+            if deadline is not None and time.monotonic() >= deadline:
+                raise WorkerTimeout(f"Job melewati batas waktu {timeout:.0f} detik")
+
+
+class WorkerPool:
+    """Pool worker resident dengan ukuran tetap dan restart otomatis."""
+
+    def __init__(self, size=None, timeout=None, preload=DEFAULT_PRELOAD, start_method='spawn',
+                 warmup=None, cpu_policy=None):
+        # Policy fat/thin menentukan sendiri jumlah worker dari jumlah core
+        self.cpu_policy = cpu_scheduler.CPU_POLICY if cpu_policy is None else cpu_policy
+        self.slots = cpu_scheduler.plan_slots(size or DEFAULT_POOL_SIZE, self.cpu_policy)
+        self.size = len(self.slots) if self.slots else max(1, int(size or DEFAULT_POOL_SIZE))
+        self.timeout = DEFAULT_TIMEOUT if timeout is None else timeout
+        self.warmup = warmup
+        self.restarts = 0
+
+        self._ctx = mp.get_context(start_method)
+        self._idle = queue.Queue()
+        self._workers = []
+        self._job_ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._closed = False
+        self._warmed = threading.Event()
+
+        for i in range(self.size):
+            worker = _Worker(i, self._ctx, tuple(preload), self.slots[i] if self.slots else None)
+            worker.start()
+            self._workers.append(worker)
+            self._bring_up(worker)
+
+    def _bring_up(self, worker):
+        """Masukkan worker ke antrean idle; bila ada warm-up, jalankan dulu di background."""
+        if self.warmup is None:
+            worker.ready = True
+            self._warmed.set()
+            self._idle.put(worker)
+            return
+        threading.Thread(target=self._warm, args=(worker,), daemon=True,
+                         name=f"anjayhd-warmup-{worker.index}").start()
+
+    def _warm(self, worker):
+        task, kwargs = self.warmup
+        try:
+            worker.warmup_result = worker.run(next(self._job_ids), task, kwargs, self.timeout)
+        except (WorkerCrashed, WorkerTimeout) as e:
+            # Worker tetap dipakai (tanpa warm-up) agar pool tidak macet karena warm-up,
+            # tetapi tidak ditandai siap
+            print(f"[WARN] Warm-up worker {worker.index} gagal: {e}")
+            worker.warmup_error = str(e)
+            with self._lock:
+                self.restarts += 1
+            worker.restart()
+        except WorkerError as e:
+            print(f"[WARN] Warm-up worker {worker.index} gagal: {e}")
+            worker.warmup_error = str(e)
+        else:
+            worker.ready = True
+            self._warmed.set()
+        self._idle.put(worker)
+
+    def submit(self, task, timeout=None, cancel_event=None, on_progress=None, **kwargs):
+        """
+        Jalankan task di worker yang sedang kosong (blocking sampai selesai).
+
+        Args:
+            task: 'modul:fungsi' yang akan dipanggil di worker
+            timeout: batas waktu dalam detik (default: timeout pool)
+            cancel_event: threading.Event opsional; bila di-set, job dihentikan
+            on_progress: callback(data) opsional untuk tiap kirim_progres dari task
+            **kwargs: argumen untuk fungsi task (harus bisa di-pickle)
+
+        Returns:
+            Nilai kembalian fungsi task
+        """
+        if self._closed:
+            raise WorkerError("Worker pool sudah ditutup")
+
+        timeout = self.timeout if timeout is None else timeout
+        job_id = next(self._job_ids)
+        worker = self._idle.get()
+        try:
+            return worker.run(job_id, task, kwargs, timeout, cancel_event, on_progress)
+        except (WorkerCrashed, WorkerTimeout, WorkerCancelled):
+            self._restart(worker)
+            worker = None
+            raise
+        finally:
+            if worker is not None:
+                self._idle.put(worker)
+
+    def _restart(self, worker):
+        """Ganti proses worker; worker baru kembali ke antrean idle setelah warm-up."""
+        print(f"[WARN] Restart worker {worker.index}")
+        with self._lock:
+            self.restarts += 1
+        worker.restart()
+        self._bring_up(worker)
+
+    def alive_workers(self):
+        return sum(1 for w in self._workers if w.process is not None and w.process.is_alive())
+
+    def ready(self):
+        """
+        True setelah minimal satu worker berhasil warm-up, selama masih ada worker
+        hidup. Worker yang sedang warm-up ulang setelah restart tidak mengubahnya.
+        """
+        return self._warmed.is_set() and self.alive_workers() > 0
+
+    def worker_status(self):
+        return [{
+            'index': w.index,
+            'alive': w.process is not None and w.process.is_alive(),
+            'ready': w.ready,
+            'cpus': list(w.cpus) if w.cpus else None,
+            'warmup': w.warmup_result,
+            'warmup_error': w.warmup_error,
+        } for w in self._workers]
+
+    def shutdown(self):
+        self._closed = True
+        for worker in self._workers:
+            worker.stop()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.shutdown()